@@ -3,11 +3,25 @@ Türkiye Tourism Chatbot - Flask Web Application
 RAG tabanlı Türkiye turizm chatbot'u için web arayüzü
 
 Author: Akbank GenAI Bootcamp Project
+
+Ağır bağımlılıklar (google.generativeai, chromadb, sentence-transformers)
+modül import edilirken yüklenmez; RAG pipeline arka planda başlatılır
+(bkz. src.readiness).
 """
 
-from flask import Flask, render_template, request, jsonify, session
-from src.rag_pipeline import TurkiyeTourismRAG
+import time
+APP_IMPORT_START = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context, g
+from src.session_store import create_conversation_store
+from src.query_rewriter import suggested_n_results
+from src.batch import parse_batch_lines, batch_result_line
+from src.readiness import Readiness, sync_once, FAILED
+from src.warmup import create_answer_warmer, warmup_queries
+from src import metrics
 import os
+import json
+import uuid
 from datetime import datetime
 import secrets
 from dotenv import load_dotenv
@@ -17,37 +31,260 @@ load_dotenv()
 
 # Flask uygulamasını oluştur
 app = Flask(__name__, static_folder='static', static_url_path='/static')
-app.secret_key = secrets.token_hex(16)
+# Birden fazla süreç aynı cookie'yi doğrulayabilsin diye sabit anahtar tercih edilir
+app.secret_key = os.getenv('FLASK_SECRET_KEY') or secrets.token_hex(16)
 
-# Global RAG instance
+# Global RAG instance (arka planda başlatılır; hazır olma durumu `readiness`'te)
 rag_instance = None
+readiness = Readiness()
 
+# Sohbet istekleri pipeline hazır değilse en fazla bu kadar bekler, sonra 503 döner
+RAG_READY_TIMEOUT = float(os.getenv('RAG_READY_TIMEOUT', '10'))
 
-def initialize_rag():
-    """RAG pipeline'ı başlatır"""
-    global rag_instance
-    
+# Gunicorn preload: bu başlatmaya özgü değer (worker'lara fork ile geçer);
+# indeksi worker'lardan yalnızca biri senkronize eder
+BOOT_TOKEN = uuid.uuid4().hex
+
+# Sohbet geçmişi sunucu tarafında tutulur; cookie'de yalnızca session ID kalır
+conversation_store = create_conversation_store()
+
+# İstek başına aşama süreleri: "X-Trace: 1" başlığı gönderen isteklere (veya
+# METRICS_TRACE=1 ise tüm isteklere) Server-Timing başlığı eklenir
+TRACE_ALL_REQUESTS = os.getenv('METRICS_TRACE') == '1'
+
+# Toplu soru API'si (/api/batch): tanımlıysa "Authorization: Bearer <token>" gerekir
+BATCH_API_TOKEN = os.getenv('BATCH_API_TOKEN')
+BATCH_MAX_QUERIES = int(os.getenv('BATCH_MAX_QUERIES', '10000'))
+
+
+def get_session_id():
+    """Cookie'deki session ID'yi döndürür, yoksa yeni bir tane oluşturur"""
+    if 'sid' not in session:
+        session['sid'] = secrets.token_urlsafe(16)
+    return session['sid']
+
+
+def get_api_key():
+    """GEMINI_API_KEY'i döndürür; tanımlı değilse uyarı yazar ve başlatmayı başarısız sayar"""
     api_key = os.getenv('GEMINI_API_KEY')
     if not api_key:
         print("⚠️  UYARI: GEMINI_API_KEY environment variable tanımlanmamış!")
         print("   Lütfen .env dosyasını kontrol edin veya API key'i tanımlayın.")
+        readiness.mark_failed('GEMINI_API_KEY tanımlanmamış')
+    return api_key
+
+
+def load_rag(api_key):
+    """
+    RAG pipeline'ı kurar; ağır modüller burada import edilir
+
+    Gunicorn preload modunda master yalnızca embedding modelini yükler;
+    indeks her worker'da fork sonrasında open_rag_index ile açılır.
+    """
+    global rag_instance
+    
+    with readiness.phase('imports'):
+        from src.rag_pipeline import TurkiyeTourismRAG
+    
+    if os.getenv('RAG_PRELOAD') == '1':
+        with readiness.phase('model'):
+            rag_instance = TurkiyeTourismRAG(api_key=api_key, open_index=False)
+        print("✓ Embedding modeli yüklendi, indeks worker'larda açılacak.")
+        return
+    
+    with readiness.phase('pipeline'):
+        rag = TurkiyeTourismRAG(api_key=api_key)
+    rag_instance = rag
+    readiness.mark_ready()
+    start_warmup()
+    print("✓ RAG Pipeline başarıyla başlatıldı!")
+
+
+def initialize_rag():
+    """RAG pipeline'ı başlatır (senkron)"""
+    api_key = get_api_key()
+    if not api_key:
         return False
     
+    readiness.mark_loading()
     try:
-        rag_instance = TurkiyeTourismRAG(api_key=api_key)
-        print("✓ RAG Pipeline başarıyla başlatıldı!")
+        load_rag(api_key)
         return True
     except Exception as e:
         print(f"✗ RAG Pipeline başlatma hatası: {str(e)}")
+        readiness.mark_failed(str(e))
         return False
 
 
+def initialize_rag_in_background():
+    """
+    RAG pipeline'ı arka plan thread'inde başlatır; uygulama hemen istek kabul eder
+
+    Returns:
+        Başlatma başladıysa True (GEMINI_API_KEY yoksa False)
+    """
+    api_key = get_api_key()
+    if not api_key:
+        return False
+    readiness.start(lambda: load_rag(api_key))
+    return True
+
+
+def open_rag_index():
+    """
+    Preload modunda worker'da indeksi arka planda senkronize edip açar
+
+    Senkronizasyon ayrı bir (spawn) süreçte ve başlatma başına bir kez
+    yapılır; diğer worker'lar bitmesini bekleyip yalnızca indeksi açar.
+    """
+    if rag_instance is None:
+        return None
+    
+    def run():
+        from src.rag_pipeline import sync_index_in_subprocess
+        
+        with readiness.phase('index'):
+            sync_once(rag_instance.persist_dir, BOOT_TOKEN, lambda: sync_index_in_subprocess(
+                rag_instance.api_key, rag_instance.data_path, rag_instance.persist_dir
+            ))
+            rag_instance.open_index()
+        readiness.mark_ready()
+        start_warmup()
+        print(f"✓ Vektör indeksi açıldı (worker {os.getpid()})")
+    
+    return readiness.start(run, name='rag-open-index')
+
+
+def rag_unavailable():
+    """
+    Pipeline hazır değilse döndürülecek hata gövdesi ve durum kodu
+
+    Returns:
+        (yanıt sözlüğü, HTTP durum kodu); hazırsa None
+    """
+    if readiness.ready and rag_instance is not None:
+        return None
+    if readiness.state == FAILED:
+        return {
+            'success': False,
+            'error': 'RAG sistemi başlatılamadı. Lütfen GEMINI_API_KEY kontrol edin.'
+        }, 500
+    return {
+        'success': False,
+        'error': 'Sistem başlatılıyor. Lütfen birkaç saniye sonra tekrar deneyin.'
+    }, 503
+
+
+def wait_for_rag():
+    """
+    Pipeline hazır olana kadar en fazla RAG_READY_TIMEOUT saniye bekler
+
+    Returns:
+        Hazırsa None, değilse döndürülecek Flask hata yanıtı
+    """
+    if not readiness.ready:
+        with metrics.stage('ready_wait'):
+            readiness.wait(RAG_READY_TIMEOUT)
+    unavailable = rag_unavailable()
+    if unavailable is None:
+        return None
+    payload, status = unavailable
+    response = jsonify(payload)
+    if status == 503:
+        response.headers['Retry-After'] = '5'
+    return response, status
+
+
+def start_warmup():
+    """
+    WARMUP=1 ise popüler soruların yanıtlarını arka planda önceden hesaplar
+
+    İndeks açık olmalıdır; preload modunda her worker'da post_fork'tan çağrılır.
+    Yanıt deposu worker'lar arasında paylaşıldığından bir soru tek bir
+    worker'da hesaplanır.
+    """
+    if rag_instance is None or os.getenv('WARMUP') != '1':
+        return None
+    rag_instance.precomputed_answers = create_answer_warmer(rag_instance, n_results_for)
+    return rag_instance.precomputed_answers.warm_up_in_background(warmup_queries(rag_instance))
+
+
+def cache_metrics():
+    """/metrics için anlık önbellek boyutları"""
+    if rag_instance is None:
+        return []
+    return [
+        ('turkiyegpt_response_cache_entries', 'gauge', 'Yanıt önbelleğindeki kayıt sayısı',
+         rag_instance.response_cache.stats()['size']),
+        ('turkiyegpt_query_embedding_cache_entries', 'gauge', 'Soru embedding önbelleğindeki kayıt sayısı',
+         len(rag_instance._query_embedding_cache)),
+    ]
+
+
+metrics.REGISTRY.add_collector(cache_metrics)
+metrics.REGISTRY.add_collector(readiness.metrics)
+
+
+@app.before_request
+def start_request_timing():
+    """İstek süresini ölçmeye ve istenmişse aşama izini tutmaya başlar"""
+    g.request_start = time.perf_counter()
+    if TRACE_ALL_REQUESTS or request.headers.get('X-Trace') == '1':
+        g.trace_token = metrics.start_trace()
+
+
+@app.after_request
+def add_trace_header(response):
+    """İz açıksa o ana kadarki aşama sürelerini Server-Timing başlığına yazar"""
+    g.response_status = response.status_code
+    trace = metrics.current_trace()
+    if trace is not None and 'trace_token' in g:
+        response.headers['Server-Timing'] = metrics.server_timing_header(trace)
+    return response
+
+
+@app.teardown_request
+def finish_request_timing(error=None):
+    """
+    İstek süresini histograma yazar
+
+    Streaming yanıtlar bu adımda atlanır; süreleri akış bittiğinde
+    generator içinde kaydedilir.
+    """
+    if 'request_start' in g and not g.get('streaming'):
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - g.request_start,
+            endpoint=endpoint,
+            status=str(g.get('response_status', 500))
+        )
+    if 'trace_token' in g:
+        metrics.end_trace(g.pop('trace_token'))
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus metin formatında metrikler"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: süreç ayakta ve istek kabul ediyor (pipeline'ı beklemez)"""
+    return jsonify({'status': 'ok', **readiness.status()})
+
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: pipeline sohbet isteklerine hazır mı (hazır değilse 503)"""
+    return jsonify(readiness.status()), 200 if readiness.ready else 503
+
+
 @app.route('/')
 def index():
     """Ana sayfa"""
-    # Session'da chat history yoksa oluştur
-    if 'chat_history' not in session:
-        session['chat_history'] = []
+    # Session ID yoksa oluştur
+    get_session_id()
     
     return render_template('index.html')
 
@@ -55,24 +292,24 @@ def index():
 @app.route('/chat')
 def chat():
     """Chat sayfası"""
-    # Session'da chat history yoksa oluştur
-    if 'chat_history' not in session:
-        session['chat_history'] = []
+    # Session ID yoksa oluştur
+    get_session_id()
     
     return render_template('chat.html')
 
 
+def n_results_for(user_message):
+    """Soruya göre getirilecek bağlam sayısını belirler (hız için optimize)"""
+    return suggested_n_results(user_message)
+
+
 @app.route('/api/chat', methods=['POST'])
 def api_chat():
     """Chat API endpoint"""
-    global rag_instance
-    
-    # RAG instance kontrolü
-    if rag_instance is None:
-        return jsonify({
-            'success': False,
-            'error': 'RAG sistemi başlatılamadı. Lütfen GEMINI_API_KEY kontrol edin.'
-        }), 500
+    # RAG pipeline hazır olana kadar (sınırlı süre) bekle
+    unavailable = wait_for_rag()
+    if unavailable is not None:
+        return unavailable
     
     try:
         # Kullanıcı mesajını al
@@ -85,36 +322,34 @@ def api_chat():
                 'error': 'Lütfen bir mesaj girin.'
             }), 400
         
-        # Chat history'yi al
-        if 'chat_history' not in session:
-            session['chat_history'] = []
+        session_id = get_session_id()
         
-        # Önceki kaynaklardan başlıkları çıkar (tekrar göstermemek için)
-        previous_titles = set()
-        for msg in session['chat_history']:
-            if 'sources' in msg:
-                for source in msg['sources']:
-                    previous_titles.add(source.get('baslik', ''))
+        # Önceki kaynaklardaki başlıklar (tekrar göstermemek için) ve takip
+        # soruları için son turun sohbet bağlamı
+        with metrics.stage('session'):
+            previous_titles = conversation_store.shown_titles(session_id)
+            conversation = conversation_store.get_context(session_id)
         
         # RAG pipeline ile yanıt üret (hız için optimize)
-        n_results = 6 if any(word in user_message.lower() for word in ['gezebilirim', 'nereleri', 'başka', 'daha', 'diğer', 'antik kentler', 'gezilecek']) else 4
-        result = rag_instance.query(user_message, n_results=n_results, exclude_titles=list(previous_titles))
+        n_results = n_results_for(user_message)
+        result = rag_instance.query(user_message, n_results=n_results, exclude_titles=list(previous_titles),
+                                    conversation=conversation)
         
         # Chat history'ye ekle
-        session['chat_history'].append({
-            'user': user_message,
-            'bot': result['response'],
-            'sources': result['sources'],
-            'timestamp': datetime.now().strftime('%H:%M')
-        })
-        
-        # Session'ı güncelle
-        session.modified = True
+        with metrics.stage('session'):
+            conversation_store.append(session_id, {
+                'user': user_message,
+                'bot': result['response'],
+                'sources': result['sources'],
+                'timestamp': datetime.now().strftime('%H:%M')
+            })
+            conversation_store.set_context(session_id, result['conversation'])
         
         return jsonify({
             'success': True,
             'response': result['response'],
             'sources': result['sources'],
+            'path': result['path'],
             'timestamp': datetime.now().strftime('%H:%M')
         })
         
@@ -126,11 +361,187 @@ def api_chat():
         }), 500
 
 
+def sse_event(event, data):
+    """Server-Sent Events formatında tek bir olay satırı üretir"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def api_chat_stream():
+    """
+    Streaming chat API endpoint (Server-Sent Events)
+    
+    Kaynak listesi bağlam getirildikten hemen sonra 'sources' olayı olarak,
+    yanıt parçaları ise Gemini'den geldikçe 'chunk' olayları olarak gönderilir.
+    Yanıt üretilemez veya yarıda kesilirse hata mesajı parça olarak değil
+    'error' olayı olarak gelir. Akış 'done' olayı ile (beklenmeyen bir
+    hatada yalnızca 'error' ile) biter.
+    """
+    unavailable = wait_for_rag()
+    if unavailable is not None:
+        return unavailable
+    
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '').strip()
+    
+    if not user_message:
+        return jsonify({
+            'success': False,
+            'error': 'Lütfen bir mesaj girin.'
+        }), 400
+    
+    session_id = get_session_id()
+    with metrics.stage('session'):
+        previous_titles = conversation_store.shown_titles(session_id)
+        conversation = conversation_store.get_context(session_id)
+    n_results = n_results_for(user_message)
+    
+    try:
+        events = rag_instance.query_stream(user_message, n_results=n_results, exclude_titles=list(previous_titles),
+                                           conversation=conversation)
+        # Bağlam getirme yanıt başlıkları gönderilmeden önce yapılır
+        sources_event = next(events)
+    except Exception as e:
+        print(f"✗ Chat hatası: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Bir hata oluştu: {str(e)}'
+        }), 500
+    
+    # Kaynaklar akış başlamadan kaydedilir (bağlantı yarıda kopsa da tekrar
+    # gösterilmezler); yanıt metni akış bitince aynı kayda yazılır
+    timestamp = datetime.now().strftime('%H:%M')
+    with metrics.stage('session'):
+        message_index = conversation_store.append(session_id, {
+            'user': user_message,
+            'bot': '',
+            'sources': sources_event['sources'],
+            'timestamp': timestamp
+        })
+        conversation_store.set_context(session_id, sources_event['conversation'])
+    
+    # Generator isteğin context'i kapandıktan sonra çalışır; iz ve istek
+    # süresi akış bitene kadar burada tutulur
+    g.streaming = True
+    request_start = g.request_start
+    trace = metrics.current_trace()
+    
+    def generate():
+        status = 200
+        with metrics.use_trace(trace):
+            yield sse_event('sources', {'sources': sources_event['sources']})
+            try:
+                for event in events:
+                    if event['type'] == 'chunk':
+                        yield sse_event('chunk', {'text': event['text']})
+                    elif event['type'] == 'error':
+                        status = 500
+                        yield sse_event('error', {'error': event['error']})
+                    elif event['type'] == 'done':
+                        with metrics.stage('session'):
+                            conversation_store.update(session_id, message_index, bot=event['response'])
+                        done = {'timestamp': timestamp, 'path': event['path']}
+                        # Başlıklar akıştan önce gönderildiği için LLM süreleri iz açıksa burada iletilir
+                        if trace is not None:
+                            done['timings'] = metrics.trace_summary(trace)
+                        yield sse_event('done', done)
+            except Exception as e:
+                status = 500
+                print(f"✗ Chat hatası: {str(e)}")
+                yield sse_event('error', {'error': f'Bir hata oluştu: {str(e)}'})
+            finally:
+                metrics.REQUEST_SECONDS.observe(
+                    time.perf_counter() - request_start,
+                    endpoint='/api/chat/stream',
+                    status=str(status)
+                )
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """
+    Toplu soru yanıtlama API endpoint'i (JSONL)
+    
+    İstek gövdesinde satır başına bir soru bulunur: JSON metni veya
+    {"id": ..., "query": ...} nesnesi. Yanıtlar tamamlandıkça satır başına
+    bir JSON nesnesi olarak akış halinde döner; sıra girişten farklı
+    olabileceği için eşleştirmede 'id' kullanılır. Sohbet geçmişi
+    kullanılmaz ve güncellenmez.
+    
+    Query parametreleri: n_results (varsayılan 6), concurrency, rate_limit
+    """
+    unavailable = wait_for_rag()
+    if unavailable is not None:
+        return unavailable
+    
+    if BATCH_API_TOKEN and request.headers.get('Authorization') != f'Bearer {BATCH_API_TOKEN}':
+        return jsonify({'success': False, 'error': 'Yetkisiz istek.'}), 401
+    
+    try:
+        items = list(parse_batch_lines(request.get_data(as_text=True).splitlines()))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if not items:
+        return jsonify({'success': False, 'error': 'Lütfen en az bir soru gönderin.'}), 400
+    if len(items) > BATCH_MAX_QUERIES:
+        return jsonify({
+            'success': False,
+            'error': f'Bir istekte en fazla {BATCH_MAX_QUERIES} soru gönderilebilir.'
+        }), 413
+    
+    results = rag_instance.query_batch(
+        items,
+        n_results=request.args.get('n_results', 6, type=int),
+        concurrency=request.args.get('concurrency', type=int),
+        rate_limit=request.args.get('rate_limit', type=float)
+    )
+    
+    g.streaming = True
+    request_start = g.request_start
+    trace = metrics.current_trace()
+    
+    def generate():
+        status = 200
+        with metrics.use_trace(trace):
+            try:
+                for result in results:
+                    yield batch_result_line(result)
+            except Exception as e:
+                status = 500
+                print(f"✗ Toplu sorgu hatası: {str(e)}")
+                yield batch_result_line({'error': f'Bir hata oluştu: {str(e)}'})
+            finally:
+                results.close()
+                metrics.REQUEST_SECONDS.observe(
+                    time.perf_counter() - request_start,
+                    endpoint='/api/batch',
+                    status=str(status)
+                )
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
 @app.route('/api/clear', methods=['POST'])
 def api_clear():
     """Chat geçmişini temizle"""
-    session['chat_history'] = []
-    session.modified = True
+    conversation_store.clear(get_session_id())
     return jsonify({
         'success': True,
         'message': 'Sohbet geçmişi temizlendi.'
@@ -140,7 +551,7 @@ def api_clear():
 @app.route('/api/history', methods=['GET'])
 def api_history():
     """Chat geçmişini getir"""
-    history = session.get('chat_history', [])
+    history = conversation_store.get_history(get_session_id())
     return jsonify({
         'success': True,
         'history': history
@@ -177,13 +588,17 @@ def server_error(e):
     """, 500
 
 
+# Uygulama modülünün (ağır bağımlılıklar hariç) yüklenme süresi
+readiness.record_phase('app_import', time.perf_counter() - APP_IMPORT_START)
+
+
 if __name__ == '__main__':
     print("\n" + "="*80)
     print("TÜRKİYE TOURISM CHATBOT - RAG Tabanlı Turizm Asistanı")
     print("="*80 + "\n")
     
-    # RAG pipeline'ı başlat
-    if initialize_rag():
+    # RAG pipeline'ı arka planda başlat
+    if initialize_rag_in_background():
         print("\n🚀 Uygulama başlatılıyor...")
         print("📍 URL: http://localhost:5000")
         print("💡 Çıkmak için Ctrl+C\n")
@@ -203,12 +618,12 @@ if __name__ == '__main__':
 
 # Gunicorn için production ayarları
 if __name__ != '__main__':
-    # Production'da RAG instance'ı başlat
-    try:
-        api_key = os.getenv('GEMINI_API_KEY')
-        if api_key:
-            rag_instance = TurkiyeTourismRAG(api_key=api_key)
-            print("✅ RAG Pipeline production'da başlatıldı!")
-    except Exception as e:
-        print(f"✗ RAG Pipeline production'da başlatılamadı: {str(e)}")
-
+    # Production'da RAG instance'ı arka planda başlat; statik sayfalar ve
+    # /healthz hemen yanıt verir. Gunicorn preload modunda (gunicorn.conf.py)
+    # bu blok fork öncesi master süreçte çalışır ve yalnızca embedding
+    # modelini yükler (worker'lar modeli copy-on-write paylaşır); indeks
+    # senkronizasyonu ve açılışı worker'larda arka planda yapılır.
+    if os.getenv('RAG_PRELOAD') == '1':
+        initialize_rag()
+    else:
+        initialize_rag_in_background()
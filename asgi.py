@@ -0,0 +1,268 @@
+"""
+Türkiye Tourism Chatbot - ASGI Entry Point
+LLM ağırlıklı sohbet trafiği için async (non-blocking) sunum modu
+
+POST /api/chat isteği doğrudan event loop üzerinde işlenir: retrieval
+sınırlı bir thread havuzunda çalışır, Gemini çağrısı beklenir, oturum
+deposu (SQLite) okuma/yazmaları event loop dışında yapılır. Böylece tek
+bir süreç yüzlerce eşzamanlı sohbeti taşıyabilir. Diğer tüm route'lar
+(sayfalar, streaming, geçmiş) mevcut Flask uygulamasına devredilir.
+
+Kullanım:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 2
+"""
+
+import asyncio
+import functools
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.http import dump_cookie, parse_cookie
+
+import app as flask_module
+from app import app, conversation_store, n_results_for, TRACE_ALL_REQUESTS
+from src import metrics
+
+
+class AdmissionController:
+    """
+    Eşzamanlılık sınırı ve geri basınç (backpressure)
+
+    En fazla `max_in_flight` sohbet aynı anda işlenir; en fazla `max_queue`
+    istek sırada bekleyebilir. Sıra doluysa veya bekleme süresi aşılırsa
+    istek 503 ile reddedilir.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Semaphore, worker'ın event loop'u çalışırken oluşturulmalıdır
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        """Slot alır; aşırı yükte False döner"""
+        if not self.semaphore.locked():
+            # Boş slot varsa beklemeden alınır
+            await self.semaphore.acquire()
+        else:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                return False
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            finally:
+                self.queued -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+
+admission = AdmissionController(
+    max_in_flight=int(os.getenv('ASYNC_MAX_IN_FLIGHT', '256')),
+    max_queue=int(os.getenv('ASYNC_MAX_QUEUE', '512')),
+    queue_timeout=float(os.getenv('ASYNC_QUEUE_TIMEOUT', '10'))
+)
+
+flask_application = WsgiToAsgi(app)
+
+
+async def read_body(receive) -> bytes:
+    """İstek gövdesini okur"""
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+
+async def send_json(send, payload, status=200, headers=None):
+    """JSON yanıtı gönderir"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    response_headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+    ]
+    response_headers.extend(headers or [])
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Bloklayan çağrıyı (ör. SQLite oturum deposu) event loop dışında çalıştırır"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+def load_conversation(session_id):
+    """Oturumda gösterilmiş başlıklar ve sohbet bağlamı"""
+    return conversation_store.shown_titles(session_id), conversation_store.get_context(session_id)
+
+
+def save_turn(session_id, message, context):
+    """Sohbet turunu ve sonraki turun bağlamını oturuma yazar"""
+    conversation_store.append(session_id, message)
+    conversation_store.set_context(session_id, context)
+
+
+def load_session(scope):
+    """Flask'ın imzalı session cookie'sini okur"""
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookie_header = dict(scope.get('headers', [])).get(b'cookie', b'').decode('latin-1')
+    cookie = parse_cookie(cookie_header).get(app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    try:
+        return dict(serializer.loads(cookie))
+    except Exception:
+        return {}
+
+
+def session_cookie_header(session_data):
+    """Session'ı Flask ile uyumlu imzalı cookie olarak yazar"""
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookie = dump_cookie(
+        app.config['SESSION_COOKIE_NAME'],
+        serializer.dumps(session_data),
+        httponly=app.config['SESSION_COOKIE_HTTPONLY'],
+        secure=app.config['SESSION_COOKIE_SECURE'],
+        samesite=app.config['SESSION_COOKIE_SAMESITE'],
+        path=app.config['SESSION_COOKIE_PATH'] or '/'
+    )
+    return (b'set-cookie', cookie.encode('latin-1'))
+
+
+async def chat(scope, receive, send):
+    """
+    Async chat API endpoint (Flask'taki /api/chat ile aynı sözleşme)
+
+    İstek süresi ve iz (Server-Timing) Flask route'larındaki gibi kaydedilir.
+    """
+    start = time.perf_counter()
+    request_headers = dict(scope.get('headers', []))
+    trace_token = None
+    if TRACE_ALL_REQUESTS or request_headers.get(b'x-trace') == b'1':
+        trace_token = metrics.start_trace()
+
+    status = 500
+
+    async def respond(payload, status_code=200, headers=None):
+        nonlocal status
+        status = status_code
+        headers = list(headers or [])
+        if trace_token is not None:
+            timing = metrics.server_timing_header(metrics.current_trace())
+            headers.append((b'server-timing', timing.encode('latin-1')))
+        await send_json(send, payload, status=status_code, headers=headers)
+
+    try:
+        await handle_chat(scope, receive, respond)
+    finally:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint='/api/chat', status=str(status))
+        if trace_token is not None:
+            metrics.end_trace(trace_token)
+
+
+async def handle_chat(scope, receive, respond):
+    """/api/chat isteğini işler; yanıt `respond` ile gönderilir"""
+    # Pipeline arka planda başlatılıyorsa event loop'u bloklamadan sınırlı süre beklenir
+    if not flask_module.readiness.ready:
+        with metrics.stage('ready_wait'):
+            await flask_module.readiness.wait_async(flask_module.RAG_READY_TIMEOUT)
+    unavailable = flask_module.rag_unavailable()
+    if unavailable is not None:
+        payload, status_code = unavailable
+        headers = [(b'retry-after', b'5')] if status_code == 503 else []
+        await respond(payload, status_code=status_code, headers=headers)
+        return
+    rag_instance = flask_module.rag_instance
+
+    # Geçersiz JSON, UTF-8 olmayan gövde (UnicodeDecodeError) veya nesne
+    # olmayan JSON Flask'taki get_json(silent=True) gibi boş istek sayılır
+    try:
+        data = json.loads(await read_body(receive) or b'{}')
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    user_message = str(data.get('message', '')).strip()
+
+    if not user_message:
+        await respond({'success': False, 'error': 'Lütfen bir mesaj girin.'}, status_code=400)
+        return
+
+    with metrics.stage('admission_wait'):
+        admitted = await admission.acquire()
+    if not admitted:
+        await respond({
+            'success': False,
+            'error': 'Sunucu şu anda yoğun. Lütfen birkaç saniye sonra tekrar deneyin.'
+        }, status_code=503, headers=[(b'retry-after', b'5')])
+        return
+
+    try:
+        session_data = load_session(scope)
+        session_id = session_data.setdefault('sid', secrets.token_urlsafe(16))
+        # SQLite deposu kilit beklerken event loop'taki diğer sohbetleri bloklamasın
+        with metrics.stage('session'):
+            previous_titles, conversation = await run_blocking(load_conversation, session_id)
+
+        result = await rag_instance.aquery(
+            user_message,
+            n_results=n_results_for(user_message),
+            exclude_titles=list(previous_titles),
+            conversation=conversation
+        )
+
+        timestamp = datetime.now().strftime('%H:%M')
+        with metrics.stage('session'):
+            await run_blocking(save_turn, session_id, {
+                'user': user_message,
+                'bot': result['response'],
+                'sources': result['sources'],
+                'timestamp': timestamp
+            }, result['conversation'])
+
+        await respond({
+            'success': True,
+            'response': result['response'],
+            'sources': result['sources'],
+            'path': result['path'],
+            'timestamp': timestamp
+        }, headers=[session_cookie_header(session_data)])
+
+    except Exception as e:
+        print(f"✗ Chat hatası: {str(e)}")
+        await respond({'success': False, 'error': f'Bir hata oluştu: {str(e)}'}, status_code=500)
+    finally:
+        admission.release()
+
+
+async def application(scope, receive, send):
+    """ASGI uygulaması: /api/chat async işlenir, geri kalanı Flask'a gider"""
+    if scope['type'] == 'http' and scope['path'] == '/api/chat' and scope['method'] == 'POST':
+        await chat(scope, receive, send)
+        return
+    await flask_application(scope, receive, send)
@@ -0,0 +1,4 @@
+"""
+TürkiyeGPT Benchmark Suite
+Offline (API anahtarı ve ağ gerektirmeyen) retrieval ve uçtan uca gecikme ölçümleri
+"""
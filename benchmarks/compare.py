@@ -0,0 +1,67 @@
+"""
+İki benchmark sonucunu karşılaştırır
+
+Her aşama için p50/p95/p99 değişimini yazdırır. `--threshold` verilirse
+herhangi bir aşamanın p95'i bu oranın üzerinde kötüleştiğinde 1 çıkış
+koduyla döner (CI'da gerileme kontrolü için).
+
+Kullanım:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+
+
+def load(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sonuçlarını karşılaştır")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="İzin verilen en fazla p95 kötüleşmesi (ör. 0.10 = %%10)")
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    regressions = []
+
+    for stage in baseline:
+        if stage not in candidate or stage == 'index_build':
+            continue
+        print(f"{stage}:")
+        for metric in METRICS:
+            if metric not in baseline[stage] or metric not in candidate[stage]:
+                continue
+            before, after = baseline[stage][metric], candidate[stage][metric]
+            delta = change(before, after)
+            print(f"  {metric:>15}: {before:10.3f} -> {after:10.3f} ({delta:+.1%})")
+        if args.threshold is not None and 'p95_ms' in baseline[stage]:
+            delta = change(baseline[stage]['p95_ms'], candidate[stage].get('p95_ms', 0.0))
+            if delta > args.threshold:
+                regressions.append((stage, delta))
+
+    if 'index_build' in baseline and 'index_build' in candidate:
+        before = baseline['index_build']['cold_seconds']
+        after = candidate['index_build']['cold_seconds']
+        print(f"index_build:\n  {'cold_seconds':>15}: {before:10.3f} -> {after:10.3f} "
+              f"({change(before, after):+.1%})")
+
+    if regressions:
+        for stage, delta in regressions:
+            print(f"✗ Gerileme: {stage} p95 {delta:+.1%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Embedding backend karşılaştırması: recall@k ve gecikme
+
+Gerçek veri setinden etiketli sorular üretir ve her backend için:
+- recall@k / MRR: soru embedding'ine en yakın doküman embedding'leri
+  arasında sorunun kaydı ilk k içinde mi (tam tarama, indeks gerekmez)
+- query_encode: tek soru embedding gecikmesi (p50/p95/p99)
+- document_encode: tüm dokümanların embed süresi ve saniyedeki doküman
+- load_seconds: modelin yüklenme süresi
+
+Soru türleri:
+- soru: data/embedding_eval.jsonl'deki elle yazılmış, kayıt adını
+  içermeyen doğal sorular ("Osmanlı padişahlarının yaşadığı saray")
+- aciklama: her kaydın açıklamasının ilk cümlesi (kayıt adı çıkarılmış)
+- ozellikler: her kaydın şehri ve özellik listesi (kayıt adı çıkarılmış)
+
+Otomatik türler doküman metninden alındığı için kelime örtüşmesi yüksektir;
+Türkçe anlamsal eşleşmeyi en iyi `soru` türü gösterir. Aynı başlığı taşıyan
+kayıtlardan herhangi biri isabet sayılır.
+
+Dokümanlar indeksle aynı biçimde (TurkiyeTourismRAG.build_document)
+oluşturulur. Backend'ler `ad=tanım` biçiminde verilir:
+    hashing
+    sentence-transformers:all-MiniLM-L6-v2
+    sentence-transformers:models/multilingual-minilm
+    onnx:models/multilingual-minilm
+    onnx:models/multilingual-minilm:int8
+
+Kullanım:
+    python -m benchmarks.embeddings --backend minilm=sentence-transformers:all-MiniLM-L6-v2 \\
+        --backend multilingual-int8=onnx:models/multilingual-minilm:int8 --threads 4
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.fakes import HashingEmbeddingFunction
+from benchmarks.run import git_revision, summarize, timed
+from benchmarks.synthetic_data import load_seed_records
+from src.gazetteer import turkish_casefold
+
+QUERY_TYPES = ('soru', 'aciklama', 'ozellikler')
+DEFAULT_QUERIES = "data/embedding_eval.jsonl"
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'\w+')
+
+
+def _without_title(text: str, title: str) -> str:
+    """Metinden kayıt adının kelimelerini çıkarır (ad eşleşmesiyle kolay isabet olmasın)"""
+    title_words = set(WORD.findall(turkish_casefold(title)))
+    kept = [word for word in text.split() if not set(WORD.findall(turkish_casefold(word))) & title_words]
+    return " ".join(kept)
+
+
+def build_eval_set(records: List[Dict[str, Any]], queries_path: str = None) -> List[Tuple[str, str, str]]:
+    """
+    Elle yazılmış sorular ve kayıtlardan üretilen etiketli sorular
+
+    Returns:
+        (soru türü, soru metni, beklenen kaydın başlığı) listesi
+    """
+    queries = []
+    if queries_path and os.path.exists(queries_path):
+        with open(queries_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    queries.append(('soru', item['query'], item['baslik']))
+    for record in records:
+        title = record.get('baslik', '')
+        sentence = SENTENCE_END.split(record.get('aciklama', '').strip())[0]
+        text = _without_title(sentence, title)
+        if len(text.split()) >= 3:
+            queries.append(('aciklama', text, title))
+        features = ", ".join(record.get('ozellikler', []))
+        text = _without_title(f"{record.get('sehir', '')} {features}", title)
+        if len(text.split()) >= 2:
+            queries.append(('ozellikler', text, title))
+    return queries
+
+
+def make_embedding_function(spec: str, threads: int):
+    """`hashing`, `sentence-transformers:<model>` veya `onnx:<klasör>[:int8]` tanımından backend oluşturur"""
+    if spec == 'hashing':
+        return HashingEmbeddingFunction()
+    from src.embeddings import create_embedding_function
+
+    backend, _, model = spec.partition(':')
+    quantized = False
+    if backend == 'onnx' and model.endswith(':int8'):
+        model, quantized = model[:-len(':int8')], True
+    return create_embedding_function(backend=backend, model=model, threads=threads, quantized=quantized)
+
+
+def _normalize(vectors: Any) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def evaluate(embedding_function: Any, documents: List[str], titles: List[str], eval_set: List[Tuple[str, str, str]],
+             ks: List[int], batch_size: int, latency_queries: int) -> Dict[str, Any]:
+    """Tek bir backend için recall@k, MRR ve encode gecikmelerini ölçer"""
+    document_vectors = []
+    start = time.perf_counter()
+    for offset in range(0, len(documents), batch_size):
+        document_vectors.extend(embedding_function(documents[offset:offset + batch_size]))
+    document_seconds = time.perf_counter() - start
+    document_vectors = _normalize(document_vectors)
+
+    query_vectors = _normalize(embedding_function([text for _, text, _ in eval_set]))
+    scores = query_vectors @ document_vectors.T
+    # Sıra = beklenen başlıklı en iyi kayıttan daha yüksek skor alan diğer doküman sayısı + 1
+    titles = np.array(titles)
+    expected = titles[None, :] == np.array([title for _, _, title in eval_set])[:, None]
+    target = np.where(expected, scores, -np.inf).max(axis=1)
+    ranks = ((scores > target[:, None]) & ~expected).sum(axis=1) + 1
+
+    results = {'dim': int(document_vectors.shape[1])}
+    types = np.array([query_type for query_type, _, _ in eval_set])
+    for query_type in ('all',) + QUERY_TYPES:
+        selected = ranks if query_type == 'all' else ranks[types == query_type]
+        if not len(selected):
+            continue
+        summary = {'queries': int(len(selected)), 'mrr': round(float((1.0 / selected).mean()), 4)}
+        for k in ks:
+            summary[f'recall@{k}'] = round(float((selected <= k).mean()), 4)
+        results[f'retrieval@{query_type}'] = summary
+
+    # Tek soru gecikmesi: sahadaki sorgu yolundaki gibi birer birer
+    samples = []
+    for _, text, _ in eval_set[:latency_queries]:
+        _, elapsed = timed(embedding_function, [text])
+        samples.append(elapsed)
+    results['query_encode'] = summarize(samples)
+    results['document_encode'] = {
+        'documents': len(documents),
+        'seconds': round(document_seconds, 3),
+        'documents_per_second': round(len(documents) / document_seconds, 1) if document_seconds else None,
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend'lerini recall@k ve gecikmeyle karşılaştır")
+    parser.add_argument('--backend', action='append', default=[],
+                        help="ad=tanım (birden fazla verilebilir; varsayılan: hashing)")
+    parser.add_argument('--data', default="data/turkiye_turizm_verileri.json")
+    parser.add_argument('--queries', default=DEFAULT_QUERIES, help="Elle yazılmış sorular (JSONL: query, baslik)")
+    parser.add_argument('--k', default='1,5,10', help="recall@k için k değerleri (virgülle)")
+    parser.add_argument('--threads', type=int, default=int(os.getenv('EMBEDDING_THREADS', '0')),
+                        help="Encoder thread sayısı (0 = kütüphane varsayılanı)")
+    parser.add_argument('--batch-size', type=int, default=64, help="Doküman embed batch boyutu")
+    parser.add_argument('--latency-queries', type=int, default=200, help="Gecikme ölçümündeki soru sayısı")
+    parser.add_argument('--output', default='embedding_bench.json')
+    args = parser.parse_args()
+    ks = [int(k) for k in args.k.split(',') if k]
+
+    from src.rag_pipeline import TurkiyeTourismRAG
+
+    records = load_seed_records(args.data)
+    documents = [TurkiyeTourismRAG.build_document(record) for record in records]
+    titles = [record.get('baslik', '') for record in records]
+    eval_set = build_eval_set(records, args.queries)
+    print(f"📊 Embedding karşılaştırması: {len(records)} kayıt, {len(eval_set)} soru")
+
+    results = {}
+    for entry in args.backend or ['hashing']:
+        name, _, spec = entry.partition('=')
+        spec = spec or name
+        print(f"⏳ {name} ({spec}) yükleniyor...")
+        embedding_function, load_seconds = timed(make_embedding_function, spec, args.threads)
+        # İlk çağrı (ısınma) ölçüme katılmaz
+        embedding_function([documents[0]])
+        results[name] = {'spec': spec, 'model_name': getattr(embedding_function, 'model_name', spec),
+                         'load_seconds': round(load_seconds, 3)}
+        results[name].update(evaluate(embedding_function, documents, titles, eval_set, ks,
+                                      args.batch_size, args.latency_queries))
+        overall = results[name]['retrieval@all']
+        print(f"  • {name}: " + ", ".join(f"recall@{k}={overall[f'recall@{k}']}" for k in ks)
+              + f", mrr={overall['mrr']}, query p50={results[name]['query_encode']['p50_ms']} ms"
+              + f", {results[name]['document_encode']['documents_per_second']} doküman/sn")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'records': len(records),
+            'queries': len(eval_set),
+            'threads': args.threads,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✓ Sonuçlar yazıldı: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Benchmark için sahte bileşenler
+
+- FakeGenerativeModel: Gemini GenerativeModel yerine ayarlanabilir gecikme
+  ve token streaming ile yanıt üretir
+- FakeGeminiServer: Gemini REST API'sini taklit eden yerel HTTP sunucusu;
+  gerçek SDK ve LLM istemcisi (zaman aşımı, hedge, yedek yanıt) ağ ve API
+  anahtarı olmadan bu sunucuya karşı çalıştırılabilir
+- HashingEmbeddingFunction: Model indirmeden çalışan deterministik embedding
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import numpy as np
+from chromadb import EmbeddingFunction
+
+
+class FakeResponse:
+    """generate_content yanıtını taklit eder (yalnızca .text)"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    genai.GenerativeModel yerine geçen sahte model
+
+    İlk token gecikmesi (`latency`) ve saniyedeki token sayısı
+    (`tokens_per_second`) ile gerçekçi bir yanıt süresi simüle eder.
+    """
+
+    def __init__(self, latency: float = 0.5, tokens_per_second: float = 200.0,
+                 response_tokens: int = 300, chunk_tokens: int = 20):
+        """
+        Args:
+            latency: İlk token'a kadar geçen süre (saniye)
+            tokens_per_second: Üretim hızı (0: anında)
+            response_tokens: Yanıttaki token sayısı
+            chunk_tokens: Streaming'de parça başına token sayısı
+        """
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.chunk_tokens = chunk_tokens
+        self.calls = 0
+
+    def _chunks(self, prompt: str) -> List[str]:
+        tokens = [f"<strong>yer{i % 50}</strong>" if i % 25 == 0 else f"kelime{i}"
+                  for i in range(self.response_tokens)]
+        return [" ".join(tokens[i:i + self.chunk_tokens]) + " "
+                for i in range(0, len(tokens), self.chunk_tokens)]
+
+    def _chunk_delay(self) -> float:
+        return self.chunk_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _stream(self, prompt: str) -> Iterator[FakeResponse]:
+        time.sleep(self.latency)
+        for chunk in self._chunks(prompt):
+            time.sleep(self._chunk_delay())
+            yield FakeResponse(chunk)
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        if stream:
+            return self._stream(prompt)
+        chunks = self._chunks(prompt)
+        time.sleep(self.latency + self._chunk_delay() * len(chunks))
+        return FakeResponse("".join(chunks))
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        self.calls += 1
+        chunks = self._chunks(prompt)
+        await asyncio.sleep(self.latency + self._chunk_delay() * len(chunks))
+        return FakeResponse("".join(chunks))
+
+
+class FakeGeminiServer:
+    """
+    generateContent ve streamGenerateContent uç noktalarını taklit eden HTTP sunucusu
+
+    İsteklerin `slow_rate` oranı `slow_latency` kadar (kuyruk gecikmesi),
+    `error_rate` oranı 503 ile yanıtlanır. SDK şu şekilde yönlendirilir:
+
+        genai.configure(api_key='test', transport='rest',
+                        client_options={'api_endpoint': server.url})
+
+    veya uygulamada GEMINI_API_ENDPOINT=server.url.
+    """
+
+    def __init__(self, latency: float = 0.2, slow_rate: float = 0.0, slow_latency: float = 5.0,
+                 error_rate: float = 0.0, response_tokens: int = 100, chunk_tokens: int = 20, seed: int = 0):
+        """
+        Args:
+            latency: Normal yanıt gecikmesi (saniye)
+            slow_rate: Yavaş yanıtlanan isteklerin oranı (0-1)
+            slow_latency: Yavaş yanıt gecikmesi (saniye)
+            error_rate: 503 ile yanıtlanan isteklerin oranı (0-1)
+            response_tokens: Yanıttaki token sayısı
+            chunk_tokens: Streaming'de parça başına token sayısı
+            seed: Rastgele gecikme/hata seçimi için tohum
+        """
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.response_tokens = response_tokens
+        self.chunk_tokens = chunk_tokens
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _plan_request(self):
+        """İstek için (gecikme, hata mı) seçer"""
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+            slow = self._random.random() < self.slow_rate
+            if failed:
+                self.errors += 1
+        return (self.slow_latency if slow else self.latency), failed
+
+    def _chunks(self) -> List[dict]:
+        tokens = [f"kelime{i}" for i in range(self.response_tokens)]
+        texts = [" ".join(tokens[i:i + self.chunk_tokens]) + " "
+                 for i in range(0, len(tokens), self.chunk_tokens)]
+        chunks = [{'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}]} for text in texts]
+        chunks[-1]['candidates'][0]['finishReason'] = 'STOP'
+        chunks[-1]['usageMetadata'] = {'promptTokenCount': 100, 'candidatesTokenCount': self.response_tokens}
+        return chunks
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                delay, failed = server._plan_request()
+                time.sleep(delay)
+                if failed:
+                    body = json.dumps({'error': {'code': 503, 'message': 'overloaded', 'status': 'UNAVAILABLE'}})
+                    status = 503
+                elif 'streamGenerateContent' in self.path:
+                    body, status = json.dumps(server._chunks()), 200
+                else:
+                    chunks = server._chunks()
+                    text = "".join(chunk['candidates'][0]['content']['parts'][0]['text'] for chunk in chunks)
+                    response = chunks[-1]
+                    response['candidates'][0]['content']['parts'][0]['text'] = text
+                    body, status = json.dumps(response), 200
+                payload = body.encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # İstemci zaman aşımıyla bağlantıyı kapattı
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FakeGeminiServer':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """
+    Kelime hash'lerinden deterministik embedding üretir
+
+    Anlamsal kalite taşımaz; indeks ve arama yolunun maliyetini model
+    indirmeden, CPU-only makinede ölçmek için kullanılır.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.model_name = f"hashing-{dim}"
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        embeddings = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+                value = int.from_bytes(digest, 'little')
+                vector[value % self.dim] += 1.0 if value & (1 << 63) else -1.0
+            norm = np.linalg.norm(vector)
+            embeddings.append(vector / norm if norm > 0 else vector)
+        return embeddings
+
+    @staticmethod
+    def name() -> str:
+        return "hashing"
+
+    def get_config(self):
+        return {'dim': self.dim}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashingEmbeddingFunction(dim=config.get('dim', 384))
@@ -0,0 +1,369 @@
+"""
+Retrieval ve uçtan uca gecikme benchmark'ı
+
+Gerçek Gemini API'si yerine ayarlanabilir gecikmeli sahte bir model
+(--llm-server ile Gemini SDK'sının bağlandığı yerel sahte REST sunucusu)
+kullanır; varsayılan olarak embedding de model indirmeden (hashing) yapılır.
+Böylece ölçümler ağ ve API anahtarı olmadan, CPU-only bir makinede
+tekrarlanabilir. Sonuçlar JSON olarak yazılır ve benchmarks.compare ile
+iki çalıştırma karşılaştırılabilir.
+
+Ölçülen aşamalar:
+- index_build: boş indekse ilk yükleme / değişiklik olmadan yeniden açılış
+- retrieve_context: soru başına bağlam getirme
+- build_prompt: prompt oluşturma (+ prompt boyutu)
+- vector_search@chroma / vector_search@compact: ham vektör araması, tam
+  (brute force) sonuca göre recall@k ve kompakt deponun dizi boyutları
+- api_chat@N: /api/chat uç noktası, N eşzamanlı istemci ile
+- aquery@N: N eşzamanlı rag.aquery çağrısı tek event loop'ta; async yol
+  LLM çağrılarını sıraya sokmuyorsa toplam süre tek çağrınınkine yakındır
+  (`wall_vs_single`; 2'yi aşarsa uyarı verilir)
+- llm_server: --llm-server ile sahte sunucuya giden istek ve hata sayısı
+  (yeniden deneme ve hedge çağrıları dahil)
+
+Kullanım:
+    python -m benchmarks.run --records 10000 --concurrency 1,8,32 --output bench.json
+    LLM_HEDGE=1 python -m benchmarks.run --llm-server --llm-slow-rate 0.05 --llm-slow-latency 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.fakes import FakeGeminiServer, FakeGenerativeModel, HashingEmbeddingFunction
+from benchmarks.synthetic_data import load_seed_records, write_dataset
+
+BENCHMARK_QUERIES = [
+    "İstanbul'da görülmesi gereken yerler nelerdir?",
+    "Kapadokya'da ne yapabilirim?",
+    "Pamukkale hakkında bilgi verir misin?",
+    "Ege bölgesindeki antik kentler hangileri?",
+    "Topkapı Sarayı giriş ücreti ne kadar?",
+    "Karadeniz'de doğa yürüyüşü için öneriler",
+    "Van Kahvaltısı neden ünlüdür?",
+    "Nemrut Dağı'nda gün doğumu",
+    "Göbeklitepe nerededir ve önemi nedir?",
+    "Antalya'da tarihi yerler",
+    "UNESCO Dünya Mirası listesindeki yerler",
+    "Gaziantep mutfağı hakkında bilgi",
+    "Mardin'de gezilecek yerler",
+    "Trabzon Sümela Manastırı ziyaret saatleri",
+    "Bodrum'da ne yapılır?",
+    "Doğu Anadolu'daki kaleler",
+]
+
+
+def summarize(samples: List[float], wall_seconds: float = None) -> Dict[str, Any]:
+    """Gecikme örneklerinden (saniye) p50/p95/p99 ve throughput özetini çıkarır"""
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    summary = {
+        'count': len(samples),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+    if wall_seconds:
+        summary['throughput_rps'] = round(len(samples) / wall_seconds, 3)
+    return summary
+
+
+def timed(func, *args, **kwargs):
+    """Fonksiyonu çalıştırır, (sonuç, süre_saniye) döndürür"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+async def timed_async(awaitable):
+    """Awaitable'ı bekler ve (sonuç, süre) döndürür"""
+    start = time.perf_counter()
+    result = await awaitable
+    return result, time.perf_counter() - start
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def make_embedding_function(kind: str):
+    if kind == 'hashing':
+        return HashingEmbeddingFunction()
+    # Model, thread sayısı ve int8 seçimi EMBEDDING_* değişkenlerinden okunur
+    from src.embeddings import create_embedding_function
+    return create_embedding_function(backend=kind)
+
+
+def bench_index_build(args, data_path: str, workdir: str, model) -> Dict[str, Any]:
+    """Soğuk indeks kurulumu ve değişiklik olmadan yeniden açılış süresi"""
+    from src.rag_pipeline import TurkiyeTourismRAG
+
+    persist_dir = os.path.join(workdir, 'index')
+    embedding_function = make_embedding_function(args.embedding)
+
+    rag, cold = timed(TurkiyeTourismRAG, api_key='offline', data_path=data_path,
+                      persist_dir=persist_dir, model=model, embedding_function=embedding_function)
+    rag, warm = timed(TurkiyeTourismRAG, api_key='offline', data_path=data_path,
+                      persist_dir=persist_dir, model=model, embedding_function=embedding_function)
+
+    results = {
+        'cold_seconds': round(cold, 3),
+        'cold_records_per_second': round(args.records / cold, 1),
+        'warm_seconds': round(warm, 3),
+    }
+    return rag, results
+
+
+def bench_retrieval(args, rag) -> Dict[str, Any]:
+    """retrieve_context ve build_prompt gecikmesi"""
+    # Embedding önbelleği kapatılır; her sorgu encoder'ı çalıştırır
+    rag.query_embedding_cache_size = 0
+    rag._query_embedding_cache.clear()
+
+    retrieve_samples, prompt_samples, prompt_chars = [], [], []
+    for _ in range(args.iterations):
+        for query in BENCHMARK_QUERIES:
+            docs, elapsed = timed(rag.retrieve_context, query, 4)
+            retrieve_samples.append(elapsed)
+            prompt, elapsed = timed(rag.build_prompt, query, docs)
+            prompt_samples.append(elapsed)
+            prompt_chars.append(len(prompt))
+
+    prompt_summary = summarize(prompt_samples)
+    prompt_summary['mean_prompt_chars'] = round(float(np.mean(prompt_chars)), 1)
+    return {
+        'retrieve_context': summarize(retrieve_samples),
+        'build_prompt': prompt_summary,
+    }
+
+
+def bench_vector_store(args, rag, workdir: str) -> Dict[str, Any]:
+    """ChromaDB ile kompakt (int8 + tam yeniden skorlama) deponun gecikme ve recall karşılaştırması"""
+    from src.vector_store import CompactVectorStore
+
+    compact = CompactVectorStore.build(rag.collection, os.path.join(workdir, 'compact'))
+    embeddings = [np.asarray(embedding, dtype=np.float32) for embedding in rag.embed_queries(BENCHMARK_QUERIES)]
+    k = args.recall_k
+
+    # Doğru cevap: float32 vektörler üzerinde tam kare L2 sıralaması
+    vectors = np.asarray(compact.vectors)
+    expected = []
+    for embedding in embeddings:
+        distances = np.einsum('ij,ij->i', vectors - embedding, vectors - embedding)
+        expected.append(set(compact.ids[np.argsort(distances)[:k]].tolist()))
+
+    results = {}
+    for name, store in (('chroma', rag.collection), ('compact', compact)):
+        samples, recalls = [], []
+        for _ in range(args.iterations):
+            for embedding, truth in zip(embeddings, expected):
+                found, elapsed = timed(store.query, query_embeddings=[embedding.tolist()], n_results=k)
+                samples.append(elapsed)
+                recalls.append(len(set(found['ids'][0]) & truth) / k)
+        summary = summarize(samples)
+        summary[f'recall@{k}'] = round(float(np.mean(recalls)), 4)
+        results[f'vector_search@{name}'] = summary
+
+    sizes = compact.memory_bytes()
+    results['vector_search@compact'].update({
+        'scan_mb': round(sizes['scan'] / 1e6, 2),
+        'float32_mb': round(sizes['vectors'] / 1e6, 2),
+        'records_mb': round(sizes['records'] / 1e6, 2),
+    })
+    return results
+
+
+def bench_api_chat(args, rag) -> Dict[str, Any]:
+    """/api/chat uç noktası, farklı eşzamanlılık seviyelerinde"""
+    os.environ.setdefault('SESSION_STORE', 'memory')
+    import app as flask_module
+
+    flask_module.rag_instance = rag
+    flask_module.readiness.mark_ready()
+    rag.response_cache.max_entries = args.response_cache_size
+    results = {}
+
+    for concurrency in args.concurrency:
+        rag.response_cache.clear()
+        local = threading.local()
+        counter = iter(range(args.chat_requests))
+        lock = threading.Lock()
+
+        def worker():
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = flask_module.app.test_client()
+            samples = []
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return samples
+                query = BENCHMARK_QUERIES[index % len(BENCHMARK_QUERIES)]
+                response, elapsed = timed(client.post, '/api/chat', json={'message': query})
+                if response.status_code == 200:
+                    samples.append(elapsed)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(worker) for _ in range(concurrency)]
+            samples = [sample for future in futures for sample in future.result()]
+        wall = time.perf_counter() - start
+
+        summary = summarize(samples, wall) if samples else {'count': 0}
+        summary['errors'] = args.chat_requests - len(samples)
+        results[f'api_chat@{concurrency}'] = summary
+    return results
+
+
+def bench_aquery(args, rag) -> Dict[str, Any]:
+    """N eşzamanlı aquery çağrısı: toplam süre tek çağrının süresine yakın olmalı"""
+    rag.response_cache.max_entries = 0
+    results = {}
+
+    async def run(count):
+        calls = [timed_async(rag.aquery(BENCHMARK_QUERIES[index % len(BENCHMARK_QUERIES)])) for index in range(count)]
+        return await asyncio.gather(*calls)
+
+    single = asyncio.run(run(1))[0][1]
+    for concurrency in args.concurrency:
+        start = time.perf_counter()
+        outcomes = asyncio.run(run(concurrency))
+        wall = time.perf_counter() - start
+        summary = summarize([elapsed for _, elapsed in outcomes], wall)
+        paths = {}
+        for result, _ in outcomes:
+            paths[result['path']] = paths.get(result['path'], 0) + 1
+        summary['paths'] = paths
+        summary['wall_vs_single'] = round(wall / single, 2) if single else None
+        if summary['wall_vs_single'] is not None and summary['wall_vs_single'] > 2:
+            print(f"⚠️ aquery@{concurrency}: {concurrency} eşzamanlı çağrı tek çağrının "
+                  f"{summary['wall_vs_single']} katı sürdü (LLM çağrıları sıraya giriyor)")
+        results[f'aquery@{concurrency}'] = summary
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TürkiyeGPT offline benchmark")
+    parser.add_argument('--records', type=int, default=10000,
+                        help="Sentetik veri seti boyutu (0: gerçek veri seti)")
+    parser.add_argument('--embedding', choices=['hashing', 'sentence-transformers', 'onnx'], default='hashing')
+    parser.add_argument('--iterations', type=int, default=5, help="Retrieval tekrar sayısı")
+    parser.add_argument('--recall-k', type=int, default=8, help="Vektör araması recall@k için k")
+    parser.add_argument('--concurrency', default='1,4,16',
+                        help="/api/chat için eşzamanlılık seviyeleri (virgülle)")
+    parser.add_argument('--chat-requests', type=int, default=64,
+                        help="Her eşzamanlılık seviyesinde toplam istek")
+    parser.add_argument('--llm-latency', type=float, default=0.3, help="Sahte modelin ilk token gecikmesi (s)")
+    parser.add_argument('--llm-tokens-per-second', type=float, default=400.0)
+    parser.add_argument('--llm-response-tokens', type=int, default=300)
+    parser.add_argument('--llm-server', action='store_true',
+                        help="Sahte model yerine Gemini SDK'sını yerel sahte REST sunucusuna bağla")
+    parser.add_argument('--llm-slow-rate', type=float, default=0.0,
+                        help="--llm-server: yavaş yanıtlanan isteklerin oranı")
+    parser.add_argument('--llm-slow-latency', type=float, default=5.0,
+                        help="--llm-server: yavaş yanıt gecikmesi (s)")
+    parser.add_argument('--llm-error-rate', type=float, default=0.0,
+                        help="--llm-server: 503 ile yanıtlanan isteklerin oranı")
+    parser.add_argument('--response-cache-size', type=int, default=0,
+                        help="Yanıt önbelleği boyutu (varsayılan 0: her istek LLM'e gider)")
+    parser.add_argument('--workdir', default=None, help="Geçici dosyalar (varsayılan: tmp)")
+    parser.add_argument('--output', default='bench_output.json')
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(',') if level]
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='turkiyegpt-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    server = None
+    if args.llm_server:
+        import google.generativeai as genai
+        server = FakeGeminiServer(
+            latency=args.llm_latency,
+            slow_rate=args.llm_slow_rate,
+            slow_latency=args.llm_slow_latency,
+            error_rate=args.llm_error_rate,
+            response_tokens=args.llm_response_tokens
+        ).start()
+        genai.configure(api_key='offline', transport='rest', client_options={'api_endpoint': server.url})
+        model = genai.GenerativeModel('gemini-2.5-flash')
+    else:
+        model = FakeGenerativeModel(
+            latency=args.llm_latency,
+            tokens_per_second=args.llm_tokens_per_second,
+            response_tokens=args.llm_response_tokens
+        )
+
+    try:
+        if args.records > 0:
+            data_path = os.path.join(workdir, 'dataset.json')
+            write_dataset(data_path, args.records, seed_records=load_seed_records())
+        else:
+            data_path = "data/turkiye_turizm_verileri.json"
+            args.records = len(load_seed_records(data_path))
+
+        print(f"📊 Benchmark: {args.records} kayıt, embedding={args.embedding}")
+        rag, build_results = bench_index_build(args, data_path, workdir, model)
+
+        results = {'index_build': build_results}
+        results.update(bench_retrieval(args, rag))
+        results.update(bench_vector_store(args, rag, workdir))
+        results.update(bench_api_chat(args, rag))
+        if server is not None:
+            # SDK'nın REST transport'unda async çağrı event loop'u bloklar
+            rag.llm.async_native = False
+        results.update(bench_aquery(args, rag))
+        if server is not None:
+            results['llm_server'] = {'requests': server.requests, 'errors': server.errors}
+        for stage, summary in results.items():
+            print(f"  • {stage}: {summary}")
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'records': args.records,
+                'embedding': args.embedding,
+                'llm_latency': args.llm_latency,
+                'llm_tokens_per_second': args.llm_tokens_per_second,
+                'llm_response_tokens': args.llm_response_tokens,
+                'llm_server': args.llm_server,
+                'llm_slow_rate': args.llm_slow_rate,
+                'llm_error_rate': args.llm_error_rate,
+                'response_cache_size': args.response_cache_size,
+                'iterations': args.iterations,
+                'chat_requests': args.chat_requests,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✓ Sonuçlar yazıldı: {args.output}")
+    finally:
+        if server is not None:
+            server.stop()
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
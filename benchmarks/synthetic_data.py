@@ -0,0 +1,86 @@
+"""
+Sentetik veri seti üretici
+
+`turkiye_turizm_verileri.json` ile aynı şemada, gerçek kayıtların
+alanlarını karıştırarak istenen boyutta (10k-1M) veri üretir. Büyük veri
+setleri bellekte tutulmadan doğrudan diske yazılır.
+
+Kullanım:
+    python -m benchmarks.synthetic_data --records 100000 --output /tmp/turizm_100k.json
+"""
+
+import argparse
+import json
+import random
+from typing import Any, Dict, Iterator, List
+
+DEFAULT_SOURCE = "data/turkiye_turizm_verileri.json"
+
+
+def load_seed_records(path: str = DEFAULT_SOURCE) -> List[Dict[str, Any]]:
+    """Sentetik üretimde kullanılacak gerçek kayıtları okur"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generate_records(count: int, seed_records: List[Dict[str, Any]],
+                     seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """
+    Gerçek kayıtlardan türetilmiş `count` adet sentetik kayıt üretir
+
+    Şehir/bölge tutarlılığı korunur; açıklama ve özellikler farklı
+    kayıtlardan karıştırılır. Aynı `seed` her zaman aynı veriyi üretir.
+    """
+    rng = random.Random(seed)
+    for index in range(count):
+        base = seed_records[index % len(seed_records)]
+        donor = rng.choice(seed_records)
+        features = list(base.get('ozellikler', [])) + rng.sample(
+            donor.get('ozellikler', []), k=min(2, len(donor.get('ozellikler', [])))
+        )
+        yield {
+            'id': index + 1,
+            'sehir': base['sehir'],
+            'bolge': base['bolge'],
+            'kategori': rng.choice([base['kategori'], donor['kategori']]),
+            'baslik': f"{base['baslik']} #{index + 1}",
+            'aciklama': f"{base['aciklama']} {donor['aciklama']}",
+            'tarih': rng.choice([base.get('tarih', 'Bilinmiyor'), donor.get('tarih', 'Bilinmiyor')]),
+            'ozellikler': features,
+            'ziyaret_saatleri': rng.choice([base, donor]).get('ziyaret_saatleri', 'Bilgi yok'),
+            'giris_ucreti': rng.choice([base, donor]).get('giris_ucreti', 'Bilgi yok')
+        }
+
+
+def write_dataset(path: str, count: int, seed_records: List[Dict[str, Any]] = None,
+                  seed: int = 42, jsonl: bool = False):
+    """Sentetik veri setini JSON dizisi veya JSONL olarak diske yazar"""
+    if seed_records is None:
+        seed_records = load_seed_records()
+    with open(path, 'w', encoding='utf-8') as f:
+        if not jsonl:
+            f.write('[\n')
+        for index, record in enumerate(generate_records(count, seed_records, seed)):
+            line = json.dumps(record, ensure_ascii=False)
+            if jsonl:
+                f.write(line + '\n')
+            else:
+                f.write(('  ' if index == 0 else ',\n  ') + line)
+        if not jsonl:
+            f.write('\n]\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentetik turizm veri seti üretir")
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jsonl', action='store_true', help="JSON dizisi yerine JSONL yaz")
+    args = parser.parse_args()
+
+    write_dataset(args.output, args.records, seed=args.seed, jsonl=args.jsonl)
+    print(f"✓ {args.records} kayıt yazıldı: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Gunicorn konfigürasyonu
+
+Embedding modeli master süreçte fork öncesinde bir kez yüklenir ve
+worker'lar model ağırlıklarını copy-on-write olarak paylaşır; böylece her
+yeni worker'ın bellek maliyeti yaklaşık yalnızca Flask uygulaması kadar olur.
+
+ChromaDB'nin Rust çekirdeği fork güvenli olmadığından master indekse
+dokunmaz: fork sonrasında worker'lardan biri indeksi ayrı bir süreçte
+senkronize eder, her worker diskteki indeksi arka planda embedding
+yapmadan açar (bkz. app.open_rag_index).
+
+Kullanım:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Model master'da bir kez yüklenir
+preload_app = True
+os.environ['RAG_PRELOAD'] = '1'
+
+# Fork sonrası tokenizer thread havuzu kilitlenmesin
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+
+def when_ready(server):
+    """Fork öncesi yüklenen nesneleri GC takibinden çıkarır"""
+    # gc.freeze() olmadan worker'lardaki çöp toplama, paylaşılan nesnelerin
+    # başlıklarına yazarak copy-on-write sayfalarını kopyalatır.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Her worker'da fork güvenli olmayan kaynakları açar"""
+    import app as flask_app
+
+    try:
+        import torch
+        torch.set_num_threads(int(os.getenv('TORCH_THREADS_PER_WORKER', '1')))
+    except ImportError:
+        pass
+
+    # İndeks arka planda senkronize edilip açılır; worker bu sırada statik
+    # sayfalara ve /healthz'e yanıt verir, /readyz hazır olunca 200 döner
+    if flask_app.open_rag_index() is not None:
+        server.log.info("Worker %s: vektör indeksi arka planda açılıyor", worker.pid)
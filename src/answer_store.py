@@ -0,0 +1,151 @@
+"""
+Answer Store
+Önceden hesaplanmış (warm-up) yanıtları worker'lar arasında paylaşılan
+bir SQLite dosyasında tutar.
+
+Her yanıt, normalize edilmiş soru metniyle anahtarlanır ve üretildiği
+veri seti ile prompt sürümünü taşır. Sürümü eski kalan yanıtlar yine de
+döndürülür; yenilenmeleri çağıranın (bkz. src.warmup) sorumluluğundadır.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.gazetteer import turkish_casefold
+
+WORD = re.compile(r'\w+')
+
+
+def normalize_query(query: str) -> str:
+    """
+    Soruyu anahtar olarak kullanılacak biçime getirir
+
+    Büyük/küçük harf, noktalama ve boşluk farkları yok sayılır
+    ("Kapadokya'da ne yapılır?" == "kapadokya da ne yapılır").
+    """
+    return " ".join(WORD.findall(turkish_casefold(query)))
+
+
+class AnswerStore:
+    """
+    SQLite tabanlı kalıcı yanıt deposu
+
+    Aynı soruyu birden fazla worker'ın aynı anda hesaplamaması için kısa
+    süreli sahiplenme (claim) kayıtları da burada tutulur.
+    """
+
+    def __init__(self, db_path: str = "answers.db"):
+        """
+        Args:
+            db_path: SQLite dosya yolu
+        """
+        self.db_path = db_path
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    query_key TEXT PRIMARY KEY,
+                    n_results INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    dataset_version TEXT,
+                    prompt_version TEXT,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS claims (
+                    query_key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+            """)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, query_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Kayıtlı yanıtı döndürür
+
+        Returns:
+            {'result', 'n_results', 'dataset_version', 'prompt_version', 'updated_at'}
+            veya kayıt yoksa None
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT result, n_results, dataset_version, prompt_version, updated_at "
+                "FROM answers WHERE query_key = ?", (query_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'result': json.loads(row[0]),
+            'n_results': row[1],
+            'dataset_version': row[2],
+            'prompt_version': row[3],
+            'updated_at': row[4],
+        }
+
+    def put(self, query_key: str, n_results: int, result: Dict[str, Any],
+            dataset_version: str, prompt_version: str):
+        """Yanıtı ekler veya günceller"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT INTO answers (query_key, n_results, result, dataset_version, prompt_version, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(query_key) DO UPDATE SET n_results = excluded.n_results, "
+                    "result = excluded.result, dataset_version = excluded.dataset_version, "
+                    "prompt_version = excluded.prompt_version, updated_at = excluded.updated_at",
+                    (query_key, n_results, json.dumps(result, ensure_ascii=False),
+                     dataset_version, prompt_version, time.time())
+                )
+
+    def claim(self, query_keys: Iterable[str], owner: str, ttl_seconds: float = 600) -> List[str]:
+        """
+        Başka bir süreç tarafından hesaplanmakta olmayan soruları sahiplenir
+
+        Returns:
+            Bu süreç adına sahiplenilen anahtarlar
+        """
+        now = time.time()
+        claimed = []
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for query_key in query_keys:
+                    cursor = connection.execute(
+                        "INSERT INTO claims (query_key, owner, expires_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(query_key) DO UPDATE SET owner = excluded.owner, "
+                        "expires_at = excluded.expires_at WHERE claims.expires_at < ?",
+                        (query_key, owner, now + ttl_seconds, now)
+                    )
+                    if cursor.rowcount:
+                        claimed.append(query_key)
+        return claimed
+
+    def release(self, query_keys: Iterable[str], owner: str):
+        """Sahiplenmeleri bırakır"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "DELETE FROM claims WHERE query_key = ? AND owner = ?",
+                    [(query_key, owner) for query_key in query_keys]
+                )
+
+    def count(self) -> int:
+        """Kayıtlı yanıt sayısı"""
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
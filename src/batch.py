@@ -0,0 +1,105 @@
+"""
+Batch Query Helpers
+Toplu soru yanıtlama (query_batch, /api/batch) için hız sınırlama ve
+yeniden deneme yardımcıları.
+
+Binlerce soru çevrimdışı işlenirken Gemini çağrıları eşzamanlı yapılır;
+RateLimiter saniyedeki çağrı sayısını API kotasının altında tutar.
+backoff_delay, LLMClient'ın geçici hataları (kota aşımı, zaman aşımı)
+yeniden denerken beklediği üstel süreyi hesaplar.
+"""
+
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+
+class RateLimiter:
+    """
+    Token bucket hız sınırlayıcı (thread güvenli)
+
+    Saniyede en fazla `rate` çağrıya izin verir; `burst` kadar çağrı
+    bekleme olmadan art arda yapılabilir.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Saniyedeki en fazla çağrı (0: sınırsız)
+            burst: Art arda yapılabilecek en fazla çağrı
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bir çağrı hakkı alır; gerekirse hak açılana kadar bekler"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Hak ayrılır; eksi bakiye, sıradaki çağrıların bekleme süresidir
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 30.0) -> float:
+    """
+    Yeniden deneme öncesi bekleme süresi (saniye)
+
+    Süre her denemede iki katına çıkar, max_delay ile sınırlanır ve
+    eşzamanlı hataların aynı anda yeniden denenmemesi için rastgele
+    %50'ye kadar kısaltılır (jitter).
+
+    Args:
+        attempt: Yeniden deneme numarası (1'den başlar)
+    """
+    delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def parse_batch_lines(lines: Iterable[Any]) -> Iterator[Tuple[Any, str]]:
+    """
+    JSONL toplu istek satırlarını (ID, soru) ikililerine çevirir
+
+    Her satır bir JSON metni ("Ayasofya nerede?") veya
+    {"id": ..., "query": ...} nesnesidir; boş satırlar atlanır. ID
+    verilmemişse satır sırası (0'dan) kullanılır.
+
+    Raises:
+        ValueError: Satır geçerli JSON değilse veya soru içermiyorsa
+    """
+    index = 0
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{line_number}. satır geçerli JSON değil: {e}") from e
+
+        if isinstance(item, dict):
+            query = item.get('query') or item.get('message')
+            item_id = item.get('id', index)
+        else:
+            query, item_id = item, index
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError(f"{line_number}. satırda soru yok")
+        yield item_id, query.strip()
+        index += 1
+
+
+def batch_result_line(result: Dict[str, Any]) -> str:
+    """Sonucu JSONL satırı olarak biçimlendirir"""
+    return json.dumps(result, ensure_ascii=False) + "\n"
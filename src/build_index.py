@@ -0,0 +1,182 @@
+"""
+Paralel İndeks Kurulumu
+Veri setini çok çekirdekli makinelerde süreç havuzuyla embed eder.
+
+Dokümanlar load_data'nın okuduğu sabit boyutlu batch'ler halinde
+worker süreçlerine dağıtılır; her worker embedding modelini bir kez
+yükler ve batch'i sabit encode batch boyutuyla kodlar. Sonuçlar okunma
+sırasıyla toplanıp indekse yazılır. Batch sınırları ve encode batch boyutu
+worker sayısından bağımsız olduğundan, aynı veri ve modelle oluşan indeks
+worker sayısından bağımsız olarak aynıdır.
+
+Kullanım:
+    python -m src.build_index --workers 8 --rebuild
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, List
+
+import numpy as np
+
+# Worker sürecindeki embedding fonksiyonu (initializer'da bir kez oluşturulur)
+_worker_embedding_function = None
+_worker_encode_batch_size = None
+
+
+def _init_worker(embedding_class, embedding_config, encode_batch_size: int, threads: int):
+    """Worker sürecinde thread sayısını sınırlar ve embedding modelini yükler"""
+    global _worker_embedding_function, _worker_encode_batch_size
+
+    # Her worker'a düşen çekirdek sayısı kadar thread (aşırı abonelik olmasın)
+    for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[variable] = str(threads)
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    if 'threads' in embedding_config:
+        # ONNX backend thread sayısını kendi oturum ayarından alır
+        embedding_config = dict(embedding_config, threads=threads)
+
+    _worker_embedding_function = embedding_class.build_from_config(embedding_config)
+    _worker_encode_batch_size = encode_batch_size
+
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(threads)
+
+
+def _encode(documents: List[str]) -> np.ndarray:
+    """Bir doküman batch'ini worker sürecinde embed eder"""
+    model = getattr(_worker_embedding_function, '_model', None)
+    if model is not None and hasattr(model, 'encode'):
+        # sentence-transformers: ChromaDB ile aynı ayarlar, ayarlanabilir batch boyutu
+        embeddings = model.encode(
+            list(documents),
+            batch_size=_worker_encode_batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=getattr(_worker_embedding_function, 'normalize_embeddings', False)
+        )
+    else:
+        embeddings = _worker_embedding_function(list(documents))
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+class ParallelEmbedder:
+    """
+    Doküman batch'lerini süreç havuzunda embed eder
+
+    load_data'nın `embed_batches` sözleşmesine uyar: batch'leri alır,
+    embedding'leri aynı sırayla döndürür. Bellekte en fazla `max_pending`
+    batch bekler; veri seti boyutundan bağımsızdır.
+    """
+
+    def __init__(self, embedding_function: Any, workers: int = None, encode_batch_size: int = 64,
+                 max_pending: int = None):
+        """
+        Args:
+            embedding_function: ChromaDB embedding fonksiyonu (get_config/build_from_config desteklemeli)
+            workers: Süreç sayısı (varsayılan: CPU sayısı)
+            encode_batch_size: Model içindeki encode batch boyutu
+            max_pending: Aynı anda işlenen en fazla batch (varsayılan: 2 x workers)
+        """
+        self.embedding_function = embedding_function
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.encode_batch_size = encode_batch_size
+        self._executor = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Süreç havuzu; embed edilecek ilk batch geldiğinde başlatılır"""
+        if self._executor is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # ChromaDB ve torch fork güvenli değildir
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(type(self.embedding_function), self.embedding_function.get_config(),
+                          self.encode_batch_size, threads)
+            )
+        return self._executor
+
+    def __call__(self, document_batches: Iterable[List[str]]) -> Iterator[List[Any]]:
+        # Değişiklik olmayan (boş) batch'ler havuza gönderilmez
+        pending = deque()
+        for documents in document_batches:
+            pending.append(self.executor.submit(_encode, documents) if documents else None)
+            if len(pending) >= self.max_pending:
+                yield self._result(pending.popleft())
+        while pending:
+            yield self._result(pending.popleft())
+
+    @staticmethod
+    def _result(future) -> List[Any]:
+        return [] if future is None else list(future.result())
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_index(data_path: str = "data/turkiye_turizm_verileri.json", persist_dir: str = None,
+                workers: int = None, encode_batch_size: int = 64, rebuild: bool = False,
+                embedding_function: Any = None):
+    """
+    İndeksi süreç havuzuyla kurar veya günceller
+
+    Returns:
+        (istatistikler, geçen süre) ikilisi
+    """
+    from src.rag_pipeline import TurkiyeTourismRAG
+
+    # Ana süreç yalnızca okuma, karşılaştırma ve yazım yapar
+    rag = TurkiyeTourismRAG(
+        api_key=os.getenv('GEMINI_API_KEY') or 'build-index',
+        data_path=data_path,
+        persist_dir=persist_dir,
+        open_index=False,
+        embedding_function=embedding_function
+    )
+
+    start = time.perf_counter()
+    with ParallelEmbedder(rag.embedding_function, workers=workers,
+                          encode_batch_size=encode_batch_size) as embedder:
+        stats = rag.initialize_database(rebuild=rebuild, embed_batches=embedder)
+    return stats, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TürkiyeGPT paralel indeks kurulumu")
+    parser.add_argument('--data', default="data/turkiye_turizm_verileri.json",
+                        help="Veri dosyası (JSON dizisi veya JSONL)")
+    parser.add_argument('--persist-dir', default=None, help="İndeks klasörü (varsayılan: CHROMA_PERSIST_DIR)")
+    parser.add_argument('--workers', type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument('--encode-batch-size', type=int, default=64, help="Model encode batch boyutu")
+    parser.add_argument('--rebuild', action='store_true', help="Mevcut indeksi silip sıfırdan kur")
+    args = parser.parse_args()
+
+    stats, elapsed = build_index(
+        data_path=args.data,
+        persist_dir=args.persist_dir,
+        workers=args.workers,
+        encode_batch_size=args.encode_batch_size,
+        rebuild=args.rebuild
+    )
+    embedded = stats['added'] + stats['updated']
+    print(f"✓ {embedded} doküman {elapsed:.1f} sn'de embed edildi "
+          f"({embedded / elapsed:.0f} doküman/sn, {args.workers or os.cpu_count()} worker)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Context Packer
+Getirilen kayıtları token bütçesine sığacak şekilde prompt bağlamına dönüştürür.
+
+İndeksteki doküman metni embedding için hazırlanmış, girintili bir
+şablondur. Prompt'a bu metin yerine her kayıt için sıkıştırılmış bir özet
+yazılır:
+
+1. Her kaynak için başlık satırı ve soruyla en ilgili açıklama cümlesi
+   (kullanıcıya gösterilen hiçbir kaynak prompt'tan düşmez)
+2. Kalan bütçe, retrieve_context sırasıyla üst sıradaki kayıtlara
+   pratik bilgiler (tarih, özellikler, saatler, ücret) ve soruyla ilgili
+   diğer cümleler olarak dağıtılır
+
+Daha önceki bir kayıtta geçen cümleler tekrar yazılmaz.
+"""
+
+import math
+import re
+from typing import Any, Callable, Dict, List
+
+from src.gazetteer import turkish_casefold
+
+# Gemini tokenizer'ı çevrimdışı kullanılamadığından Türkçe metin için ortalama
+# karakter/token oranıyla tahmin yapılır
+CHARS_PER_TOKEN = 3.5
+
+FIELD_LABELS = {
+    'Şehir': 'sehir',
+    'Bölge': 'bolge',
+    'Kategori': 'kategori',
+    'Başlık': 'baslik',
+    'Açıklama': 'aciklama',
+    'Tarih': 'tarih',
+    'Özellikler': 'ozellikler',
+    'Ziyaret Saatleri': 'ziyaret_saatleri',
+    'Giriş Ücreti': 'giris_ucreti',
+}
+
+# Şablonun eksik alanlar için yazdığı değerler
+MISSING_VALUES = {'', 'Bilinmiyor', 'Bilgi yok'}
+
+DETAIL_FIELDS = (
+    ('tarih', 'Tarih'),
+    ('ozellikler', 'Özellikler'),
+    ('ziyaret_saatleri', 'Ziyaret'),
+    ('giris_ucreti', 'Ücret'),
+)
+
+# Cümle seçiminde dikkate alınmayan sık kelimeler
+STOPWORDS = {
+    'bir', 've', 'ile', 'için', 'bu', 'da', 'de', 'ne', 'nedir', 'nelerdir', 'hangi',
+    'hangileri', 'mi', 'mı', 'mu', 'mü', 'var', 'olan', 'gibi', 'daha', 'en', 'çok',
+    'hakkında', 'bilgi', 'verir', 'misin', 'nerede', 'nereleri', 'yer', 'yerler',
+}
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'\w+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Metnin yaklaşık token sayısı"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def parse_document(document: str) -> Dict[str, str]:
+    """
+    build_document şablonundan üretilmiş metni alanlarına ayırır
+
+    Returns:
+        {'sehir': ..., 'baslik': ..., 'aciklama': ..., ...}
+    """
+    fields = {}
+    for line in document.splitlines():
+        label, separator, value = line.strip().partition(': ')
+        if separator and label in FIELD_LABELS:
+            fields[FIELD_LABELS[label]] = value.strip()
+    return fields
+
+
+def _terms(text: str) -> set:
+    return {
+        word for word in WORD.findall(turkish_casefold(text))
+        if len(word) > 2 and word not in STOPWORDS
+    }
+
+
+def _sentence_key(sentence: str) -> str:
+    return " ".join(WORD.findall(turkish_casefold(sentence)))
+
+
+class ContextPacker:
+    """
+    Bağlam dokümanlarını token bütçesine göre paketler
+    """
+
+    def __init__(self, token_budget: int = 1200, max_sentences: int = 4,
+                 token_counter: Callable[[str], int] = estimate_tokens):
+        """
+        Args:
+            token_budget: Bağlam metni için hedef token sayısı
+            max_sentences: Bir kayıttan alınacak en fazla açıklama cümlesi
+            token_counter: Token sayma fonksiyonu (varsayılan: karakter tabanlı tahmin)
+        """
+        self.token_budget = token_budget
+        self.max_sentences = max_sentences
+        self.count_tokens = token_counter
+
+    def _ranked_sentences(self, description: str, query_terms: set) -> List[tuple]:
+        """
+        Açıklama cümlelerini soruyla ilgisine göre sıralar
+
+        Returns:
+            (orijinal_sıra, cümle) listesi; en ilgili cümle başta
+        """
+        sentences = [s.strip() for s in SENTENCE_BOUNDARY.split(description) if s.strip()]
+        scored = [
+            (-len(_terms(sentence) & query_terms), position, sentence)
+            for position, sentence in enumerate(sentences)
+        ]
+        scored.sort()
+        return [(position, sentence) for _, position, sentence in scored]
+
+    @staticmethod
+    def _header(fields: Dict[str, str], metadata: Dict[str, Any]) -> str:
+        baslik = fields.get('baslik') or metadata.get('baslik', 'Bilinmiyor')
+        sehir = fields.get('sehir') or metadata.get('sehir', '')
+        bolge = fields.get('bolge') or metadata.get('bolge', '')
+        kategori = fields.get('kategori') or metadata.get('kategori', '')
+        location = f"{sehir} ({bolge})" if bolge else sehir
+        return f"■ {baslik} — {location} · {kategori}"
+
+    @staticmethod
+    def _details(fields: Dict[str, str]) -> str:
+        parts = [
+            f"{label}: {fields[field]}"
+            for field, label in DETAIL_FIELDS
+            if fields.get(field, '') not in MISSING_VALUES
+        ]
+        return " | ".join(parts)
+
+    @staticmethod
+    def _render(entry: Dict[str, Any]) -> str:
+        lines = [entry['header']]
+        if entry['sentences']:
+            lines.append(" ".join(sentence for _, sentence in sorted(entry['sentences'])))
+        if entry['details']:
+            lines.append(entry['details'])
+        return "\n".join(lines)
+
+    def pack(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
+        """
+        Bağlam dokümanlarını bütçeye sığan kompakt metne dönüştürür
+
+        Args:
+            query: Kullanıcının sorusu
+            context_docs: retrieve_context sonucu (önceliğe ve sıralama skoruna göre sıralı)
+
+        Returns:
+            Prompt'a yazılacak bağlam metni
+        """
+        query_terms = _terms(query)
+        ranked_docs = sorted(context_docs, key=lambda doc: 0 if doc.get('priority') == 'high' else 1)
+
+        # 1. adım: her kaynak için başlık + en ilgili (tekrar etmeyen) cümle
+        seen_sentences = set()
+        entries = []
+        for doc in ranked_docs:
+            fields = parse_document(doc['document'])
+            candidates = []
+            for position, sentence in self._ranked_sentences(fields.get('aciklama', ''), query_terms):
+                key = _sentence_key(sentence)
+                if key and key not in seen_sentences:
+                    seen_sentences.add(key)
+                    candidates.append((position, sentence))
+            entry = {
+                'header': self._header(fields, doc.get('metadata') or {}),
+                'sentences': candidates[:1],
+                'remaining': candidates[1:self.max_sentences],
+                'details_text': self._details(fields),
+                'details': None,
+            }
+            entries.append(entry)
+
+        used = sum(self.count_tokens(self._render(entry)) for entry in entries)
+
+        # 2. adım: kalan bütçeyi sıradaki kayıtlara pratik bilgi ve ek cümle olarak dağıt
+        for entry in entries:
+            if used >= self.token_budget:
+                break
+            additions = []
+            if entry['details_text']:
+                additions.append(('details', entry['details_text']))
+            additions.extend(('sentence', candidate) for candidate in entry['remaining'])
+
+            for kind, value in additions:
+                before = self.count_tokens(self._render(entry))
+                if kind == 'details':
+                    entry['details'] = value
+                else:
+                    entry['sentences'].append(value)
+                cost = self.count_tokens(self._render(entry)) - before
+                if used + cost > self.token_budget:
+                    # Sığmadı: geri al
+                    if kind == 'details':
+                        entry['details'] = None
+                    else:
+                        entry['sentences'].pop()
+                    continue
+                used += cost
+
+        return "\n\n".join(self._render(entry) for entry in entries)
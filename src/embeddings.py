@@ -0,0 +1,251 @@
+"""
+Embedding Backends
+Soru ve doküman embedding'lerini üreten fonksiyonun seçimi.
+
+Varsayılan model (all-MiniLM-L6-v2) İngilizce eğitilmiştir ve tam PyTorch
+ile çalışır. EMBEDDING_BACKEND ve EMBEDDING_MODEL ile şunlar seçilebilir:
+
+- sentence-transformers: model adı veya yerel model klasörü (ör. çok dilli
+  paraphrase-multilingual-MiniLM-L12-v2). Klasör verilirse model ağ erişimi
+  olmadan yüklenir.
+- onnx: yerel model klasöründeki ONNX modeli ONNX Runtime ile CPU'da
+  çalıştırılır (PyTorch gerekmez). EMBEDDING_QUANTIZED=1 ise int8
+  nicemlenmiş model kullanılır. Batch'ler uzunluğa göre sıralanıp en uzun
+  cümleye kadar doldurulur.
+
+Her iki backend de EMBEDDING_THREADS ile sınırlanan sayıda thread kullanır.
+Model değiştiğinde indeks yeniden kurulur (bkz. initialize_database).
+
+Model klasörünü bir kez indirmek ve int8 modeli üretmek için:
+    python -m src.embeddings download sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2 models/multilingual-minilm
+    python -m src.embeddings quantize models/multilingual-minilm
+"""
+
+import argparse
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+MULTILINGUAL_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# Model klasöründe aranan ONNX dosyaları (Hugging Face depoları modeli onnx/ altında tutar)
+ONNX_FILES = ('model.onnx', 'onnx/model.onnx')
+QUANTIZED_ONNX_FILES = ('model_int8.onnx', 'onnx/model_int8.onnx', 'onnx/model_quantized.onnx')
+QUANTIZED_FILE = 'model_int8.onnx'
+PAD_TOKENS = ('[PAD]', '<pad>')
+
+
+def _find_model_file(model_dir: str, candidates: tuple) -> str:
+    for candidate in candidates:
+        if os.path.isfile(os.path.join(model_dir, candidate)):
+            return candidate
+    raise FileNotFoundError(
+        f"{model_dir} içinde ONNX modeli bulunamadı (aranan: {', '.join(candidates)}). "
+        f"int8 model için: python -m src.embeddings quantize {model_dir}"
+    )
+
+
+class OnnxEmbeddingFunction(EmbeddingFunction):
+    """
+    Yerel klasördeki ONNX modeliyle (mean pooling) embedding üretir
+
+    Klasörde Hugging Face `tokenizer.json` ve ONNX modeli bulunmalıdır;
+    ağ erişimi gerekmez.
+    """
+
+    def __init__(self, model_dir: str, model_file: str = None, quantized: bool = False,
+                 threads: int = 0, max_length: int = 256, batch_size: int = 32, normalize: bool = True):
+        """
+        Args:
+            model_dir: Model klasörü
+            model_file: Klasöre göre ONNX dosyası (varsayılan: quantized'a göre aranır)
+            quantized: int8 nicemlenmiş modeli kullan
+            threads: ONNX Runtime thread sayısı (0 = çekirdek sayısı)
+            max_length: Token sınırı (uzun dokümanlar kesilir)
+            batch_size: Tek çalıştırmada işlenen metin sayısı
+            normalize: Vektörleri birim uzunluğa getir
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir
+        self.model_file = model_file or _find_model_file(
+            model_dir, QUANTIZED_ONNX_FILES if quantized else ONNX_FILES
+        )
+        self.threads = threads
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.model_name = f"onnx:{os.path.basename(os.path.normpath(model_dir))}/{self.model_file}"
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_token = next((token for token in PAD_TOKENS if self.tokenizer.token_to_id(token) is not None), None)
+        if pad_token is not None:
+            self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token), pad_token=pad_token)
+        else:
+            self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, self.model_file), sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([item.ids for item in encoded], dtype=np.int64)
+        attention_mask = np.array([item.attention_mask for item in encoded], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._input_names:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+        output = self.session.run(None, {name: value for name, value in feeds.items() if name in self._input_names})[0]
+        if output.ndim == 2:
+            # Model pooling'i kendi içinde yapıyor (sentence_embedding çıktısı)
+            return output.astype(np.float32)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        texts = list(input)
+        if not texts:
+            return []
+        # Benzer uzunluktaki metinler aynı batch'e düşer; dolgu (padding) azalır
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            positions = order[start:start + self.batch_size]
+            batch = self._encode_batch([texts[i] for i in positions])
+            if embeddings.shape[1] == 0:
+                embeddings = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            embeddings[positions] = batch
+        if self.normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.where(norms > 0, norms, 1.0)
+        return list(embeddings)
+
+    @staticmethod
+    def name() -> str:
+        return "turkiyegpt_onnx"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {
+            'model_dir': self.model_dir,
+            'model_file': self.model_file,
+            'threads': self.threads,
+            'max_length': self.max_length,
+            'batch_size': self.batch_size,
+            'normalize': self.normalize,
+        }
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "OnnxEmbeddingFunction":
+        return OnnxEmbeddingFunction(
+            config['model_dir'],
+            model_file=config.get('model_file'),
+            threads=config.get('threads', 0),
+            max_length=config.get('max_length', 256),
+            batch_size=config.get('batch_size', 32),
+            normalize=config.get('normalize', True)
+        )
+
+
+def create_embedding_function(backend: str = None, model: str = None, threads: int = None,
+                              quantized: bool = None) -> Any:
+    """
+    Ayarlara göre embedding fonksiyonunu oluşturur
+
+    Verilmeyen argümanlar environment değişkenlerinden okunur:
+    EMBEDDING_BACKEND: "sentence-transformers" (varsayılan) veya "onnx"
+    EMBEDDING_MODEL: Model adı veya yerel model klasörü (onnx için klasör zorunlu)
+    EMBEDDING_THREADS: Encoder thread sayısı (0 = kütüphane varsayılanı)
+    EMBEDDING_QUANTIZED: 1 ise int8 ONNX modeli
+
+    Returns:
+        ChromaDB embedding fonksiyonu (`model_name` özniteliği indeks
+        metadata'sına yazılır)
+    """
+    backend = (backend or os.getenv('EMBEDDING_BACKEND', 'sentence-transformers')).lower()
+    model = model or os.getenv('EMBEDDING_MODEL', DEFAULT_MODEL)
+    threads = int(os.getenv('EMBEDDING_THREADS', '0')) if threads is None else threads
+    if quantized is None:
+        quantized = os.getenv('EMBEDDING_QUANTIZED', '0') == '1'
+    local = os.path.isdir(model)
+
+    if backend == 'onnx':
+        if not local:
+            raise ValueError(f"ONNX backend için EMBEDDING_MODEL yerel bir model klasörü olmalı: {model}")
+        return OnnxEmbeddingFunction(model, quantized=quantized, threads=threads)
+
+    if backend == 'sentence-transformers':
+        from chromadb.utils import embedding_functions
+
+        kwargs = {}
+        if local:
+            # Model klasörden yüklenir; Hugging Face Hub'a istek atılmaz
+            os.environ.setdefault('HF_HUB_OFFLINE', '1')
+            os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+            kwargs['local_files_only'] = True
+        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model, **kwargs)
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+        return embedding_function
+
+    raise ValueError(f"Bilinmeyen EMBEDDING_BACKEND: {backend}")
+
+
+def download_model(model_name: str, model_dir: str) -> str:
+    """
+    Modeli (sentence-transformers dosyaları, tokenizer.json ve varsa onnx/
+    klasörü) yerel klasöre indirir; sonraki başlatmalarda ağ gerekmez
+    """
+    from huggingface_hub import snapshot_download
+
+    return snapshot_download(repo_id=model_name, local_dir=model_dir)
+
+
+def quantize_model(model_dir: str, output_file: str = QUANTIZED_FILE) -> str:
+    """
+    Klasördeki ONNX modelinin ağırlıklarını dinamik olarak int8'e nicemler
+
+    `onnx` paketini gerektirir (yalnızca bu adım için; çalışma zamanında gerekmez).
+
+    Returns:
+        Üretilen dosyanın yolu
+    """
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        raise ImportError("int8 nicemleme için `pip install onnx` gerekli") from e
+
+    source = os.path.join(model_dir, _find_model_file(model_dir, ONNX_FILES))
+    target = os.path.join(model_dir, output_file)
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding modeli indirme ve int8 nicemleme")
+    commands = parser.add_subparsers(dest='command', required=True)
+    download = commands.add_parser('download', help="Modeli yerel klasöre indir")
+    download.add_argument('model', help=f"Hugging Face model adı (ör. {MULTILINGUAL_MODEL})")
+    download.add_argument('model_dir')
+    quantize = commands.add_parser('quantize', help="ONNX modelini int8'e nicemle")
+    quantize.add_argument('model_dir')
+    args = parser.parse_args()
+
+    if args.command == 'download':
+        print(f"✓ Model indirildi: {download_model(args.model, args.model_dir)}")
+    else:
+        print(f"✓ int8 model yazıldı: {quantize_model(args.model_dir)}")
+
+
+if __name__ == "__main__":
+    main()
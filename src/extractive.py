@@ -0,0 +1,106 @@
+"""
+Extractive Answers
+Tek bir kaydın alanından yanıtlanabilen sorular için LLM'siz yanıt.
+
+"Topkapı Sarayı giriş ücreti?", "Galata Kulesi ziyaret saatleri?",
+"Efes ne zaman yapıldı?" gibi soruların yanıtı doğrudan kaydın
+`giris_ucreti`, `ziyaret_saatleri` veya `tarih` alanındadır. Bu sorular
+Gemini'ye gönderilmez:
+
+1. Soruda alan sorusu kalıpları aranır (lookup_intent) ve kalıplar
+   sorudan çıkarılır
+2. Kalan metin tek bir kaydın adı olmalıdır (LexicalIndex.name_matches);
+   ad belirsizse veya soruda başka kelimeler varsa normal yola dönülür
+3. Yanıt, LLM yanıtlarıyla aynı HTML/emoji biçimindeki şablondan üretilir
+   (render_field_answer); istenen alan kayıtta yoksa normal yola dönülür
+"""
+
+import html
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.context_packer import parse_document, MISSING_VALUES
+from src.gazetteer import turkish_casefold
+
+# Alan -> soru kalıbı (Türkçe küçük harfe çevrilmiş soru üzerinde)
+FIELD_INTENTS = (
+    ('tarih', re.compile(
+        r'\bne\s+zaman(?:dan\s+kalma|\s+(?:yapıl|inşa|kurul|yaptırıl|açıl)\w*(?:\s+(?:edil|ol)\w*)?)'
+        r'|\bkaç\s+yılında(?:\s+(?:yapıl|inşa|kurul|yaptırıl)\w*(?:\s+(?:edil|ol)\w*)?)?'
+        r'|\bhangi\s+(?:yıl|yüzyıl)\w*(?:\s+(?:yapıl|inşa|kurul|yaptırıl)\w*(?:\s+(?:edil|ol)\w*)?)?'
+        r'|\b(?:yapım|inşa|kuruluş|yapılış)\s+(?:tarihi|yılı)\w*'
+    )),
+    ('ziyaret_saatleri', re.compile(
+        r'\b(?:ziyaret|çalışma|açılış|kapanış)\s+saat\w*'
+        r'|\bsaat\s+kaçta\s+(?:açıl|kapan)\w*|\bsaat\s+kaça\s+kadar(?:\s+açık)?'
+        r'|\bkaçta\s+(?:açıl|kapan)\w*|\bkaça\s+kadar\s+açık'
+        r'|\bne\s+zaman\s+(?:açıl|kapan)\w*|\bsaatleri\b'
+    )),
+    ('giris_ucreti', re.compile(
+        r'\b(?:giriş\s+)?(?:ücret|fiyat|bilet)\w*(?:\s+m[ıiuü]\w*)?'
+        r'|\bkaç\s+(?:lira|tl)\b|\bparalı\s+m[ıiuü]\w*|\bmüze\s*kart\w*'
+    )),
+)
+
+# Alan kalıpları çıkarıldıktan sonra sorudan atılan dolgu kelimeleri
+FILLER = re.compile(
+    r'\b(?:ne\s+kadar(?:dır)?|nedir|neler(?:dir)?|nasıl|kaç|acaba|peki|lütfen|öğrenebilir\s+miyim|'
+    r'geçerli\s+m[ıiuü]\w*|var\s+m[ıiuü]\w*|m[ıiuü](?:dir|dır|dur|dür)?)\b'
+)
+
+# Kalan metinde bulunursa soru tek alanlık bir soru sayılmaz
+# ("Topkapı Sarayı tarihi ve giriş ücreti", "Efes hakkında bilgi ve ücreti")
+COMPOUND = re.compile(r'\b(?:ve|ile|hem|veya|ayrıca|tarih\w*|hakkında|bilgi\w*|önem\w*)\b')
+
+FIELD_LINES = (
+    ('tarih', '🏛️', 'Tarih'),
+    ('ziyaret_saatleri', '⏰', 'Ziyaret saatleri'),
+    ('giris_ucreti', '💰', 'Giriş ücreti'),
+)
+
+
+def lookup_intent(query: str) -> Optional[Tuple[List[str], str]]:
+    """
+    Sorunun alan sorusu olup olmadığını belirler
+
+    Returns:
+        (istenen alanlar, alan kalıpları ve dolgu kelimeleri çıkarılmış soru)
+        veya alan sorusu değilse (ya da başka bir şey de soruluyorsa) None
+    """
+    text = turkish_casefold(query)
+    fields = []
+    for field, pattern in FIELD_INTENTS:
+        text, count = pattern.subn(' ', text)
+        if count:
+            fields.append(field)
+    if not fields or COMPOUND.search(text):
+        return None
+    return fields, FILLER.sub(' ', text)
+
+
+def render_field_answer(doc: Dict[str, Any], fields: List[str]) -> Optional[str]:
+    """
+    Kaydın istenen alanlarından HTML yanıt üretir
+
+    Args:
+        doc: Bağlam dokümanı ('document' ve 'metadata')
+        fields: lookup_intent'in döndürdüğü alanlar
+
+    Returns:
+        Yanıt metni; istenen alanlardan biri kayıtta yoksa None
+    """
+    values = parse_document(doc['document'])
+    if any(values.get(field, '') in MISSING_VALUES for field in fields):
+        return None
+    metadata = doc.get('metadata') or {}
+    baslik = html.escape(values.get('baslik') or metadata.get('baslik', ''), quote=False)
+    location = ", ".join(
+        html.escape(value, quote=False)
+        for value in (values.get('sehir') or metadata.get('sehir'), values.get('bolge') or metadata.get('bolge'))
+        if value
+    )
+    lines = [f"📍 <strong>{baslik}</strong>" + (f" ({location})" if location else "")]
+    for field, emoji, label in FIELD_LINES:
+        if field in fields:
+            lines.append(f"{emoji} <strong>{label}:</strong> {html.escape(values[field], quote=False)}")
+    return "<br>".join(lines)
@@ -0,0 +1,464 @@
+"""
+Facet Index
+Veri setinin yapılandırılmış alanlarını tipli metadata'ya dönüştürür ve
+bitmap (posting list) indeksleriyle tam (exact) filtreleme yapar.
+
+Serbest metin alanları bir kez normalize edilir:
+- `giris_ucreti` -> ucret ('Ücretsiz', 'Ücretli', 'Kısmen ücretli', 'Bilinmiyor')
+  ve muze_kart (bool)
+- `ziyaret_saatleri` -> acik_7_24 (bool), acilis / kapanis (gün içi dakika;
+  yaz/kış gibi birden fazla aralıkta en geniş aralık) ve kapali_gunler
+- `tarih` -> yil (yaklaşık yıl, M.Ö. için negatif) ve donem
+- `baslik` + `ozellikler` -> etiketler ('Antik Kent', 'Müze', 'Kale', ...)
+
+Her (alan, değer) çifti için kayıt konumlarının bitmap'i tutulur (Python
+int'i bit kümesi olarak); ziyaret saatleri SLOT_MINUTES dakikalık zaman
+dilimlerine, her dilimde açık olan kayıtların bitmap'i olarak indekslenir.
+Bir sorgu planı bu bitmap'lerin AND/OR'u ile vektör aramasından önce tam
+olarak değerlendirilir (bkz. src.query_planner).
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.gazetteer import AhoCorasick, longest_matches, turkish_casefold
+
+FEE_FREE = 'Ücretsiz'
+FEE_PAID = 'Ücretli'
+FEE_PARTIAL = 'Kısmen ücretli'
+FEE_UNKNOWN = 'Bilinmiyor'
+
+WEEKDAYS = ('Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma', 'Cumartesi', 'Pazar')
+
+NATURAL = 'Doğal oluşum'
+
+# Dönemler ve yıl aralıkları [başlangıç, bitiş); tarih metninde dönem adı
+# geçmiyorsa dönem yıldan belirlenir
+PERIODS = (
+    ('Antik Çağ', None, 395),
+    ('Bizans', 395, 1071),
+    ('Selçuklu', 1071, 1299),
+    ('Osmanlı', 1299, 1923),
+    ('Cumhuriyet', 1923, None),
+)
+
+# Tarih metnindeki anahtar kelimeler -> dönem (metinde ilk geçen kullanılır)
+PERIOD_KEYWORDS = (
+    ('doğal', NATURAL),
+    ('volkanik', NATURAL),
+    ('jeolojik', NATURAL),
+    ('osmanlı', 'Osmanlı'),
+    ('selçuklu', 'Selçuklu'),
+    ('bizans', 'Bizans'),
+    ('roma', 'Antik Çağ'),
+    ('hellenistik', 'Antik Çağ'),
+    ('helenistik', 'Antik Çağ'),
+    ('antik', 'Antik Çağ'),
+    ('hitit', 'Antik Çağ'),
+    ('frig', 'Antik Çağ'),
+    ('urartu', 'Antik Çağ'),
+    ('lidya', 'Antik Çağ'),
+    ('pontus', 'Antik Çağ'),
+    ('cumhuriyet', 'Cumhuriyet'),
+    ('modern', 'Cumhuriyet'),
+)
+
+# Etiket -> başlık ve özelliklerde aranan kelimeler (ekli biçimleri de eşleşir:
+# "Kalesi", "Müzeleri", "Antik Kenti")
+TAGS = {
+    'Antik Kent': ('antik kent', 'antik şehir', 'ören yeri', 'örenyeri', 'akropol'),
+    'Müze': ('müze',),
+    'Cami': ('cami',),
+    'Kilise': ('kilise', 'manastır'),
+    'Kale': ('kale', 'hisar'),
+    'Saray': ('saray',),
+    'Tapınak': ('tapınak', 'tapınağ'),
+    'Tiyatro': ('tiyatro',),
+    'Şelale': ('şelale',),
+    'Göl': ('göl',),
+    'Mağara': ('mağara',),
+    'Kanyon': ('kanyon',),
+    'Plaj': ('plaj', 'sahil'),
+    'Ada': ('ada',),
+    'Milli Park': ('milli park', 'millî park', 'tabiat park'),
+    'UNESCO': ('unesco',),
+    'Termal': ('termal', 'kaplıca'),
+    'Kayak': ('kayak',),
+    'Yayla': ('yayla',),
+    'Çarşı': ('çarşı', 'bedesten'),
+}
+
+# Soru tarafında ek olarak tanınan ifadeler (src.query_planner)
+FEE_WORDS = {
+    'ücretsiz': ('ucret', FEE_FREE),
+    'bedava': ('ucret', FEE_FREE),
+    'parasız': ('ucret', FEE_FREE),
+    'ücretli': ('ucret', FEE_PAID),
+    'müze kart': ('muze_kart', True),
+    'müzekart': ('muze_kart', True),
+}
+
+PERIOD_WORDS = {
+    'antik çağ': 'Antik Çağ',
+    'antik dönem': 'Antik Çağ',
+    'roma dönemi': 'Antik Çağ',
+    'hellenistik': 'Antik Çağ',
+    'helenistik': 'Antik Çağ',
+    'bizans': 'Bizans',
+    'selçuklu': 'Selçuklu',
+    'osmanlı': 'Osmanlı',
+    'cumhuriyet dönemi': 'Cumhuriyet',
+    'doğal oluşum': NATURAL,
+}
+
+# Gazetteer'a eklenen (desen, (alan, değer)) çiftleri
+FACET_PATTERNS = tuple(
+    [(keyword, ('etiket', tag)) for tag, keywords in TAGS.items() for keyword in keywords]
+    + [(word, facet) for word, facet in FEE_WORDS.items()]
+    + [(word, ('donem', period)) for word, period in PERIOD_WORDS.items()]
+)
+
+# Ziyaret saati zaman dilimi (dakika); sorudaki saat dilim başına yuvarlanır
+SLOT_MINUTES = 15
+SLOTS = 24 * 60 // SLOT_MINUTES
+
+TIME_RANGE = re.compile(r'(\d{1,2})[:.](\d{2})\s*-\s*(\d{1,2})[:.](\d{2})')
+CLOSED_DAY = re.compile(r'(pazartesi|salı|çarşamba|perşembe|cumartesi|cuma|pazar)\w*\s+kapalı')
+BC = re.compile(r'\bm\.?\s?ö\b')
+YEAR = re.compile(r'\bm\.?\s?[ös]\.?\s*(\d{1,4})(?![\d.-])|(?<![\d.])(\d{3,4})(?!\d)')
+CENTURY = re.compile(r'(\d{1,2})(?:\s*-\s*\d{1,2})?\s*\.\s*(?:yüzyıl|yy)')
+
+DAY_NAMES = {turkish_casefold(day): day for day in WEEKDAYS}
+
+_tag_matcher = None
+
+
+def parse_fee(text: str) -> Tuple[str, bool]:
+    """
+    Giriş ücreti metnini normalize eder
+
+    "Kale ücretsiz, müze ücretli" gibi karışık ifadeler 'Kısmen ücretli' olur.
+
+    Returns:
+        (ücret sınıfı, Müze Kart geçerli mi)
+    """
+    text = turkish_casefold(text or '')
+    muze_kart = 'müze kart' in text or 'müzekart' in text
+    free = 'ücretsiz' in text or 'bedava' in text
+    paid = re.search(r'ücret(?!siz)|fiyat', text) is not None
+    if free and paid:
+        return FEE_PARTIAL, muze_kart
+    if free:
+        return FEE_FREE, muze_kart
+    if paid or muze_kart:
+        return FEE_PAID, muze_kart
+    return FEE_UNKNOWN, muze_kart
+
+
+def parse_hours(text: str) -> Dict[str, Any]:
+    """
+    Ziyaret saatleri metnini ayrıştırır
+
+    Birden fazla saat aralığı varsa (yaz/kış, alan bazında) en erken açılış
+    ve en geç kapanış alınır; gece yarısını geçen kapanışlar 24:00'ten
+    büyük dakika olarak tutulur.
+
+    Returns:
+        {'acik_7_24': bool, 'acilis': dakika | None, 'kapanis': dakika | None,
+         'kapali_gunler': [gün, ...]}
+    """
+    text = turkish_casefold(text or '')
+    hours = {'acik_7_24': '7/24' in text or '24 saat' in text, 'acilis': None, 'kapanis': None}
+
+    ranges = []
+    for open_hour, open_minute, close_hour, close_minute in TIME_RANGE.findall(text):
+        opens = int(open_hour) * 60 + int(open_minute)
+        closes = int(close_hour) * 60 + int(close_minute)
+        if opens < 24 * 60 and closes <= 24 * 60:
+            ranges.append((opens, closes if closes > opens else closes + 24 * 60))
+    if ranges:
+        hours['acilis'] = min(opens for opens, _ in ranges)
+        hours['kapanis'] = max(closes for _, closes in ranges)
+
+    hours['kapali_gunler'] = [DAY_NAMES[day] for day in CLOSED_DAY.findall(text)]
+    return hours
+
+
+def parse_year(text: str) -> Optional[int]:
+    """
+    Tarih metninden yaklaşık yılı çıkarır (M.Ö. için negatif)
+
+    "537" -> 537, "M.Ö. 3000" -> -3000, "10-11. yüzyıl" -> 950,
+    "M.Ö. 3. yüzyıl" -> -250; doğal oluşumlar ve yıl içermeyen metinler için None.
+    """
+    text = turkish_casefold(text or '')
+    if any(keyword in text for keyword, period in PERIOD_KEYWORDS if period == NATURAL):
+        return None
+    # Metinde ilk geçen yıl veya yüzyıl ifadesi kullanılır
+    candidates = [match for match in (YEAR.search(text), CENTURY.search(text)) if match]
+    if not candidates:
+        return None
+    match = min(candidates, key=lambda match: match.start())
+    if match.re is YEAR:
+        year = int(match.group(1) or match.group(2))
+    else:
+        year = (int(match.group(1)) - 1) * 100 + 50
+    return -year if BC.search(text, 0, match.end()) else year
+
+
+def period_of_year(year: int) -> str:
+    """Yılın dönemini döndürür"""
+    for period, start, end in PERIODS:
+        if (start is None or year >= start) and (end is None or year < end):
+            return period
+    return None
+
+
+def parse_period(text: str, year: Optional[int] = None) -> Optional[str]:
+    """
+    Tarih metninin dönemini döndürür; metinde dönem adı yoksa yıldan belirlenir
+    """
+    text = turkish_casefold(text or '')
+    found = [(text.find(keyword), period) for keyword, period in PERIOD_KEYWORDS if keyword in text]
+    if found:
+        return min(found, key=lambda item: item[0])[1]
+    return period_of_year(year) if year is not None else None
+
+
+def record_tags(record: Dict[str, Any]) -> List[str]:
+    """
+    Kaydın başlık ve özelliklerinde geçen etiketleri döndürür
+    """
+    global _tag_matcher
+    if _tag_matcher is None:
+        matcher = AhoCorasick()
+        for tag, keywords in TAGS.items():
+            for keyword in keywords:
+                matcher.add(turkish_casefold(keyword), tag)
+        matcher.build()
+        _tag_matcher = matcher
+
+    features = record.get('ozellikler') or []
+    if isinstance(features, str):
+        features = features.split(', ')
+    text = turkish_casefold(" | ".join([record.get('baslik') or ''] + list(features)))
+    tags = []
+    for tag in longest_matches(_tag_matcher, text):
+        if tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def record_facets(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Kaydın yapılandırılmış alanlarını tipli metadata'ya dönüştürür
+
+    Dönen sözlük yalnızca skaler değerler içerir (ChromaDB metadata'sına
+    doğrudan yazılabilir); bilinmeyen alanlar atlanır. Listeler virgülle
+    ayrılmış metin olarak tutulur.
+
+    Args:
+        record: Veri seti kaydı veya indeksteki doküman alanları + metadata
+
+    Returns:
+        {'ucret', 'muze_kart', 'acik_7_24', ...} tipli alanlar
+    """
+    fee, muze_kart = parse_fee(record.get('giris_ucreti'))
+    hours = parse_hours(record.get('ziyaret_saatleri'))
+    year = parse_year(record.get('tarih'))
+    facets = {'ucret': fee, 'muze_kart': muze_kart, 'acik_7_24': hours['acik_7_24']}
+    if hours['acilis'] is not None:
+        facets['acilis'] = hours['acilis']
+        facets['kapanis'] = hours['kapanis']
+    if hours['kapali_gunler']:
+        facets['kapali_gunler'] = ", ".join(hours['kapali_gunler'])
+    if year is not None:
+        facets['yil'] = year
+    period = parse_period(record.get('tarih'), year)
+    if period:
+        facets['donem'] = period
+    tags = record_tags(record)
+    if tags:
+        facets['etiketler'] = ", ".join(tags)
+    return facets
+
+
+def _bitmap(positions: np.ndarray, size: int) -> int:
+    """Konum dizisini bitmap'e (Python int) çevirir"""
+    if not len(positions):
+        return 0
+    bits = np.zeros(size, dtype=bool)
+    bits[positions] = True
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+
+def _mask_bitmap(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little') if len(mask) else 0
+
+
+class FacetIndex:
+    """
+    Tipli metadata üzerinde bitmap indeksleri
+
+    Kayıtlar add() ile eklenir; bitmap'ler ilk sorguda bir kez kurulur.
+    İndeks kurulduktan sonra değişmez; veri güncellendiğinde yenisi kurulup
+    tek adımda devreye alınır (bkz. TurkiyeTourismRAG._set_lookups).
+    """
+
+    def __init__(self):
+        self.record_ids = []  # konum -> kayıt ID (metadata'daki kayit_id)
+        self._positions = {}  # str(kayıt ID) -> konum
+        self._postings = {}  # (alan, değer) -> konum listesi / bitmap
+        self._years = []
+        self._opens = []
+        self._closes = []
+        self._always_open = []
+        self._open_slots = None
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self.record_ids)
+
+    def add(self, record_id: Any, record: Dict[str, Any]):
+        """
+        Kaydı indekse ekler
+
+        Args:
+            record_id: Kayıt ID'si (vektör filtresinde kayit_id olarak kullanılır)
+            record: Veri seti kaydı veya indeksteki doküman alanları + metadata
+        """
+        position = len(self.record_ids)
+        self.record_ids.append(record_id)
+        self._positions[str(record_id)] = position
+
+        facets = record_facets(record)
+        values = {
+            'sehir': [record.get('sehir')],
+            'bolge': [record.get('bolge')],
+            'kategori': [record.get('kategori')],
+            'ucret': [facets['ucret']],
+            'muze_kart': [facets['muze_kart']],
+            'acik_7_24': [facets['acik_7_24']],
+            'donem': [facets.get('donem')],
+            'etiket': facets['etiketler'].split(', ') if 'etiketler' in facets else [],
+            'kapali_gun': facets['kapali_gunler'].split(', ') if 'kapali_gunler' in facets else [],
+        }
+        for field, field_values in values.items():
+            for value in field_values:
+                if value is not None and value != '':
+                    self._postings.setdefault((field, value), []).append(position)
+
+        self._years.append(facets.get('yil', np.nan))
+        self._opens.append(facets.get('acilis', -1))
+        self._closes.append(facets.get('kapanis', -1))
+        self._always_open.append(facets['acik_7_24'])
+        self._built = False
+
+    def build(self):
+        """Posting listelerini ve saat dilimlerini bitmap'lere dönüştürür"""
+        size = len(self.record_ids)
+        self._postings = {
+            key: positions if isinstance(positions, int) else _bitmap(np.asarray(positions, dtype=np.int64), size)
+            for key, positions in self._postings.items()
+        }
+        self._year_array = np.asarray(self._years, dtype=np.float64)
+
+        opens = np.asarray(self._opens, dtype=np.int64)
+        closes = np.asarray(self._closes, dtype=np.int64)
+        always_open = np.asarray(self._always_open, dtype=bool)
+        self._open_slots = []
+        for slot in range(SLOTS):
+            minute = slot * SLOT_MINUTES
+            is_open = always_open | ((opens <= minute) & (minute < closes)) | (minute + 24 * 60 < closes)
+            self._open_slots.append(_mask_bitmap(is_open))
+        self._built = True
+
+    def _ensure_built(self):
+        if not self._built:
+            self.build()
+
+    def all(self) -> int:
+        """Tüm kayıtların bitmap'i"""
+        return (1 << len(self.record_ids)) - 1
+
+    def posting(self, field: str, values: Iterable[Any]) -> int:
+        """Alanı verilen değerlerden birine eşit olan kayıtlar (OR)"""
+        self._ensure_built()
+        bitmap = 0
+        for value in values:
+            bitmap |= self._postings.get((field, value), 0)
+        return bitmap
+
+    def open_at(self, minute: int) -> int:
+        """Gün içinde verilen dakikada açık olduğu bilinen kayıtlar"""
+        self._ensure_built()
+        return self._open_slots[(minute % (24 * 60)) // SLOT_MINUTES]
+
+    def year_between(self, start: Optional[int], end: Optional[int]) -> int:
+        """Yılı [start, end) aralığında olan kayıtlar (yılı bilinmeyenler hariç)"""
+        self._ensure_built()
+        mask = ~np.isnan(self._year_array)
+        if start is not None:
+            mask &= self._year_array >= start
+        if end is not None:
+            mask &= self._year_array < end
+        return _mask_bitmap(mask)
+
+    def ids_bitmap(self, record_ids: Iterable[Any]) -> int:
+        """Kayıt ID'lerinin bitmap'i (indekste olmayanlar atlanır)"""
+        bitmap = 0
+        for record_id in record_ids:
+            position = self._positions.get(str(record_id))
+            if position is not None:
+                bitmap |= 1 << position
+        return bitmap
+
+    def evaluate(self, plan: Dict[str, Any]) -> int:
+        """
+        Sorgu planını bitmap olarak değerlendirir
+
+        Aynı alandaki değerler OR, farklı alanlar AND ile birleşir.
+        Kapanış günü bilinmeyen kayıtlar her gün açık sayılır; belirli bir
+        saatte açık olma koşulu ise yalnızca saatleri bilinen (veya 7/24
+        açık) kayıtları kabul eder.
+
+        Args:
+            plan: src.query_planner.QueryPlanner.plan() sonucu
+
+        Returns:
+            Koşulları sağlayan kayıtların bitmap'i
+        """
+        self._ensure_built()
+        bitmap = self.all()
+        for field, values in plan['filters'].items():
+            bitmap &= self.posting(field, values)
+        if plan.get('open_days'):
+            bitmap &= ~self.posting('kapali_gun', plan['open_days'])
+        if plan.get('open_at') is not None:
+            bitmap &= self.open_at(plan['open_at'])
+        if plan.get('years'):
+            bitmap &= self.year_between(*plan['years'])
+        return bitmap
+
+    def contains(self, bitmap: int, record_id: Any) -> bool:
+        """Kayıt bitmap'te mi"""
+        position = self._positions.get(str(record_id))
+        return position is not None and bool(bitmap >> position & 1)
+
+    def record_ids_of(self, bitmap: int) -> List[Any]:
+        """Bitmap'teki kayıtların ID'leri (indeks sırasıyla)"""
+        if not bitmap:
+            return []
+        size = len(self.record_ids)
+        bits = np.unpackbits(
+            np.frombuffer(bitmap.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8),
+            bitorder='little'
+        )[:size]
+        return [self.record_ids[position] for position in np.flatnonzero(bits)]
+
+    @staticmethod
+    def count(bitmap: int) -> int:
+        """Bitmap'teki kayıt sayısı"""
+        return bitmap.bit_count()
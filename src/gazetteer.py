@@ -0,0 +1,265 @@
+"""
+Gazetteer - Şehir / Bölge / Kategori Tespiti
+Kullanıcı sorusundaki yer ve kategori adlarını tek geçişte bulur.
+
+Desenler veri setindeki farklı `sehir`, `bolge` ve `kategori` değerleri ile
+takma adlardan (ör. "kapadokya" -> Nevşehir) bir kez derlenir ve
+Aho-Corasick otomatı ile eşleştirilir. Karşılaştırma Türkçe'ye uygun küçük
+harf dönüşümü ile yapılır ('İSTANBUL' -> 'istanbul', 'IĞDIR' -> 'ığdır').
+"""
+
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+# Veri setinde geçmeyen yer adları -> şehir
+CITY_ALIASES = {
+    'kapadokya': 'Nevşehir',
+    'kappadokya': 'Nevşehir',
+    'göreme': 'Nevşehir',
+    'ürgüp': 'Nevşehir',
+    'efes': 'İzmir',
+    'bergama': 'İzmir',
+    'çeşme': 'İzmir',
+    'pamukkale': 'Denizli',
+    'nemrut': 'Adıyaman',
+    'urfa': 'Şanlıurfa',
+    'antep': 'Gaziantep',
+    'bodrum': 'Muğla',
+    'marmaris': 'Muğla',
+    'fethiye': 'Muğla',
+    'ölüdeniz': 'Muğla',
+    'dalyan': 'Muğla',
+    'truva': 'Çanakkale',
+    'troya': 'Çanakkale',
+    'gelibolu': 'Çanakkale',
+    'safranbolu': 'Karabük',
+    'uzungöl': 'Trabzon',
+    'sümela': 'Trabzon',
+    'kaş': 'Antalya',
+    'alanya': 'Antalya',
+    'kemer': 'Antalya',
+    'afyon': 'Afyonkarahisar',
+    'afyonkarahisar': 'Afyon',
+    'maraş': 'Kahramanmaraş',
+}
+
+REGION_ALIASES = {
+    'güneydoğu': 'Güneydoğu Anadolu',
+    'orta anadolu': 'İç Anadolu',
+    'ege bölgesi': 'Ege',
+    'karadeniz bölgesi': 'Karadeniz',
+    'akdeniz bölgesi': 'Akdeniz',
+    'marmara bölgesi': 'Marmara',
+}
+
+CATEGORY_ALIASES = {
+    'tarihi': 'Tarih ve Kültür',
+    'tarih': 'Tarih ve Kültür',
+    'kültür': 'Tarih ve Kültür',
+    'kültürel': 'Tarih ve Kültür',
+    'antik': 'Tarih ve Kültür',
+    'müze': 'Tarih ve Kültür',
+    'doğa': 'Doğal Güzellik',
+    'doğal': 'Doğal Güzellik',
+    'gastronomi': 'Gastronomi',
+    'yemek': 'Gastronomi',
+    'mutfak': 'Gastronomi',
+    'lezzet': 'Gastronomi',
+    'modern': 'Modern Turizm',
+}
+
+# Kesme işareti olmadan yazılan yer adlarından sonra kabul edilen ekler
+# ("izmirdeki", "istanbulda", "egede"); diğer devamlar ("vanilya") eşleşmez
+TURKISH_SUFFIXES = {
+    '', 'da', 'de', 'ta', 'te', 'dan', 'den', 'tan', 'ten',
+    'daki', 'deki', 'taki', 'teki',
+    'a', 'e', 'ya', 'ye', 'ı', 'i', 'u', 'ü', 'yı', 'yi', 'yu', 'yü',
+    'ın', 'in', 'un', 'ün', 'nın', 'nin', 'nun', 'nün',
+    'lı', 'li', 'lu', 'lü', 'ler', 'lar', 'leri', 'ları',
+    'nde', 'nda', 'ndaki', 'ndeki', 'ndan', 'nden',
+    'si', 'sı', 'su', 'sü',
+}
+
+ENTITY_FIELDS = ('sehir', 'bolge', 'kategori')
+
+
+def turkish_casefold(text: str) -> str:
+    """
+    Türkçe'ye uygun küçük harf dönüşümü
+
+    Python'un str.lower() metodu 'İ' harfini 'i' + birleşik nokta (U+0307)
+    olarak, 'I' harfini ise 'i' olarak dönüştürür; bu fonksiyon Türkçe
+    kurallarını (İ -> i, I -> ı) uygular.
+    """
+    text = unicodedata.normalize('NFC', text).replace('İ', 'i').replace('I', 'ı').lower()
+    return text.replace('\u0307', '')
+
+
+class AhoCorasick:
+    """
+    Çoklu desen eşleştirici (Aho-Corasick otomatı)
+
+    Tüm desenler metin üzerinde tek geçişte, desen sayısından bağımsız
+    sürede bulunur.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # durum -> [(desen_uzunluğu, değer), ...]
+        self._built = False
+
+    def add(self, pattern: str, value: Any):
+        """Desen ekler (build() öncesinde çağrılmalıdır)"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """Başarısızlık bağlantılarını hesaplar"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """
+        Metindeki tüm desen eşleşmelerini döndürür
+
+        Returns:
+            (başlangıç, bitiş, değer) üçlülerinin listesi
+        """
+        if not self._built:
+            self.build()
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._output[state]:
+                matches.append((index - length + 1, index + 1, value))
+        return matches
+
+
+def _is_word_start(text: str, start: int) -> bool:
+    return start == 0 or not text[start - 1].isalpha()
+
+
+def _is_word_end(text: str, end: int) -> bool:
+    # Kesme işaretli ekler ("Van'da") ve kelime sonu her zaman kabul edilir
+    if end == len(text) or not text[end].isalpha():
+        return True
+    rest = end
+    while rest < len(text) and text[rest].isalpha():
+        rest += 1
+    return text[end:rest] in TURKISH_SUFFIXES
+
+
+def longest_matches(matcher: AhoCorasick, text: str) -> List[Any]:
+    """
+    Küçük harfe çevrilmiş metindeki kelime eşleşmelerini döndürür
+
+    Desen bir kelimenin başında başlamalı ve kelime sonunda ya da kabul
+    edilen bir ekte bitmelidir. Çakışan eşleşmelerde en uzun desen seçilir
+    ("güneydoğu anadolu" içindeki "doğu anadolu" ayrıca sayılmaz); aynı
+    aralıktaki farklı desen değerlerinin hepsi döner.
+
+    Returns:
+        Eşleşen desen değerleri (bulunma sırasıyla)
+    """
+    candidates = [
+        (start, end, value) for start, end, value in matcher.find_all(text)
+        if _is_word_start(text, start) and _is_word_end(text, end)
+    ]
+    candidates.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+
+    values = []
+    covered_until = 0
+    span = None
+    for start, end, value in candidates:
+        if start < covered_until and (start, end) != span:
+            continue
+        span = (start, end)
+        covered_until = end
+        values.append(value)
+    return values
+
+
+class Gazetteer:
+    """
+    Sorudaki şehir, bölge ve kategori adlarını tespit eder
+
+    Bir kez derlenir; match() her soruda tek geçişte tüm varlıkları döndürür.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = (),
+                 extra_patterns: Iterable[Tuple[str, Tuple[str, Any]]] = ()):
+        """
+        Args:
+            records: `sehir`, `bolge` ve `kategori` alanlarını içeren kayıtlar
+                (veri seti kayıtları veya ChromaDB metadata'ları)
+            extra_patterns: Ek (desen, (alan, değer)) çiftleri (ör. src.facets.FACET_PATTERNS);
+                eşleşmeleri match() sonucunda kendi alanlarıyla döner
+        """
+        values = {field: set() for field in ENTITY_FIELDS}
+        for record in records:
+            for field in ENTITY_FIELDS:
+                if record.get(field):
+                    values[field].add(record[field])
+        self.values = values
+
+        self._matcher = AhoCorasick()
+        for field in ENTITY_FIELDS:
+            for value in values[field]:
+                self._matcher.add(turkish_casefold(value), (field, value))
+        for aliases, field in ((CITY_ALIASES, 'sehir'), (REGION_ALIASES, 'bolge'),
+                               (CATEGORY_ALIASES, 'kategori')):
+            for alias, value in aliases.items():
+                if value in values[field]:
+                    self._matcher.add(turkish_casefold(alias), (field, value))
+        for pattern, (field, value) in extra_patterns:
+            self._matcher.add(turkish_casefold(pattern), (field, value))
+        self._matcher.build()
+
+    def match(self, query: str) -> Dict[str, List[str]]:
+        """
+        Sorudaki tüm varlıkları bulur
+
+        Çakışan eşleşmelerde en uzun desen seçilir ("güneydoğu anadolu"
+        içindeki "doğu anadolu" ayrıca sayılmaz).
+
+        Args:
+            query: Kullanıcının sorusu
+
+        Returns:
+            {'sehir': [...], 'bolge': [...], 'kategori': [...]} ve ek desenlerin
+            alanları (bulunma sırasıyla)
+        """
+        entities = {field: [] for field in ENTITY_FIELDS}
+        for field, value in longest_matches(self._matcher, turkish_casefold(query)):
+            values = entities.setdefault(field, [])
+            if value not in values:
+                values.append(value)
+        return entities
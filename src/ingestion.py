@@ -0,0 +1,181 @@
+"""
+Streaming Ingestion
+Büyük veri setlerini belleğe tamamen almadan, kayıt kayıt okur.
+
+Desteklenen formatlar:
+- JSON dizisi ([{...}, {...}]): dosya parça parça okunur, her nesne
+  tamamlandıkça döndürülür
+- JSONL / NDJSON (satır başına bir kayıt)
+
+Yükleme ilerlemesi bir checkpoint dosyasına yazılır; süreç yarıda
+kesilirse bir sonraki senkronizasyon kaldığı yerden devam eder.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+READ_CHUNK_SIZE = 1 << 16
+
+
+def _iter_json_array(f, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    """JSON dizisindeki nesneleri dosyayı parça parça okuyarak döndürür"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    started = False
+
+    while True:
+        # Boşlukları ve (dizi içindeyken) virgülleri atla
+        while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+            pos += 1
+
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("JSON dizisi beklenmedik şekilde bitti")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError("JSON dosyası bir dizi ile başlamalı")
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Nesne henüz tamamlanmadı; daha fazla oku
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        yield item
+        pos = end
+        if pos >= chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def _iter_jsonl(f) -> Iterator[Dict[str, Any]]:
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{line_number}. satır geçerli JSON değil: {e}") from e
+
+
+def detect_format(path: str) -> str:
+    """
+    Dosya formatını belirler
+
+    Returns:
+        "jsonl" veya "json"
+    """
+    if path.lower().endswith(JSONL_EXTENSIONS):
+        return 'jsonl'
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                break
+    return 'json' if char == '[' else 'jsonl'
+
+
+def iter_records(path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Veri dosyasındaki kayıtları sırayla döndürür
+
+    Bellek kullanımı dosya boyutundan bağımsızdır (okuma tamponu + tek kayıt).
+
+    Args:
+        path: JSON dizisi veya JSONL dosyası
+        chunk_size: JSON dizisi okunurken kullanılan tampon boyutu
+
+    Yields:
+        Kayıt sözlükleri
+    """
+    file_format = detect_format(path)
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        records = _iter_jsonl(f) if file_format == 'jsonl' else _iter_json_array(f, chunk_size)
+        for record in records:
+            if not isinstance(record, dict):
+                raise ValueError(f"Kayıt bir JSON nesnesi olmalı: {str(record)[:80]}")
+            yield record
+
+
+class IngestionCheckpoint:
+    """
+    Yükleme ilerlemesini diske yazar
+
+    Checkpoint, kaynak dosyanın yolu, boyutu ve değişiklik zamanıyla
+    eşleştirilir; dosya değiştiyse eski checkpoint yok sayılır.
+    """
+
+    def __init__(self, path: str, source_path: str):
+        self.path = path
+        stat = os.stat(source_path)
+        self.source = {
+            'path': os.path.abspath(source_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+        }
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Aynı kaynağa ait kaydedilmiş ilerlemeyi döndürür, yoksa None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return state if state.get('source') == self.source else None
+
+    def save(self, records_done: int, stats: Dict[str, int]):
+        """İlerlemeyi atomik olarak yazar"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump({'source': self.source, 'records_done': records_done, 'stats': stats}, f)
+        os.replace(temporary_path, self.path)
+
+    def clear(self):
+        """Yükleme tamamlandığında checkpoint'i siler"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ProgressReporter:
+    """Belirli aralıklarla işlenen kayıt sayısını ve hızı yazdırır"""
+
+    def __init__(self, interval: float = 5.0, enabled: bool = True):
+        self.interval = interval
+        self.enabled = enabled
+        self.start = time.monotonic()
+        self._last_report = self.start
+        self._last_values = None
+
+    def update(self, processed: int, embedded: int, force: bool = False):
+        now = time.monotonic()
+        if not self.enabled or (not force and now - self._last_report < self.interval):
+            return
+        if (processed, embedded) == self._last_values:
+            return
+        self._last_report = now
+        self._last_values = (processed, embedded)
+        elapsed = max(now - self.start, 1e-9)
+        print(f"⏳ {processed} kayıt işlendi, {embedded} kayıt embed edildi "
+              f"({processed / elapsed:.0f} kayıt/sn, {embedded / elapsed:.0f} embedding/sn)")
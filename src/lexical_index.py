@@ -0,0 +1,283 @@
+"""
+Lexical Index (BM25)
+Başlık, açıklama ve özellik alanları üzerinde bellek içi ters indeks.
+
+Embedding modeli (all-MiniLM-L6-v2) İngilizce eğitildiğinden Türkçe yer ve
+özellik adlarını ("İznik çinisi", "antik kent", "UNESCO") vektör
+aramasında iyi ayırt edemez. Bu indeks aynı soru için BM25 sıralaması
+üretir; retrieve_context iki sıralamayı reciprocal rank fusion ile
+birleştirir. Soru doğrudan bir kaydın adıysa (ör. "Ayasofya Camii
+nedir?") bağlam encoder çalıştırılmadan bu indeksten getirilir.
+
+Tokenizasyon:
+- Türkçe küçük harf dönüşümü ve ASCII katlama ("Çini" ile "cini" aynı terimdir)
+- Kesme işaretinden sonraki ek atılır ("Ayasofya'yı" -> "ayasofya")
+- Yaygın çekim ekleri atılır ("çinisi", "çinileri", "çinileriyle" -> "cin"),
+  kalan kök ilk 5 harfiyle sınırlanır (F5)
+"""
+
+import heapq
+import math
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+from src.gazetteer import turkish_casefold
+
+ASCII_FOLD = str.maketrans('çğıöşüâîû', 'cgiosuaiu')
+APOSTROPHE_SUFFIX = re.compile(r"['’`]\w*")
+WORD = re.compile(r'\w+')
+PARENTHESIS = re.compile(r'\(([^)]*)\)')
+STEM_LENGTH = 5
+MIN_STEM_LENGTH = 3
+
+# Alan ağırlıkları (terim frekansı bu katsayıyla sayılır)
+FIELD_WEIGHTS = (
+    ('baslik', 3),
+    ('ozellikler', 2),
+    ('aciklama', 1),
+)
+
+
+def _fold(word: str) -> str:
+    return word.translate(ASCII_FOLD)
+
+
+# Kökten atılan çekim ekleri (ASCII katlanmış, uzundan kısaya denenir)
+SUFFIXES = sorted({_fold(suffix) for suffix in (
+    'leriyle', 'larıyla', 'lerinde', 'larında', 'lerini', 'larını', 'lerin', 'ların', 'leri', 'ları',
+    'ler', 'lar', 'inde', 'ında', 'unda', 'ünde', 'nde', 'nda', 'den', 'dan', 'ten', 'tan',
+    'nin', 'nın', 'nun', 'nün', 'yla', 'yle', 'si', 'sı', 'su', 'sü', 'de', 'da', 'te', 'ta',
+    'in', 'ın', 'un', 'ün', 'li', 'lı', 'lu', 'lü', 'ye', 'ya', 'yi', 'yı',
+    'i', 'ı', 'u', 'ü', 'e', 'a',
+)}, key=len, reverse=True)
+
+
+def stem(word: str) -> str:
+    """
+    Katlanmış kelimenin kökünü döndürür
+
+    Ekler, kök MIN_STEM_LENGTH harften kısa kalmayacak şekilde tekrar
+    tekrar atılır; sonuç ilk STEM_LENGTH harfle sınırlanır. Aynı işlem
+    hem kayıtlara hem sorulara uygulandığından fazla kırpma eşleşmeyi bozmaz.
+    """
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+                word = word[:-len(suffix)]
+                stripped = True
+                break
+    return word[:STEM_LENGTH]
+
+
+# İndekslenmeyen sık kelimeler ve soru kalıpları
+STOPWORDS = {_fold(word) for word in (
+    'bir', 've', 'ile', 'için', 'bu', 'şu', 'da', 'de', 'ki', 'ne', 'neler', 'nedir', 'nelerdir',
+    'hangi', 'hangileri', 'mi', 'mı', 'mu', 'mü', 'var', 'olan', 'gibi', 'daha', 'en', 'çok',
+    'hakkında', 'bilgi', 'ver', 'verir', 'misin', 'mısın', 'nerede', 'nerededir', 'nasıl',
+    'bana', 'biraz', 'anlat', 'anlatır', 'anlatabilir', 'öner', 'önerir', 'olarak', 'kadar',
+)}
+
+# Bir kaydın adını soran sorularda adın yanında bulunabilecek kelimeler
+# ("Ayasofya Camii ziyaret saatleri") - kök halinde
+NAME_QUERY_TERMS = {stem(_fold(word)) for word in (
+    'ziyaret', 'saatleri', 'saat', 'ücreti', 'ücret', 'giriş', 'fiyatı', 'kaçta', 'açık', 'tarihi',
+)}
+
+
+def tokenize(text: Any) -> List[str]:
+    """
+    Metni indeks terimlerine ayırır
+
+    Args:
+        text: Metin veya metin listesi (ör. `ozellikler`)
+
+    Returns:
+        Terim listesi (tekrarlar korunur)
+    """
+    if not isinstance(text, str):
+        text = " ".join(str(part) for part in text or ())
+    text = APOSTROPHE_SUFFIX.sub(' ', turkish_casefold(text))
+    terms = []
+    for word in WORD.findall(text):
+        word = _fold(word)
+        if len(word) > 1 and word not in STOPWORDS:
+            terms.append(stem(word))
+    return terms
+
+
+def title_names(title: str) -> List[str]:
+    """
+    Başlığın kendi başına kullanılabilen adlarını döndürür
+
+    "Sultanahmet Camii (Mavi Cami)" -> ["Sultanahmet Camii", "Mavi Cami"]
+    """
+    names = [PARENTHESIS.sub(' ', title)]
+    names.extend(PARENTHESIS.findall(title))
+    return [name for name in names if name.strip()]
+
+
+class LexicalIndex:
+    """
+    BM25 skorlamalı ters indeks
+
+    Kayıtlar tek tek eklenir; IDF ve ortalama doküman uzunluğu arama
+    anında hesaplandığından ayrı bir derleme adımı yoktur. Yükleme sırasında
+    yeni bir indeks kurulup hazır olunca mevcut indeksle değiştirilir.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            k1: Terim frekansı doygunluk parametresi
+            b: Doküman uzunluğu normalizasyon parametresi
+        """
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []  # iç sıra -> kayıt ID
+        self._positions = {}  # kayıt ID -> iç sıra
+        self.doc_metadata = []  # iç sıra -> başlık, şehir, bölge, kategori
+        self.doc_lengths = []
+        self.total_length = 0
+        self.postings = {}  # terim -> [(iç sıra, ağırlıklı frekans), ...]
+        self._titles_by_term = {}  # başlık terimi -> [(başlık terimleri, iç sıra), ...]
+        self._title_heads = []  # iç sıra -> başlıktaki adların ilk terimleri
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, record_id: str, record: Dict[str, Any]):
+        """
+        Kaydı indekse ekler
+
+        Args:
+            record_id: ChromaDB kayıt ID'si
+            record: `baslik`, `aciklama`, `ozellikler` alanlarını içeren kayıt
+        """
+        index = len(self.doc_ids)
+        frequencies = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(record.get(field) or ''):
+                frequencies[term] = frequencies.get(term, 0) + weight
+
+        length = sum(frequencies.values())
+        self._positions[str(record_id)] = index
+        self.doc_ids.append(str(record_id))
+        self.doc_metadata.append({
+            'baslik': record.get('baslik', ''),
+            'sehir': record.get('sehir', ''),
+            'bolge': record.get('bolge', ''),
+            'kategori': record.get('kategori', ''),
+        })
+        self.doc_lengths.append(length)
+        self.total_length += length
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, []).append((index, frequency))
+
+        heads = set()
+        for name in title_names(record.get('baslik', '')):
+            name_terms = tokenize(name)
+            title_terms = frozenset(name_terms)
+            for term in title_terms:
+                self._titles_by_term.setdefault(term, []).append((title_terms, index))
+            if name_terms:
+                heads.add(name_terms[0])
+        self._title_heads.append(heads)
+
+    def metadata(self, record_id: str) -> Dict[str, Any]:
+        """Kaydın başlık, şehir, bölge ve kategori bilgisi (kayıt yoksa None)"""
+        index = self._positions.get(str(record_id))
+        return None if index is None else self.doc_metadata[index]
+
+    def search(self, query: str, limit: int, exclude_ids: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """
+        Soruyu BM25 ile skorlar
+
+        Args:
+            query: Kullanıcının sorusu
+            limit: Döndürülecek en fazla sonuç
+            exclude_ids: Sonuçlara alınmayacak kayıt ID'leri
+
+        Returns:
+            Skora göre azalan (kayıt ID, skor) listesi
+        """
+        if not self.doc_ids:
+            return []
+        document_count = len(self.doc_ids)
+        average_length = self.total_length / document_count or 1.0
+        excluded = set(exclude_ids or ())
+
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (document_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for index, frequency in posting:
+                normalization = self.k1 * (1 - self.b + self.b * self.doc_lengths[index] / average_length)
+                scores[index] = scores.get(index, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + normalization)
+
+        candidates = (
+            (score, index) for index, score in scores.items()
+            if self.doc_ids[index] not in excluded
+        )
+        return [(self.doc_ids[index], score) for score, index in heapq.nlargest(limit, candidates)]
+
+    def title_matches(self, query: str, exclude_ids: Iterable[str] = ()) -> List[str]:
+        """
+        Soru yalnızca kayıt adlarından oluşuyorsa bu kayıtları döndürür
+
+        Sorudaki her terim, tam olarak geçen bir başlığa ait olmalıdır
+        (soru kalıpları ve NAME_QUERY_TERMS hariç); aksi halde soru bir
+        ad sorgusu sayılmaz ve boş liste döner.
+
+        Returns:
+            Adı geçen kayıtların ID'leri (hariç tutulanlar çıkarılmış)
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return []
+
+        covered = set()
+        matched = []
+        for term in query_terms:
+            for title_terms, index in self._titles_by_term.get(term, ()):
+                if title_terms <= query_terms:
+                    covered |= title_terms
+                    if index not in matched:
+                        matched.append(index)
+        if not matched or query_terms - covered - NAME_QUERY_TERMS:
+            return []
+
+        excluded = set(exclude_ids or ())
+        return [self.doc_ids[index] for index in sorted(matched) if self.doc_ids[index] not in excluded]
+
+    def name_matches(self, query: str) -> List[str]:
+        """
+        Soru tek bir kaydın adıysa (veya adının baş kısmıysa) o adı taşıyan kayıtları döndürür
+
+        title_matches'ten farkı, adın tamamının yazılması gerekmemesidir:
+        sorudaki tüm terimler aynı başlıkta geçmeli ve adın ilk kelimesi
+        soruda bulunmalıdır ("Efes" -> "Efes Antik Kenti", "Topkapı" ->
+        "Topkapı Sarayı"). Farklı başlıklı birden fazla kayıt eşleşirse
+        soru belirsiz sayılır ve boş liste döner.
+
+        Returns:
+            Eşleşen başlığa sahip kayıtların ID'leri
+        """
+        query_terms = set(tokenize(query)) - NAME_QUERY_TERMS
+        if not query_terms:
+            return []
+
+        candidates = None
+        for term in query_terms:
+            indexes = {index for _, index in self._titles_by_term.get(term, ())}
+            candidates = indexes if candidates is None else candidates & indexes
+            if not candidates:
+                return []
+
+        named = [index for index in sorted(candidates) if self._title_heads[index] & query_terms]
+        if len({self.doc_metadata[index]['baslik'] for index in named}) != 1:
+            return []
+        return [self.doc_ids[index] for index in named]
@@ -0,0 +1,523 @@
+"""
+LLM Client
+Gemini çağrıları için dayanıklı istemci katmanı.
+
+GenerativeModel doğrudan çağrıldığında zaman aşımı, yeniden deneme veya
+eşzamanlılık sınırı yoktur; yavaş bir Gemini yanıtı worker'ı süresiz
+tutar. LLMClient her çağrıyı:
+
+- sync yolda sınırlı bir thread havuzunda çalıştırır; eşzamanlı model
+  çağrısı sayısı max_concurrency ile sınırlanır, SDK'ya iletilen istek
+  zaman aşımı takılan bağlantıyı da kapatır
+- async yolda (agenerate) SDK'nın async çağrısını bekler; thread
+  tutulmadığı için sınır ayrıdır (async_max_concurrency) ve yüzlerce
+  eşzamanlı sohbet aynı anda Gemini'yi bekleyebilir
+- deneme başına zaman aşımı (timeout) ve toplam süre bütçesi (deadline)
+  ile sınırlar
+- geçici hataları (kota, zaman aşımı, 5xx) bütçe içinde jitter'lı üstel
+  bekleme ile yeniden dener
+- isteğe bağlı olarak (hedge) son çağrıların p95 süresini aşan isteği
+  ikinci kez gönderir ve önce gelen yanıtı kullanır
+- bütçe tükenirse daha ucuz bir yedek modele, o da yoksa veya başarısız
+  olursa getirilen kayıtlardan oluşturulan şablon yanıta düşer
+
+Yanıt, üretildiği yolla birlikte döner (primary, hedge, fallback_model,
+template); yedek yollardan gelen yanıtlar önbelleğe yazılmamalıdır.
+"""
+
+import asyncio
+import html
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.batch import backoff_delay
+from src.context_packer import parse_document, MISSING_VALUES, SENTENCE_BOUNDARY
+from src.metrics import LLM_CALLS, LLM_HEDGES, LLM_RETRIES, LLM_TIMEOUTS
+
+PRIMARY = 'primary'
+HEDGE = 'hedge'
+FALLBACK_MODEL = 'fallback_model'
+TEMPLATE = 'template'
+
+# Asıl modelden gelen (önbelleğe yazılabilecek) yanıt yolları
+MODEL_PATHS = (PRIMARY, HEDGE)
+
+# Şablon yanıtta listelenen en fazla kayıt
+TEMPLATE_MAX_RECORDS = 5
+
+
+class LLMTimeoutError(TimeoutError):
+    """Çağrı deneme süresi veya toplam bütçe içinde tamamlanmadı"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Hata yeniden denemeye değer mi
+
+    Zaman aşımı, bağlantı hataları, kota (429) ve sunucu (5xx) hataları
+    geçicidir; geçersiz istek, yetki hataları ve güvenlik filtresi
+    nedeniyle metin içermeyen yanıt (ValueError) tekrar denenmez.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code in (408, 429) or code >= 500
+    return not isinstance(error, ValueError)
+
+
+def template_answer(context_docs: List[Dict[str, Any]], max_records: int = TEMPLATE_MAX_RECORDS) -> str:
+    """
+    Getirilen kayıtlardan LLM kullanmadan kısa bir yanıt oluşturur
+
+    Yanıt, prompt'ta istenen HTML biçimindedir: her kayıt için başlık,
+    konum, açıklamanın ilk cümlesi ve varsa ziyaret saatleri ile ücret.
+    """
+    lines = ["Şu anda ayrıntılı bir yanıt oluşturamıyorum; veritabanında sorunuzla ilgili bulduğum yerler:"]
+    for number, doc in enumerate(context_docs[:max_records], 1):
+        fields = parse_document(doc['document'])
+        metadata = doc.get('metadata') or {}
+        baslik = html.escape(fields.get('baslik') or metadata.get('baslik', 'Bilinmiyor'), quote=False)
+        sehir = html.escape(fields.get('sehir') or metadata.get('sehir', ''), quote=False)
+        line = f"{number}. 📍 <strong>{baslik}</strong>" + (f" ({sehir})" if sehir else "")
+        sentences = SENTENCE_BOUNDARY.split(fields.get('aciklama', '').strip(), maxsplit=1)
+        if sentences[0]:
+            line += f"<br>{html.escape(sentences[0], quote=False)}"
+        for field, emoji in (('ziyaret_saatleri', '⏰'), ('giris_ucreti', '💰')):
+            if fields.get(field, '') not in MISSING_VALUES:
+                line += f"<br>{emoji} {html.escape(fields[field], quote=False)}"
+        lines.append(line)
+    return "<br>".join(lines)
+
+
+class LatencyTracker:
+    """
+    Son başarılı çağrıların sürelerinden yüzdelik hesaplar (thread güvenli)
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Args:
+            window: Dikkate alınan son çağrı sayısı
+            min_samples: Yüzdelik hesaplamak için gereken en az çağrı
+        """
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q yüzdeliği (0-1); yeterli örnek yoksa None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def _chunk_text(chunk: Any) -> str:
+    try:
+        return chunk.text
+    except ValueError:
+        # Metin içermeyen parça (ör. güvenlik filtresi bilgisi)
+        return ''
+
+
+class LLMClient:
+    """
+    GenerativeModel etrafında zaman aşımı, yeniden deneme, hedge ve
+    yedek yanıt sağlayan istemci
+    """
+
+    def __init__(self, model: Any, fallback_model: Any = None, timeout: float = 20.0,
+                 deadline: float = 45.0, max_concurrency: int = 8, max_retries: int = 2,
+                 base_delay: float = 0.5, max_delay: float = 8.0, hedge: bool = False,
+                 hedge_quantile: float = 0.95, fallback_timeout: float = 10.0,
+                 on_response: Callable[[Any], None] = None, async_max_concurrency: int = 256,
+                 async_native: bool = True):
+        """
+        Args:
+            model: genai.GenerativeModel (veya aynı arayüzde sahte model)
+            fallback_model: Bütçe tükenince kullanılacak daha ucuz model (None: yok)
+            timeout: Deneme başına en uzun süre (saniye)
+            deadline: Yeniden denemeler dahil toplam süre bütçesi (saniye)
+            max_concurrency: Eşzamanlı en fazla model çağrısı
+            max_retries: İlk denemeden sonra en fazla yeniden deneme
+            base_delay: İlk yeniden deneme beklemesi (saniye)
+            max_delay: En uzun yeniden deneme beklemesi (saniye)
+            hedge: True ise p95 süresini aşan çağrı ikinci kez gönderilir
+            hedge_quantile: Hedge eşiği olarak kullanılan yüzdelik
+            fallback_timeout: Yedek model çağrısının süresi (saniye)
+            on_response: Başarılı her model yanıtıyla çağrılır (ör. token metrikleri)
+            async_max_concurrency: Async yolda eşzamanlı en fazla model çağrısı
+            async_native: False ise async yol da thread havuzunu kullanır (SDK'nın
+                REST transport'unda generate_content_async gerçekten async değildir)
+        """
+        self.model = model
+        self.fallback_model = fallback_model
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.fallback_timeout = fallback_timeout
+        self.on_response = on_response
+        self.async_max_concurrency = max(1, async_max_concurrency)
+        self.async_native = async_native
+        self.latency = LatencyTracker()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # Eşzamanlı model çağrısını semafor sınırlar; havuzdaki fazladan
+        # thread'ler hedge çağrıları ve süresi dolmuş ama henüz dönmemiş
+        # çağrılar içindir
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency * 2,
+                                            thread_name_prefix='llm')
+        # asyncio.Semaphore çalışan event loop'a bağlanır; loop değişirse yeniden oluşturulur
+        self._async_slots = None
+        self._async_slots_loop = None
+
+    def _acquire_slot(self, expires: float):
+        if not self._slots.acquire(timeout=max(0.0, expires - time.monotonic())):
+            raise LLMTimeoutError("Eşzamanlı Gemini çağrısı sınırı dolu")
+
+    def _call(self, model: Any, prompt: str, timeout: float, expires: float) -> Tuple[Any, str, float]:
+        """Havuz thread'inde tek bir model çağrısı yapar"""
+        self._acquire_slot(expires)
+        try:
+            start = time.monotonic()
+            response = model.generate_content(prompt, request_options={'timeout': timeout})
+            text = response.text
+        finally:
+            self._slots.release()
+        return response, text, time.monotonic() - start
+
+    def _open_stream(self, prompt: str, timeout: float, expires: float) -> Tuple[Iterator[Any], Any]:
+        """
+        Havuz thread'inde stream'i açar ve ilk parçayı bekler
+
+        Slot yalnızca ilk parçaya kadar tutulur: kalan parçalar çağıranın
+        thread'inde okunur ve havuzu meşgul etmez. Slot stream boyunca
+        tutulsaydı max_concurrency'den fazla eşzamanlı sohbet şablon
+        yanıta düşerdi.
+        """
+        self._acquire_slot(expires)
+        try:
+            chunks = iter(self.model.generate_content(prompt, stream=True, request_options={'timeout': timeout}))
+            return chunks, next(chunks, None)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _abandon_stream(future):
+        """Süresi dolduktan sonra açılan stream'i kapatır"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        chunks, _ = future.result()
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+    def _hedge_after(self, timeout: float) -> Optional[float]:
+        if not self.hedge:
+            return None
+        threshold = self.latency.quantile(self.hedge_quantile)
+        return threshold if threshold is not None and threshold < timeout else None
+
+    def _attempt(self, prompt: str, timeout: float) -> Tuple[Any, str, str]:
+        """
+        Tek deneme: asıl çağrı ve gerekirse hedge çağrısı; önce başarıyla biten kullanılır
+
+        Returns:
+            (yanıt, metin, yol)
+        """
+        start = time.monotonic()
+        expires = start + timeout
+        hedge_after = self._hedge_after(timeout)
+        hedge_at = start + hedge_after if hedge_after is not None else None
+        pending = {self._executor.submit(self._call, self.model, prompt, timeout, expires): PRIMARY}
+        error = None
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= expires:
+                    break
+                until = min(expires, hedge_at) if hedge_at is not None else expires
+                done, _ = wait(pending, timeout=until - now, return_when=FIRST_COMPLETED)
+                if not done and hedge_at is not None and time.monotonic() >= hedge_at:
+                    LLM_HEDGES.inc()
+                    pending[self._executor.submit(self._call, self.model, prompt, timeout, expires)] = HEDGE
+                    hedge_at = None
+                    continue
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        response, text, elapsed = future.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    self.latency.observe(elapsed)
+                    return response, text, path
+        finally:
+            for future in pending:
+                future.cancel()
+        if pending or error is None:
+            raise LLMTimeoutError(f"Gemini yanıtı {timeout:.1f} sn içinde gelmedi")
+        raise error
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._async_slots is None or self._async_slots_loop is not loop:
+            self._async_slots = asyncio.Semaphore(self.async_max_concurrency)
+            self._async_slots_loop = loop
+        return self._async_slots
+
+    async def _acall(self, model: Any, prompt: str, timeout: float, expires: float) -> Tuple[Any, str, float]:
+        """
+        Tek bir async model çağrısı
+
+        async_native ise SDK'nın async çağrısı beklenir (thread tutulmaz),
+        değilse çağrı sync yoldaki gibi thread havuzunda çalışır.
+        """
+        if not self.async_native:
+            return await asyncio.wrap_future(self._executor.submit(self._call, model, prompt, timeout, expires))
+        async with self._async_semaphore():
+            start = time.monotonic()
+            response = await model.generate_content_async(prompt, request_options={'timeout': timeout})
+            text = response.text
+        return response, text, time.monotonic() - start
+
+    async def _aattempt(self, prompt: str, timeout: float) -> Tuple[Any, str, str]:
+        """_attempt'in event loop'u bloklamayan karşılığı"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        expires = time.monotonic() + timeout
+        hedge_after = self._hedge_after(timeout)
+        hedge_at = start + hedge_after if hedge_after is not None else None
+
+        def submit():
+            return asyncio.ensure_future(self._acall(self.model, prompt, timeout, expires))
+
+        pending = {submit(): PRIMARY}
+        error = None
+        try:
+            while pending:
+                now = loop.time()
+                if now >= start + timeout:
+                    break
+                until = min(start + timeout, hedge_at) if hedge_at is not None else start + timeout
+                done, _ = await asyncio.wait(pending, timeout=until - now, return_when=asyncio.FIRST_COMPLETED)
+                if not done and hedge_at is not None and loop.time() >= hedge_at:
+                    LLM_HEDGES.inc()
+                    pending[submit()] = HEDGE
+                    hedge_at = None
+                    continue
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        response, text, elapsed = future.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    self.latency.observe(elapsed)
+                    return response, text, path
+        finally:
+            # İptal edilen çağrı semaforu bırakır ve SDK isteğini kapatır
+            for future in pending:
+                future.cancel()
+        if pending or error is None:
+            raise LLMTimeoutError(f"Gemini yanıtı {timeout:.1f} sn içinde gelmedi")
+        raise error
+
+    def _retry_delay(self, error: Exception, retries: int, max_retries: int, deadline: float) -> Optional[float]:
+        """Yeniden deneme beklemesi; denenmeyecekse None"""
+        if isinstance(error, LLMTimeoutError):
+            LLM_TIMEOUTS.inc()
+        if retries >= max_retries or not is_retryable(error):
+            return None
+        delay = backoff_delay(retries + 1, self.base_delay, self.max_delay)
+        if time.monotonic() + delay >= deadline:
+            return None
+        LLM_RETRIES.inc()
+        return delay
+
+    def _with_retries(self, attempt: Callable[[float], Any], deadline: float, max_retries: int,
+                      before_attempt: Callable[[], None] = None) -> Any:
+        retries = 0
+        while True:
+            if before_attempt is not None:
+                before_attempt()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMTimeoutError("Gemini süre bütçesi doldu")
+            try:
+                return attempt(min(self.timeout, remaining))
+            except Exception as e:
+                delay = self._retry_delay(e, retries, max_retries, deadline)
+                if delay is None:
+                    raise
+                retries += 1
+                time.sleep(delay)
+
+    def _record(self, response: Any, path: str):
+        if self.on_response is not None:
+            self.on_response(response)
+        LLM_CALLS.inc(path=path)
+
+    def _fallback(self, prompt: str, fallback: Optional[Callable[[], str]], error: Exception) -> Tuple[str, str]:
+        """Yedek model, o da olmazsa şablon yanıt; ikisi de yoksa asıl hata fırlatılır"""
+        print(f"⚠️ Gemini yanıt vermedi, yedek yanıta geçiliyor: {str(error)}")
+        if self.fallback_model is not None:
+            expires = time.monotonic() + self.fallback_timeout
+            future = self._executor.submit(self._call, self.fallback_model, prompt, self.fallback_timeout, expires)
+            try:
+                response, text, _ = future.result(timeout=self.fallback_timeout)
+                self._record(response, FALLBACK_MODEL)
+                return text, FALLBACK_MODEL
+            except FuturesTimeoutError:
+                future.cancel()
+                print("✗ Yedek model yanıtı zamanında gelmedi")
+            except Exception as e:
+                print(f"✗ Yedek model hatası: {str(e)}")
+        if fallback is not None:
+            LLM_CALLS.inc(path=TEMPLATE)
+            return fallback(), TEMPLATE
+        LLM_CALLS.inc(path='error')
+        raise error
+
+    async def _afallback(self, prompt: str, fallback: Optional[Callable[[], str]],
+                         error: Exception) -> Tuple[str, str]:
+        """_fallback'in async karşılığı"""
+        print(f"⚠️ Gemini yanıt vermedi, yedek yanıta geçiliyor: {str(error)}")
+        if self.fallback_model is not None:
+            expires = time.monotonic() + self.fallback_timeout
+            try:
+                response, text, _ = await asyncio.wait_for(
+                    self._acall(self.fallback_model, prompt, self.fallback_timeout, expires),
+                    timeout=self.fallback_timeout
+                )
+                self._record(response, FALLBACK_MODEL)
+                return text, FALLBACK_MODEL
+            except asyncio.TimeoutError:
+                print("✗ Yedek model yanıtı zamanında gelmedi")
+            except Exception as e:
+                print(f"✗ Yedek model hatası: {str(e)}")
+        if fallback is not None:
+            LLM_CALLS.inc(path=TEMPLATE)
+            return fallback(), TEMPLATE
+        LLM_CALLS.inc(path='error')
+        raise error
+
+    def generate(self, prompt: str, fallback: Callable[[], str] = None, use_fallback: bool = True,
+                 max_retries: int = None, before_attempt: Callable[[], None] = None) -> Tuple[str, str]:
+        """
+        Prompt için yanıt üretir
+
+        Args:
+            prompt: Gemini'ye gönderilecek prompt
+            fallback: Bütçe tükenirse şablon yanıtı üreten fonksiyon
+            use_fallback: False ise yedek model ve şablon kullanılmaz, hata fırlatılır
+                (ör. önceden hesaplanıp saklanacak yanıtlar)
+            max_retries: Yeniden deneme sayısı (varsayılan: istemci ayarı)
+            before_attempt: Her denemeden önce çağrılır (ör. RateLimiter.acquire)
+
+        Returns:
+            (yanıt metni, yol)
+
+        Raises:
+            Yedek kullanılamıyorsa son denemenin hatası
+        """
+        deadline = time.monotonic() + self.deadline
+        if max_retries is None:
+            max_retries = self.max_retries
+        try:
+            response, text, path = self._with_retries(
+                lambda timeout: self._attempt(prompt, timeout), deadline, max_retries, before_attempt
+            )
+        except Exception as e:
+            if not use_fallback:
+                LLM_CALLS.inc(path='error')
+                raise
+            return self._fallback(prompt, fallback, e)
+        self._record(response, path)
+        return text, path
+
+    async def agenerate(self, prompt: str, fallback: Callable[[], str] = None) -> Tuple[str, str]:
+        """generate'in async karşılığı; model çağrısı beklenirken event loop serbesttir"""
+        deadline = time.monotonic() + self.deadline
+        retries = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise LLMTimeoutError("Gemini süre bütçesi doldu")
+                response, text, path = await self._aattempt(prompt, min(self.timeout, remaining))
+                break
+            except Exception as e:
+                delay = None if remaining <= 0 else self._retry_delay(e, retries, self.max_retries, deadline)
+                if delay is None:
+                    return await self._afallback(prompt, fallback, e)
+                retries += 1
+                await asyncio.sleep(delay)
+        self._record(response, path)
+        return text, path
+
+    def stream(self, prompt: str, fallback: Callable[[], str] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Yanıtı parça parça üretir
+
+        İlk parçaya kadar zaman aşımı ve yeniden deneme uygulanır; stream
+        hiç açılamazsa veya hiç metin içermezse yedek yanıt tek parça olarak
+        döner. Metin geldikten sonraki hatalar çağırana iletilir (yarım yanıt
+        tekrar üretilmez). Stream çağrılarında hedge yapılmaz.
+
+        Yields:
+            (metin parçası, yol)
+        """
+        deadline = time.monotonic() + self.deadline
+
+        def open_stream(timeout):
+            future = self._executor.submit(self._open_stream, prompt, timeout, time.monotonic() + timeout)
+            try:
+                return future.result(timeout=timeout)
+            except FuturesTimeoutError:
+                if not future.cancel():
+                    future.add_done_callback(self._abandon_stream)
+                raise LLMTimeoutError(f"Gemini yanıtı {timeout:.1f} sn içinde başlamadı")
+
+        try:
+            chunks, first = self._with_retries(open_stream, deadline, self.max_retries)
+        except Exception as e:
+            yield self._fallback(prompt, fallback, e)
+            return
+
+        produced = False
+        try:
+            chunk = first
+            if chunk is not None:
+                text = _chunk_text(chunk)
+                if text:
+                    produced = True
+                    yield text, PRIMARY
+                for chunk in chunks:
+                    text = _chunk_text(chunk)
+                    if text:
+                        produced = True
+                        yield text, PRIMARY
+                if produced:
+                    # Token sayıları son parçada raporlanır
+                    self._record(chunk, PRIMARY)
+            if not produced:
+                # Sync yoldaki gibi (response.text ValueError) metinsiz yanıt yedek yanıta düşer
+                yield self._fallback(prompt, fallback, ValueError("Gemini yanıtı metin içermiyor"))
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
@@ -0,0 +1,256 @@
+"""
+Metrics - Aşama Süreleri ve Prometheus Çıktısı
+Sohbet isteğinin sıcak yolundaki aşamaların sürelerini ölçer.
+
+Her aşama (embedding, filtreli arama, genel arama, birleştirme, prompt,
+LLM çağrısı, oturum kaydı) `stage()` ile sarılır; süre hem histograma
+hem de, istek için iz (trace) açıksa, o isteğin iz listesine yazılır.
+Histogramlar /metrics üzerinden Prometheus metin formatında sunulur.
+
+Not: Değerler süreç içidir; gunicorn'un her worker'ı kendi değerlerini
+tutar ve /metrics isteği hangi worker'a düşerse onunkini döndürür.
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# Saniye cinsinden gecikme kovaları (1 ms - 30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMPT_CHAR_BUCKETS = (1000, 2000, 4000, 8000, 16000, 32000, 64000)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Yalnızca artan sayaç"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Kümülatif kovalı histogram"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [kova sayıları..., toplam, adet]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets + (float('inf'),), series[:-2] + [series[-1]]):
+                    labels = _format_labels(key + (('le', _format_value(float(bound))),))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Metrik kaydı
+
+    Sabit metrikler dışında, çıktı anında değer üreten toplayıcılar
+    (ör. önbellek boyutları) `add_collector` ile eklenebilir.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, str, float]]]):
+        """
+        Args:
+            collector: (isim, tür, açıklama, değer) dörtlülerini döndüren fonksiyon
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus metin formatında (0.0.4) çıktı üretir"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception:
+                continue
+            for name, kind, documentation, value in samples:
+                lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {kind}",
+                              f"{name} {_format_value(value)}"])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'turkiyegpt_stage_seconds', 'Sohbet isteğindeki aşamaların süresi', ('stage',)
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'turkiyegpt_request_seconds', 'HTTP isteklerinin toplam süresi', ('endpoint', 'status')
+))
+PROMPT_CHARS = REGISTRY.register(Histogram(
+    'turkiyegpt_prompt_chars', 'Gemini prompt uzunluğu (karakter)', buckets=PROMPT_CHAR_BUCKETS
+))
+LLM_TOKENS = REGISTRY.register(Histogram(
+    'turkiyegpt_llm_tokens', 'Gemini tarafından raporlanan token sayısı', ('kind',), buckets=TOKEN_BUCKETS
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'turkiyegpt_cache_requests_total', 'Önbellek sorguları', ('cache', 'result')
+))
+LLM_RETRIES = REGISTRY.register(Counter(
+    'turkiyegpt_llm_retries_total', 'Hata sonrası yeniden denenen Gemini çağrıları'
+))
+ANSWERS = REGISTRY.register(Counter(
+    'turkiyegpt_answers_total', 'Sohbet yanıtları (yanıtın sunulduğu yola göre)', ('path',)
+))
+LLM_CALLS = REGISTRY.register(Counter(
+    'turkiyegpt_llm_calls_total', 'Yanıt üretme çağrıları (yanıtın geldiği yola göre)', ('path',)
+))
+LLM_TIMEOUTS = REGISTRY.register(Counter(
+    'turkiyegpt_llm_timeouts_total', 'Süresi içinde tamamlanmayan Gemini denemeleri'
+))
+LLM_HEDGES = REGISTRY.register(Counter(
+    'turkiyegpt_llm_hedges_total', 'p95 süresini aştığı için ikinci kez gönderilen Gemini çağrıları'
+))
+
+
+# İstek başına iz: açıksa aşama süreleri bu listeye de yazılır
+_current_trace = contextvars.ContextVar('turkiyegpt_trace', default=None)
+
+
+def observe_stage(name: str, elapsed: float):
+    """Ölçülmüş bir aşama süresini histograma (ve açık iz varsa ize) yazar"""
+    STAGE_SECONDS.observe(elapsed, stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append((name, elapsed))
+
+
+@contextmanager
+def stage(name: str):
+    """Bloğun süresini aşama histogramına (ve açık iz varsa ize) yazar"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def start_trace():
+    """
+    Geçerli istek için iz başlatır
+
+    Returns:
+        end_trace() ile kullanılacak token
+    """
+    return _current_trace.set([])
+
+
+def current_trace() -> List[Tuple[str, float]]:
+    """Geçerli izin (aşama, süre) listesini döndürür; iz kapalıysa None"""
+    return _current_trace.get()
+
+
+def end_trace(token):
+    """İzi kapatır"""
+    _current_trace.reset(token)
+
+
+@contextmanager
+def use_trace(trace: List[Tuple[str, float]]):
+    """
+    Verilen iz listesini blok boyunca geçerli iz yapar
+
+    Streaming yanıtlarda generator, isteğin context'i kapandıktan sonra
+    çalışır; iz bu sayede akış sırasında da tutulmaya devam eder.
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # Generator başka bir context'te kapatıldı
+            pass
+
+
+def trace_summary(trace: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Aynı aşamanın tekrarlarını toplayarak {aşama: milisaniye} döndürür"""
+    summary = {}
+    for name, elapsed in trace or []:
+        summary[name] = summary.get(name, 0.0) + elapsed * 1000.0
+    return {name: round(value, 3) for name, value in summary.items()}
+
+
+def server_timing_header(trace: List[Tuple[str, float]]) -> str:
+    """İzi standart Server-Timing başlığı olarak biçimlendirir"""
+    return ", ".join(f"{name};dur={value}" for name, value in trace_summary(trace).items())
+
+
+def bind_context(func: Callable, *args, **kwargs) -> Callable:
+    """
+    Fonksiyonu geçerli context ile çalışacak şekilde bağlar
+
+    run_in_executor context'i thread'e taşımaz; iz bu sayede thread
+    havuzunda çalışan aşamalarda da tutulur.
+    """
+    return functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
@@ -0,0 +1,189 @@
+"""
+Query Planner
+Kullanıcı sorusundaki yapılandırılmış kısıtları çıkarır.
+
+"Ege'deki ücretsiz antik kentler" -> bölge = Ege, ücret = Ücretsiz (veya
+Kısmen ücretli), etiket = Antik Kent; "Salı açık müzeler İstanbul" ->
+şehir = İstanbul, etiket = Müze, Salı kapalı olmayanlar. Plan
+src.facets.FacetIndex ile vektör aramasından önce tam olarak
+değerlendirilir; koşulları sağlayan kayıtlar vektör aramasına ön filtre
+olarak verilir.
+
+Tanınan kısıtlar:
+- Şehir / bölge / kategori (gazetteer)
+- Etiket ("antik kent", "müze", "şelale"), ücret ("ücretsiz", "müze kart"),
+  dönem ("Osmanlı", "Bizans", "antik çağ")
+- Açık olma günü ("Salı açık", "hafta sonu açık") ve saati ("20:00'de açık",
+  "akşam açık", "7/24 açık")
+- Yıl aralığı ("1500'den önce", "M.Ö. 3. yüzyıl", "15. yüzyıldan sonra")
+
+Şehir/bölge/kategori dışında bir kısıt içeren çoğul veya "tüm / hangileri"
+soruları listeleme sorusu olarak işaretlenir; bunlarda koşulu sağlayan
+kayıtların tamamı bağlama alınabilir.
+"""
+
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from src.facets import FACET_PATTERNS, FEE_FREE, FEE_PAID, FEE_PARTIAL, WEEKDAYS, DAY_NAMES
+from src.gazetteer import Gazetteer, ENTITY_FIELDS, turkish_casefold
+
+LOCATION_FIELDS = ('sehir', 'bolge')
+
+# Ücret sınıfı -> kabul edilen değerler ("ücretsiz" sorusu kısmen ücretsiz yerleri de kapsar)
+FEE_VALUES = {
+    FEE_FREE: (FEE_FREE, FEE_PARTIAL),
+    FEE_PAID: (FEE_PAID, FEE_PARTIAL),
+}
+
+OPEN_WORD = re.compile(r'\baçık')
+DAY = re.compile(r'\b(pazartesi|salı|çarşamba|perşembe|cumartesi|cuma|pazar)')
+DAY_GROUPS = {
+    'hafta sonu': WEEKDAYS[5:],
+    'hafta içi': WEEKDAYS[:5],
+}
+CLOCK = re.compile(r'(?<![\d/])([01]?\d|2[0-3])[:.]([0-5]\d)(?!\d)')
+HOUR = re.compile(r'\bsaat\s+([01]?\d|2[0-3])\b')
+# "açık" ile birlikte kullanıldığında saat anlamı taşıyan kelimeler
+TIME_WORDS = (
+    ('sabah', 8 * 60),
+    ('öğle', 12 * 60),
+    ('akşam', 19 * 60),
+    ('gece', 22 * 60),
+)
+ALWAYS_OPEN = re.compile(r'7/24|24 saat')
+
+BOUND = r"(?:\s*['’]?\s*(?:d[ae]n|t[ae]n))?\s+(önce|öncesi|sonra|sonrası)\b"
+YEAR_BOUND = re.compile(r"(\bm\.?\s?ö\.?\s*)?(?<!\d)(\d{3,4})" + BOUND)
+CENTURY = re.compile(r"(\bm\.?\s?ö\.?\s*)?(?<!\d)(\d{1,2})\s*\.\s*(?:yüzyıl|yy)\w*(?:\s+(önce|öncesi|sonra|sonrası)\b)?")
+
+LISTING_WORDS = re.compile(r'\b(tüm|bütün|hepsi\w*|listele\w*|hangileri|hangi|neler|nelerdir)\b')
+PLURAL = re.compile(r'\b\w{2,}l[ae]r')
+# Tekil evet/hayır soruları ("Efes ücretsiz mi?", "Pazartesi açık mı?") belirli
+# bir yeri sorar; ücret, saat ve dönem ifadeleri bu sorularda filtre olmaz
+YES_NO = re.compile(r'\b(mi|mı|mu|mü)(?:dir|dır|sin|sın)?\b')
+
+
+def has_constraints(plan: Dict[str, Any]) -> bool:
+    """Planda en az bir kısıt var mı"""
+    return bool(plan['filters'] or plan['open_days'] or plan['open_at'] is not None or plan['years'])
+
+
+def is_entity_only(plan: Dict[str, Any]) -> bool:
+    """
+    Plan yalnızca şehir/bölge/kategori kısıtlarından mı oluşuyor
+
+    Bu kısıtlar vektör deposunda doğrudan metadata filtresi olarak uygulanabilir.
+    """
+    return (all(field in ENTITY_FIELDS for field in plan['filters'])
+            and not plan['open_days'] and plan['open_at'] is None and not plan['years'])
+
+
+def location_only(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Planın yalnızca konum (şehir/bölge) kısıtını içeren gevşetilmiş hali"""
+    return {
+        'filters': {field: values for field, values in plan['filters'].items() if field in LOCATION_FIELDS},
+        'open_days': [],
+        'open_at': None,
+        'years': None,
+        'listing': False,
+    }
+
+
+def _year_range(before_christ: bool, start: int, end: int, bound: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """[start, end) aralığını M.Ö. işaretine ve önce/sonra ifadesine göre düzenler"""
+    if before_christ:
+        start, end = -end, -start
+    if bound in ('önce', 'öncesi'):
+        return None, start
+    if bound in ('sonra', 'sonrası'):
+        return end, None
+    return start, end
+
+
+class QueryPlanner:
+    """
+    Sorudan yapılandırılmış kısıt planı çıkarır
+    """
+
+    def __init__(self, gazetteer: Gazetteer = None):
+        """
+        Args:
+            gazetteer: src.facets.FACET_PATTERNS ile derlenmiş gazetteer
+                (varsayılan: veri setinden bağımsız boş gazetteer)
+        """
+        self.gazetteer = gazetteer or Gazetteer(extra_patterns=FACET_PATTERNS)
+
+    def plan(self, query: str) -> Dict[str, Any]:
+        """
+        Sorudaki kısıtları çıkarır
+
+        Args:
+            query: Kullanıcının sorusu
+
+        Returns:
+            {'filters': {alan: [değerler]}, 'open_days': [gün, ...],
+             'open_at': gün içi dakika | None, 'years': (başlangıç, bitiş) | None,
+             'listing': bool}; alan içindeki değerler OR, alanlar AND ile birleşir
+        """
+        entities = self.gazetteer.match(query)
+        text = turkish_casefold(query)
+        filters = {}
+
+        # Şehir belirtilmişse bölge kısıtı eklenmez
+        for field in LOCATION_FIELDS:
+            if entities.get(field):
+                filters[field] = list(entities[field])
+                break
+        for field in ('kategori', 'etiket', 'donem'):
+            if entities.get(field):
+                filters[field] = list(entities[field])
+        if entities.get('ucret'):
+            filters['ucret'] = list(dict.fromkeys(
+                value for fee in entities['ucret'] for value in FEE_VALUES[fee]
+            ))
+        if entities.get('muze_kart'):
+            filters['muze_kart'] = [True]
+
+        wants_open = OPEN_WORD.search(text) is not None
+        open_days = []
+        open_at = None
+        if wants_open:
+            for phrase, days in DAY_GROUPS.items():
+                if phrase in text:
+                    open_days.extend(days)
+            open_days.extend(DAY_NAMES[day] for day in DAY.findall(text))
+            for word, minute in TIME_WORDS:
+                if re.search(r'\b' + word, text):
+                    open_at = minute
+            if ALWAYS_OPEN.search(text):
+                filters['acik_7_24'] = [True]
+        clock = CLOCK.search(text) or HOUR.search(text)
+        if clock:
+            open_at = int(clock.group(1)) * 60 + (int(clock.group(2)) if clock.re is CLOCK else 0)
+
+        years = None
+        match = YEAR_BOUND.search(text)
+        if match:
+            year = int(match.group(2))
+            years = _year_range(bool(match.group(1)), year, year, match.group(3))
+        else:
+            match = CENTURY.search(text)
+            if match:
+                century = int(match.group(2))
+                years = _year_range(bool(match.group(1)), (century - 1) * 100, century * 100, match.group(3))
+
+        if YES_NO.search(text) and not LISTING_WORDS.search(text) and not PLURAL.search(text):
+            filters = {field: values for field, values in filters.items() if field in ENTITY_FIELDS}
+            open_days, open_at, years = [], None, None
+
+        plan = {
+            'filters': filters,
+            'open_days': list(dict.fromkeys(open_days)),
+            'open_at': open_at,
+            'years': years,
+        }
+        narrowing = (any(field not in ENTITY_FIELDS for field in filters)
+                     or plan['open_days'] or open_at is not None or years is not None)
+        plan['listing'] = bool(narrowing and (LISTING_WORDS.search(text) or PLURAL.search(text)))
+        return plan
@@ -0,0 +1,195 @@
+"""
+Query Rewriter
+Takip sorularını önceki turun bağlamıyla tamamlar.
+
+"İstanbul'da tarihi yerler" sorusundan sonra gelen "Başka nereleri
+gezebilirim?" sorusunda şehir veya kategori geçmez; soru olduğu gibi
+aranırsa planlayıcı kısıt bulamaz ve genel arama veri setinin her yerinden
+kayıt getirir. Oturumda son turun şehir/bölge/kategori değerleri ve soru
+embedding'i saklanır (sohbet bağlamı); sonraki soru takip sorusuysa:
+
+1. Soruda bulunmayan konum (şehir veya bölge) ve kategori önceki turdan
+   taşınır ve arama metnine eklenir; planlayıcı tek bir filtreli arama yapar
+2. Soruda kendi konumu yoksa embedding önceki turun embedding'i ile
+   harmanlanır (REWRITE_CARRY_WEIGHT)
+
+Takip sorusu kuralları: takip kelimesi ("başka", "diğer", "orada",
+"peki", ...), kısa soru (en fazla SHORT_QUERY_WORDS kelime) veya önceki
+soruyla embedding benzerliğinin eşiği aşması. Hepsi yereldir; LLM çağrısı
+yapılmaz.
+"""
+
+import re
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.gazetteer import Gazetteer, turkish_casefold
+
+LOCATION_FIELDS = ('sehir', 'bolge')
+CARRIED_FIELDS = LOCATION_FIELDS + ('kategori',)
+
+# Önceki turun konusuna devam eden sorulardaki kelimeler
+FOLLOW_UP = re.compile(
+    r'\b(?:başka|diğer\w*|daha|orada\w*|oras[ıi]\w*|oraya|burada\w*|buras[ıi]\w*|peki|ayrıca|'
+    r'yakın\w*|civar\w*|çevre\w*|etraf\w*|bunlar\w*|onlar\w*|aynı)\b'
+)
+
+# Birden fazla yer önerisi isteyen sorular (daha fazla bağlam getirilir)
+EXPLORE = re.compile(r'\b(?:gezebilir\w*|nereler\w*|başka|daha|diğer\w*|gezilecek|görülecek|antik\s+kentler)\b')
+
+SHORT_QUERY_WORDS = 2
+
+
+def suggested_n_results(query: str) -> int:
+    """Soruya göre getirilecek bağlam sayısı: yer önerisi isteyen sorularda 6, diğerlerinde 4"""
+    return 6 if EXPLORE.search(turkish_casefold(query)) else 4
+
+
+def _normalize(embedding: Any) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class QueryRewriter:
+    """
+    Sohbet bağlamıyla takip sorularını yeniden yazar
+    """
+
+    def __init__(self, gazetteer: Gazetteer, similarity_threshold: float = 0.5,
+                 carry_weight: float = 0.3, short_query_words: int = SHORT_QUERY_WORDS):
+        """
+        Args:
+            gazetteer: Şehir/bölge/kategori tespitinde kullanılan gazetteer
+            similarity_threshold: Takip kelimesi olmayan sorunun takip sorusu
+                sayılması için önceki soruyla en düşük kosinüs benzerliği
+            carry_weight: Harmanlanan embedding'de önceki turun ağırlığı
+            short_query_words: Bu sayıda veya daha az kelimeli sorular takip sorusu sayılır
+        """
+        self.gazetteer = gazetteer
+        self.similarity_threshold = similarity_threshold
+        self.carry_weight = carry_weight
+        self.short_query_words = short_query_words
+
+    def is_follow_up(self, query: str, conversation: Dict[str, Any], query_embedding: Any = None) -> bool:
+        """
+        Soru önceki turun konusuna mı devam ediyor
+
+        Embedding benzerliğine yalnızca kurallar karar veremezse bakılır.
+        """
+        return self._rule_follow_up(query) or self._similar(conversation, query_embedding)
+
+    def _rule_follow_up(self, query: str) -> bool:
+        text = turkish_casefold(query)
+        return bool(FOLLOW_UP.search(text)) or len(text.split()) <= self.short_query_words
+
+    def _similar(self, conversation: Dict[str, Any], query_embedding: Any) -> bool:
+        if query_embedding is None or not conversation.get('embedding'):
+            return False
+        similarity = float(np.dot(_normalize(query_embedding), _normalize(conversation['embedding'])))
+        return similarity >= self.similarity_threshold
+
+    def rewrite(self, query: str, conversation: Optional[Dict[str, Any]],
+                query_embedding: Any = None) -> Dict[str, Any]:
+        """
+        Soruyu önceki turun bağlamıyla tamamlar
+
+        Embedding henüz hesaplanmamışsa yalnızca kurallarla karar verilir;
+        embedding sonradan blend ile eklenir (gazetteer yeniden taranmaz).
+
+        Args:
+            query: Kullanıcının sorusu
+            conversation: Önceki turun bağlamı (remember çıktısı) veya None
+            query_embedding: Sorunun embedding'i (benzerlik ve harmanlama için)
+
+        Returns:
+            {'query': arama metni, 'embedding': harmanlanmış embedding veya None,
+             'carried': {alan: [değerler]}, 'entities': sorudaki varlıklar,
+             'follow_up': takip sorusu mu}
+        """
+        entities = self.gazetteer.match(query)
+        rewritten = {'query': query, 'embedding': None, 'carried': {}, 'entities': entities, 'follow_up': False}
+        if not conversation or not any(conversation.get(field) for field in CARRIED_FIELDS + ('embedding',)):
+            return rewritten
+        if self._rule_follow_up(query):
+            rewritten = self._carry(rewritten, conversation)
+        if query_embedding is not None:
+            rewritten = self.blend(rewritten, conversation, query_embedding)
+        return rewritten
+
+    def blend(self, rewritten: Dict[str, Any], conversation: Optional[Dict[str, Any]],
+              query_embedding: Any) -> Dict[str, Any]:
+        """
+        rewrite çıktısını sorunun embedding'iyle tamamlar
+
+        Kurallarla takip sorusu sayılmayan soru önceki soruya yeterince
+        benzerse bağlam şimdi taşınır; takip sorusunda soruda kendi konumu
+        yoksa embedding önceki turunkiyle harmanlanır.
+
+        Returns:
+            Yeni rewrite sonucu (verilen sözlük değiştirilmez)
+        """
+        if not conversation or query_embedding is None:
+            return rewritten
+        if not rewritten['follow_up']:
+            if not self._similar(conversation, query_embedding):
+                return rewritten
+            rewritten = self._carry(rewritten, conversation)
+        own_location = any(rewritten['entities'].get(field) for field in LOCATION_FIELDS)
+        if not own_location and conversation.get('embedding') and self.carry_weight > 0:
+            blended = ((1 - self.carry_weight) * _normalize(query_embedding)
+                       + self.carry_weight * _normalize(conversation['embedding']))
+            rewritten = dict(rewritten, embedding=_normalize(blended).tolist())
+        return rewritten
+
+    def _carry(self, rewritten: Dict[str, Any], conversation: Dict[str, Any]) -> Dict[str, Any]:
+        """Soruda bulunmayan konum ve kategoriyi önceki turdan taşır"""
+        entities = rewritten['entities']
+        carried = {}
+        if not any(entities.get(field) for field in LOCATION_FIELDS):
+            for field in LOCATION_FIELDS:
+                if conversation.get(field):
+                    carried[field] = list(conversation[field])
+                    break
+        if not entities.get('kategori') and conversation.get('kategori'):
+            carried['kategori'] = list(conversation['kategori'])
+
+        query = rewritten['query']
+        if carried:
+            values = [value for field in CARRIED_FIELDS for value in carried.get(field, [])]
+            query = f"{query} ({', '.join(values)})"
+        return dict(rewritten, query=query, carried=carried, follow_up=True)
+
+    def remember(self, rewritten: Dict[str, Any], query_embedding: Any = None,
+                 record: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Sonraki tura aktarılacak sohbet bağlamını üretir
+
+        Sorudaki varlıklar, yoksa taşınan değerler kullanılır. Soru bir kayıt
+        adıysa (kayıt adı kısayolu veya alan sorusu) konum kaydın kendisinden
+        alınır.
+
+        Args:
+            rewritten: rewrite çıktısı
+            query_embedding: Aramada kullanılan embedding (yoksa None)
+            record: Soru bir kayıt adıysa o kaydın metadata'sı (sehir, bolge)
+
+        Returns:
+            {'sehir', 'bolge', 'kategori', 'embedding', 'query'} (JSON'a yazılabilir)
+        """
+        entities = rewritten['entities']
+        carried = rewritten['carried']
+        conversation = {field: list(entities.get(field) or carried.get(field) or []) for field in CARRIED_FIELDS}
+        if entities.get('sehir'):
+            conversation['bolge'] = []
+        if record and not any(conversation[field] for field in LOCATION_FIELDS):
+            for field in LOCATION_FIELDS:
+                if record.get(field):
+                    conversation[field] = [record[field]]
+        embedding = rewritten['embedding'] if rewritten['embedding'] is not None else query_embedding
+        conversation['embedding'] = (
+            [round(float(value), 4) for value in _normalize(embedding)] if embedding is not None else None
+        )
+        conversation['query'] = rewritten['query']
+        return conversation
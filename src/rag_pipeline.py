@@ -6,15 +6,59 @@ Türkiye turizm bilgileri üzerinde soru-cevap işlemi yapar.
 Kullanılan Teknolojiler:
 - Gemini API: Text generation için
 - ChromaDB: Vektör veritabanı olarak
-- Google Generative AI Embeddings: Metin embedding için
+- Embedding backend'i (src.embeddings): Metin embedding için;
+  EMBEDDING_BACKEND ile sentence-transformers (hub model adı veya çevrimdışı
+  model klasörü) ya da ONNX Runtime (isteğe bağlı int8) seçilir.
+  EMBEDDING_MODEL, EMBEDDING_THREADS ve EMBEDDING_QUANTIZED ile ayarlanır
 """
 
 import os
 import json
+import asyncio
+import hashlib
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections import OrderedDict, deque
 import google.generativeai as genai
-from chromadb import Client, Settings
-from chromadb.utils import embedding_functions
-from typing import List, Dict, Any
+from chromadb import PersistentClient, Settings
+from typing import List, Dict, Any, Callable, Iterable, Iterator
+
+from src.batch import RateLimiter
+from src.context_packer import ContextPacker, parse_document
+from src.embeddings import create_embedding_function
+from src.extractive import lookup_intent, render_field_answer
+from src.facets import FacetIndex, FACET_PATTERNS, record_facets
+from src.gazetteer import Gazetteer, ENTITY_FIELDS
+from src.ingestion import iter_records, IngestionCheckpoint, ProgressReporter
+from src.lexical_index import LexicalIndex
+from src.llm_client import LLMClient, MODEL_PATHS, template_answer
+from src.metrics import stage, observe_stage, bind_context, ANSWERS, CACHE_REQUESTS, PROMPT_CHARS, LLM_TOKENS
+from src.query_planner import QueryPlanner, has_constraints, is_entity_only, location_only
+from src.query_rewriter import QueryRewriter
+from src.response_cache import SemanticResponseCache
+from src.vector_store import CompactVectorStore, COMPACT_DIR
+
+
+COLLECTION_NAME = "turkiye_turizm"
+
+# Doküman şablonu veya metadata yapısı değiştiğinde artırılır;
+# farklı sürümle oluşturulmuş kalıcı indeks sıfırdan yeniden kurulur.
+INDEX_SCHEMA_VERSION = 3
+
+# Yarıda kalan yüklemenin ilerlemesi (persist_dir içinde)
+CHECKPOINT_FILE = "ingest_checkpoint.json"
+
+NO_CONTEXT_MESSAGE = "Üzgünüm, bu konu hakkında şu an bilgim yok. Başka bir konu hakkında soru sorabilir misiniz?"
+GENERATION_ERROR_MESSAGE = "Üzgünüm, yanıt oluştururken bir hata oluştu. Lütfen tekrar deneyin."
+
+# Facet eşleşmesi ID ön filtresine sığmadığında metadata filtreli aramada
+# istenen sonuç katsayısı (sonuçlar sonradan facet bitmap'iyle elenir)
+POST_FILTER_FETCH = 4
+
+# build_prompt şablonu değiştiğinde artırılır; önceden hesaplanmış yanıtlar yenilenir
+PROMPT_VERSION = 1
 
 
 class TurkiyeTourismRAG:
@@ -26,78 +70,331 @@ class TurkiyeTourismRAG:
     Gemini API ile doğal dil yanıtları üretir.
     """
     
-    def __init__(self, api_key: str, data_path: str = "data/turkiye_turizm_verileri.json"):
+    def __init__(self, api_key: str, data_path: str = "data/turkiye_turizm_verileri.json",
+                 persist_dir: str = None, open_index: bool = True,
+                 model: Any = None, embedding_function: Any = None, fallback_model: Any = None):
         """
         RAG pipeline'ı başlatır
         
         Args:
             api_key: Google Gemini API anahtarı
             data_path: Turizm verilerinin bulunduğu JSON dosya yolu
+            persist_dir: Kalıcı vektör indeksinin tutulduğu klasör
+                (varsayılan: CHROMA_PERSIST_DIR veya "chroma_db")
+            open_index: False ise indeks açılmaz; daha sonra open_index()
+                çağrılmalıdır (gunicorn preload modu)
+            model: GenerativeModel yerine kullanılacak model (ör. benchmark için sahte model)
+            fallback_model: Gemini süre bütçesi tükendiğinde kullanılacak yedek model
+                (varsayılan: LLM_FALLBACK_MODEL ayarlıysa o model)
+            embedding_function: EMBEDDING_* ayarlarıyla seçilen backend yerine
+                kullanılacak ChromaDB embedding fonksiyonu
         """
         self.api_key = api_key
         self.data_path = data_path
+        self.persist_dir = persist_dir or os.getenv('CHROMA_PERSIST_DIR', 'chroma_db')
         
         # Gemini API'yi yapılandır
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # ChromaDB client'ı başlat
-        self.chroma_client = Client(Settings(
-            anonymized_telemetry=False,
-            allow_reset=True
-        ))
-        
-        # Google'ın embedding fonksiyonunu kullan
-        # Not: Gemini embeddings için alternatif olarak sentence-transformers kullanabiliriz
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
+        endpoint = None
+        if model is None:
+            endpoint = os.getenv('GEMINI_API_ENDPOINT')
+            if endpoint:
+                # Yerel sahte sunucu veya proxy (REST)
+                genai.configure(api_key=api_key, transport='rest', client_options={'api_endpoint': endpoint})
+            else:
+                genai.configure(api_key=api_key)
+            model = genai.GenerativeModel('gemini-2.5-flash')
+            if fallback_model is None and os.getenv('LLM_FALLBACK_MODEL'):
+                fallback_model = genai.GenerativeModel(os.getenv('LLM_FALLBACK_MODEL'))
+        self.model = model
+        
+        # Gemini çağrıları: eşzamanlılık sınırı, deneme başına zaman aşımı ve
+        # toplam bütçe, jitter'lı yeniden deneme, isteğe bağlı p95 hedge;
+        # bütçe tükenince yedek model veya kayıtlardan şablon yanıt
+        self.template_fallback = os.getenv('LLM_TEMPLATE_FALLBACK', '1') == '1'
+        self.llm = LLMClient(
+            model,
+            fallback_model=fallback_model,
+            timeout=float(os.getenv('LLM_TIMEOUT', '20')),
+            deadline=float(os.getenv('LLM_DEADLINE', '45')),
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '8')),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '2')),
+            hedge=os.getenv('LLM_HEDGE', '0') == '1',
+            hedge_quantile=float(os.getenv('LLM_HEDGE_QUANTILE', '0.95')),
+            fallback_timeout=float(os.getenv('LLM_FALLBACK_TIMEOUT', '10')),
+            on_response=self._record_usage,
+            async_max_concurrency=int(os.getenv('LLM_ASYNC_MAX_CONCURRENCY', '256')),
+            # REST transport'ta SDK'nın async çağrısı event loop'u bloklar
+            async_native=not endpoint
+        )
+        
+        # Embedding backend'i (sentence-transformers veya ONNX, yerel model
+        # klasörü, thread sayısı) EMBEDDING_* değişkenleriyle seçilir (src.embeddings)
+        if embedding_function is None:
+            embedding_function = create_embedding_function()
+        self.embedding_model_name = getattr(embedding_function, 'model_name', type(embedding_function).__name__)
+        self.embedding_function = embedding_function
+        
+        # Aynı soru metni için encoder'ı tekrar çalıştırmamak üzere LRU önbellek
+        self.query_embedding_cache_size = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '1024'))
+        self._query_embedding_cache = OrderedDict()
+        self._query_embedding_lock = threading.Lock()
+        
+        # Benzer sorular için Gemini yanıt önbelleği
+        self.response_cache = SemanticResponseCache(
+            max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '512')),
+            ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', '3600')),
+            similarity_threshold=float(os.getenv('RESPONSE_CACHE_THRESHOLD', '0.95'))
+        )
+        
+        # Prompt bağlamı: kayıtlar kompakt metne dönüştürülüp token bütçesine sığdırılır
+        self.context_packer = ContextPacker(
+            token_budget=int(os.getenv('CONTEXT_TOKEN_BUDGET', '1200')),
+            max_sentences=int(os.getenv('CONTEXT_MAX_SENTENCES', '4'))
         )
         
+        # Async yolda CPU-bound retrieval için sınırlı thread havuzu (ilk kullanımda oluşturulur)
+        self.retrieval_threads = int(os.getenv('RETRIEVAL_THREADS', '4'))
+        self._retrieval_executor = None
+        
+        # Vektör aramasıyla birleştirilen BM25 araması (reciprocal rank fusion)
+        self.lexical_search = os.getenv('LEXICAL_SEARCH', '1') == '1'
+        self.rrf_k = int(os.getenv('RRF_K', '60'))
+        
+        # Sorgular ChromaDB yerine int8 nicemlenmiş, bellek eşlemeli kompakt
+        # depodan yanıtlanır (VECTOR_STORE=compact); depo her senkronizasyonda
+        # koleksiyondan dışa aktarılır
+        self.compact_vectors = os.getenv('VECTOR_STORE', 'chroma') == 'compact'
+        self.compact_rerank_factor = int(os.getenv('COMPACT_RERANK_FACTOR', '10'))
+        self.compact_store = None
+        
+        # Sorudaki yapılandırılmış kısıtlar (etiket, ücret, saat, dönem) facet
+        # indeksinde tam olarak değerlendirilir; en fazla FACET_PREFILTER_LIMIT
+        # eşleşme vektör aramasına ID ön filtresi olarak verilir, listeleme
+        # sorularında FACET_LIST_LIMIT'e kadar eşleşmenin tamamı bağlama alınır
+        self.facet_prefilter_limit = int(os.getenv('FACET_PREFILTER_LIMIT', '2000'))
+        self.facet_list_limit = int(os.getenv('FACET_LIST_LIMIT', '20'))
+        
+        # Şehir/bölge/kategori tespiti için derlenmiş gazetteer, sorgu planlayıcı,
+        # facet ve BM25 indeksleri ve başlık -> kayıt ID eşlemesi (veri yüklenince kurulur)
+        self.gazetteer = Gazetteer(extra_patterns=FACET_PATTERNS)
+        self.query_planner = QueryPlanner(self.gazetteer)
+        self.facet_index = FacetIndex()
+        self.lexical_index = LexicalIndex()
+        self._ids_by_title = {}
+        self._sync_lock = threading.Lock()
+        self.dataset_version = None
+        
+        # Tek bir kaydın ücret/saat/tarih alanını soran sorular Gemini'ye
+        # gönderilmeden kayıttan yanıtlanır (src.extractive)
+        self.extractive_answers = os.getenv('EXTRACTIVE_ANSWERS', '1') == '1'
+        
+        # Takip soruları ("Başka nereleri gezebilirim?") oturumdaki son turun
+        # şehir/bölge/kategori değerleri ve embedding'i ile tamamlanır (src.query_rewriter)
+        self.query_rewrite = os.getenv('QUERY_REWRITE', '1') == '1'
+        self.query_rewriter = QueryRewriter(
+            self.gazetteer,
+            similarity_threshold=float(os.getenv('REWRITE_SIMILARITY', '0.5')),
+            carry_weight=float(os.getenv('REWRITE_CARRY_WEIGHT', '0.3'))
+        )
+        
+        # Önceden hesaplanmış yanıtlar (src.warmup.AnswerWarmer; warm-up açıksa atanır)
+        self.precomputed_answers = None
+        
         # Collection oluştur veya al
+        self.chroma_client = None
         self.collection = None
-        self.initialize_database()
+        if open_index:
+            self.initialize_database()
     
-    def initialize_database(self):
+    def _create_client(self):
         """
-        ChromaDB veritabanını başlatır ve verileri yükler
+        Kalıcı ChromaDB client'ı oluşturur (indeks diske yazılır, yeniden başlatmada korunur)
+        """
+        return PersistentClient(
+            path=self.persist_dir,
+            settings=Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+    
+    def initialize_database(self, rebuild: bool = False,
+                            embed_batches: Callable[[Iterator[List[str]]], Iterator[List[Any]]] = None):
+        """
+        Kalıcı ChromaDB koleksiyonunu açar ve veri setiyle senkronize eder
+
+        Koleksiyon farklı bir şema sürümü veya embedding modeliyle
+        oluşturulmuşsa silinip yeniden kurulur. Aksi halde yalnızca
+        eklenen, değişen veya silinen kayıtlar işlenir.
+        
+        Args:
+            rebuild: True ise mevcut indeks silinip sıfırdan kurulur
+            embed_batches: load_data'ya iletilen embedding fonksiyonu
+                (ör. src.build_index'in süreç havuzu)
+        
+        Returns:
+            load_data'nın senkronizasyon istatistikleri
         """
         try:
-            # Eğer collection varsa sil ve yeniden oluştur
+            self.chroma_client = self._create_client()
+            index_metadata = {
+                "description": "Türkiye turizm bilgileri vektör veritabanı",
+                "schema_version": INDEX_SCHEMA_VERSION,
+                "embedding_model": self.embedding_model_name
+            }
+            
+            self.collection = None
             try:
-                self.chroma_client.delete_collection("turkiye_turizm")
-            except:
+                collection = self.chroma_client.get_collection(
+                    name=COLLECTION_NAME,
+                    embedding_function=self.embedding_function
+                )
+                existing_metadata = collection.metadata or {}
+                if rebuild:
+                    print("⚠️  İndeks sıfırdan yeniden oluşturuluyor...")
+                elif all(existing_metadata.get(key) == value for key, value in index_metadata.items()):
+                    self.collection = collection
+                else:
+                    print("⚠️  İndeks şeması veya embedding modeli değişmiş, indeks yeniden oluşturuluyor...")
+            except Exception:
+                # Koleksiyon yok (ilk kurulum) veya uyumsuz konfigürasyonla oluşturulmuş
                 pass
             
-            # Yeni collection oluştur
-            self.collection = self.chroma_client.create_collection(
-                name="turkiye_turizm",
-                embedding_function=self.embedding_function,
-                metadata={"description": "Türkiye turizm bilgileri vektör veritabanı"}
-            )
+            if self.collection is None:
+                try:
+                    self.chroma_client.delete_collection(COLLECTION_NAME)
+                except Exception:
+                    pass
+                # Silinen indekse ait yarım yükleme ilerlemesi geçersizdir
+                IngestionCheckpoint(os.path.join(self.persist_dir, CHECKPOINT_FILE), self.data_path).clear()
+                
+                self.collection = self.chroma_client.create_collection(
+                    name=COLLECTION_NAME,
+                    embedding_function=self.embedding_function,
+                    metadata=index_metadata
+                )
             
-            # Verileri yükle
-            self.load_data()
-            print(f"✓ Veritabanı başarıyla oluşturuldu. Toplam {self.collection.count()} kayıt yüklendi.")
+            # Verileri senkronize et
+            stats = self.load_data(embed_batches=embed_batches)
+            if stats['added'] or stats['updated'] or stats['deleted']:
+                print(f"✓ İndeks güncellendi: {stats['added']} eklendi, {stats['updated']} güncellendi, "
+                      f"{stats['deleted']} silindi, {stats['unchanged']} değişmedi.")
+            else:
+                print("✓ İndeks güncel, embedding adımı atlandı.")
+            print(f"✓ Veritabanı hazır. Toplam {self.collection.count()} kayıt yüklendi.")
+            return stats
             
         except Exception as e:
             print(f"✗ Veritabanı başlatma hatası: {str(e)}")
             raise
     
-    def load_data(self):
+    def open_index(self):
         """
-        JSON dosyasından verileri okur ve ChromaDB'ye yükler
+        Kalıcı indeksi senkronizasyon ve embedding yapmadan açar
+        
+        Gunicorn preload modunda kullanılır: ChromaDB'nin Rust çekirdeği fork
+        güvenli olmadığı için master süreç indekse hiç dokunmaz, her worker
+        fork sonrasında diskteki indeksi bu metotla kendi client'ıyla açar.
+        Embedding modeli ise master'dan copy-on-write olarak devralınır.
         """
-        try:
-            with open(self.data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            documents = []
-            metadatas = []
-            ids = []
-            
-            for item in data:
-                # Her veri kaydını birleştirilmiş metin olarak hazırla
-                doc_text = f"""
+        self.chroma_client = self._create_client()
+        self.collection = self.chroma_client.get_collection(
+            name=COLLECTION_NAME,
+            embedding_function=self.embedding_function
+        )
+        self.dataset_version = (self.collection.metadata or {}).get('dataset_version')
+        self.response_cache.set_dataset_version(self.dataset_version)
+        self._open_compact_store(build=False)
+        self._build_lookups(self._iter_index_records())
+    
+    @property
+    def vector_store(self) -> Any:
+        """Sorguların yapıldığı depo: kompakt depo (açıksa) veya ChromaDB koleksiyonu"""
+        return self.compact_store or self.collection
+    
+    def _open_compact_store(self, build: bool):
+        """
+        Koleksiyonla aynı sürümdeki kompakt depoyu açar
+        
+        Args:
+            build: Depo yoksa veya eskiyse koleksiyondan yeniden kurulsun mu;
+                False ise (worker'lar) sorgular ChromaDB'den yapılır
+        """
+        if not self.compact_vectors:
+            return
+        base_dir = os.path.join(self.persist_dir, COMPACT_DIR)
+        store = CompactVectorStore.open(base_dir, rerank_factor=self.compact_rerank_factor)
+        if store is None or store.metadata != (self.collection.metadata or {}):
+            if not build:
+                print("⚠️  Kompakt vektör deposu güncel değil, sorgular ChromaDB'den yapılacak.")
+                self.compact_store = None
+                return
+            with stage('compact_build'):
+                store = CompactVectorStore.build(self.collection, base_dir, rerank_factor=self.compact_rerank_factor)
+            sizes = store.memory_bytes()
+            print(f"✓ Kompakt vektör deposu kuruldu: {store.count()} kayıt, "
+                  f"taranan {sizes['scan'] / 1e6:.1f} MB (float32: {sizes['vectors'] / 1e6:.1f} MB)")
+        self.compact_store = store
+    
+    def _build_lookups(self, records: Iterable[Dict[str, Any]]):
+        """
+        Kayıtlardan (veri seti veya indeksteki dokümanlar) gazetteer'ı,
+        facet ve BM25 indekslerini ve başlık -> kayıt ID eşlemesini kurar
+        """
+        entity_values = set()
+        ids_by_title = {}
+        lexical_index = LexicalIndex()
+        facet_index = FacetIndex()
+        for record in records:
+            self._add_to_lookups(record, entity_values, ids_by_title, lexical_index, facet_index)
+        self._set_lookups(entity_values, ids_by_title, lexical_index, facet_index)
+    
+    @staticmethod
+    def _add_to_lookups(record: Dict[str, Any], entity_values: set, ids_by_title: Dict[str, List[Any]],
+                        lexical_index: LexicalIndex, facet_index: FacetIndex):
+        """Tek bir kaydı arama tablolarına ekler (kayıtlar bellekte tutulmadan)"""
+        record_id = record.get('kayit_id', record.get('id'))
+        ids_by_title.setdefault(record['baslik'], []).append(record_id)
+        entity_values.add(tuple(record.get(field) for field in ENTITY_FIELDS))
+        lexical_index.add(str(record_id), record)
+        facet_index.add(record_id, record)
+    
+    def _set_lookups(self, entity_values: set, ids_by_title: Dict[str, List[Any]],
+                     lexical_index: LexicalIndex, facet_index: FacetIndex):
+        """Yeni arama tablolarını tek adımda devreye alır"""
+        gazetteer = Gazetteer((dict(zip(ENTITY_FIELDS, values)) for values in entity_values),
+                              extra_patterns=FACET_PATTERNS)
+        facet_index.build()
+        self.gazetteer = gazetteer
+        self.query_planner = QueryPlanner(gazetteer)
+        self.query_rewriter = QueryRewriter(gazetteer, self.query_rewriter.similarity_threshold,
+                                            self.query_rewriter.carry_weight)
+        self.facet_index = facet_index
+        self.lexical_index = lexical_index
+        self._ids_by_title = ids_by_title
+    
+    def _iter_index_records(self, page_size: int = 5000) -> Iterator[Dict[str, Any]]:
+        """
+        İndeksteki kayıtları sayfa sayfa döndürür
+        
+        Metadata'da bulunmayan alanlar (açıklama, özellikler) doküman
+        metninden ayrıştırılır.
+        """
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page['ids']:
+                return
+            for document, metadata in zip(page['documents'], page['metadatas']):
+                yield {**parse_document(document or ''), **(metadata or {})}
+            offset += len(page['ids'])
+    
+    @staticmethod
+    def build_document(item: Dict[str, Any]) -> str:
+        """
+        Bir veri kaydını embedding için birleştirilmiş metne dönüştürür
+        """
+        return f"""
                 Şehir: {item['sehir']}
                 Bölge: {item['bolge']}
                 Kategori: {item['kategori']}
@@ -108,174 +405,743 @@ class TurkiyeTourismRAG:
                 Ziyaret Saatleri: {item.get('ziyaret_saatleri', 'Bilgi yok')}
                 Giriş Ücreti: {item.get('giris_ucreti', 'Bilgi yok')}
                 """
+    
+    @staticmethod
+    def content_hash(document: str) -> str:
+        """
+        Doküman metninin içerik özetini (SHA-256) döndürür
+        
+        Özet, kaydın birleştirilmiş metninden hesaplandığı için hem alan
+        değişikliklerini hem de şablon değişikliklerini yakalar.
+        """
+        return hashlib.sha256(document.encode('utf-8')).hexdigest()
+    
+    def load_data(self, batch_size: int = None, progress: bool = True,
+                  embed_batches: Callable[[Iterator[List[str]]], Iterator[List[Any]]] = None) -> Dict[str, int]:
+        """
+        Veri dosyasını kalıcı ChromaDB indeksiyle akış halinde senkronize eder
+        
+        Kayıtlar dosyadan tek tek okunur (JSON dizisi veya JSONL) ve sabit
+        boyutlu batch'ler halinde işlenir: her batch için indeksteki içerik
+        özetleri sorgulanır, yalnızca yeni veya değişen kayıtlar embed
+        edilir. Bellekte o anki batch dışında yalnızca kayıt ID'leri ve arama
+        tabloları tutulur. Veri setinden çıkarılan kayıtlar en sonda silinir.
+        
+        Her batch sonrasında ilerleme checkpoint'e yazılır; yükleme yarıda
+        kesilirse sonraki çağrı kaldığı yerden devam eder. Upsert'ler küçük
+        batch'ler halinde yapıldığından yükleme sürerken sorgular çalışmaya
+        devam eder (bkz. sync_in_background).
+        
+        Args:
+            batch_size: Batch başına kayıt sayısı (varsayılan: INGEST_BATCH_SIZE veya 256)
+            progress: İlerleme raporu yazdırılsın mı
+            embed_batches: Doküman batch'lerini alıp embedding'lerini aynı
+                sırayla döndüren fonksiyon (varsayılan: embed_document_batches)
+        
+        Returns:
+            Eklenen, güncellenen, silinen ve değişmeyen kayıt sayıları
+        """
+        with self._sync_lock:
+            try:
+                return self._load_data(batch_size, progress, embed_batches)
+            except FileNotFoundError:
+                print(f"✗ Veri dosyası bulunamadı: {self.data_path}")
+                raise
+            except ValueError:
+                print(f"✗ JSON dosyası okunamadı: {self.data_path}")
+                raise
+            except Exception as e:
+                print(f"✗ Veri yükleme hatası: {str(e)}")
+                raise
+    
+    def _load_data(self, batch_size: int, progress: bool,
+                   embed_batches: Callable[[Iterator[List[str]]], Iterator[List[Any]]] = None) -> Dict[str, int]:
+        batch_size = min(
+            batch_size or int(os.getenv('INGEST_BATCH_SIZE', '256')),
+            self.chroma_client.get_max_batch_size()
+        )
+        checkpoint = IngestionCheckpoint(os.path.join(self.persist_dir, CHECKPOINT_FILE), self.data_path)
+        state = checkpoint.load()
+        resume_from = state['records_done'] if state else 0
+        stats = dict(state['stats']) if state else {'added': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        if resume_from:
+            print(f"⏳ Yarıda kalan yükleme devam ediyor ({resume_from} kayıt daha önce işlenmiş)")
+        
+        reporter = ProgressReporter(enabled=progress)
+        seen_ids = set()
+        entity_values = set()
+        ids_by_title = {}
+        lexical_index = LexicalIndex()
+        facet_index = FacetIndex()
+        # Sıradan bağımsız veri seti özeti (kayıt özetlerinin toplamı)
+        version_sum = 0
+        processed = embedded = 0
+        # Embed edilmeyi bekleyen batch'ler (okunma sırasıyla)
+        pending = deque()
+        
+        def planned_documents():
+            """Kayıtları okur, her batch için embed edilecek dokümanları sırayla üretir"""
+            nonlocal processed, version_sum
+            batch = []
+            for item in iter_records(self.data_path):
+                # Her veri kaydını birleştirilmiş metin olarak hazırla
+                doc_text = self.build_document(item)
+                record_id = str(item['id'])
+                doc_hash = self.content_hash(doc_text)
+                seen_ids.add(record_id)
+                version_sum += int(self.content_hash(f"{record_id}:{doc_hash}"), 16)
+                self._add_to_lookups(item, entity_values, ids_by_title, lexical_index, facet_index)
+                processed += 1
+                
+                # Önceki (yarıda kalan) çalıştırmada işlenmiş kayıtlar
+                if processed <= resume_from:
+                    continue
                 
-                documents.append(doc_text)
-                metadatas.append({
-                    "sehir": item['sehir'],
-                    "bolge": item['bolge'],
-                    "kategori": item['kategori'],
-                    "baslik": item['baslik']
-                })
-                ids.append(str(item['id']))
-            
-            # ChromaDB'ye toplu yükleme
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
+                batch.append((record_id, item, doc_text, doc_hash))
+                if len(batch) >= batch_size:
+                    plan = self._plan_batch(batch)
+                    pending.append((processed, plan))
+                    yield plan['documents']
+                    batch = []
+            if batch:
+                plan = self._plan_batch(batch)
+                pending.append((processed, plan))
+                yield plan['documents']
+        
+        # Embedding'ler batch sırasıyla döner; indekse aynı sırayla yazılır
+        for embeddings in (embed_batches or self.embed_document_batches)(planned_documents()):
+            records_done, plan = pending.popleft()
+            if plan['ids']:
+                self.collection.upsert(
+                    documents=plan['documents'],
+                    embeddings=embeddings,
+                    metadatas=plan['metadatas'],
+                    ids=plan['ids']
+                )
+            for key, count in plan['stats'].items():
+                stats[key] += count
+            embedded += len(plan['ids'])
+            checkpoint.save(records_done, stats)
+            reporter.update(records_done, embedded)
+        
+        # Veri setinden çıkarılan kayıtları sil
+        stats['deleted'] = self._delete_missing(seen_ids, batch_size)
+        if embedded or stats['deleted']:
+            reporter.update(processed, embedded, force=True)
+        
+        # Veri seti sürümü: değiştiğinde yanıt önbelleği geçersiz olur
+        dataset_version = format(version_sum % (1 << 256), '064x')
+        collection_metadata = dict(self.collection.metadata or {})
+        if collection_metadata.get('dataset_version') != dataset_version:
+            collection_metadata['dataset_version'] = dataset_version
+            self.collection.modify(metadata=collection_metadata)
+        self.response_cache.set_dataset_version(dataset_version)
+        self.dataset_version = dataset_version
+        self._open_compact_store(build=True)
+        self._set_lookups(entity_values, ids_by_title, lexical_index, facet_index)
+        checkpoint.clear()
+        
+        return stats
+    
+    def _plan_batch(self, batch: List[tuple]) -> Dict[str, Any]:
+        """
+        Bir batch'teki kayıtları indeksteki içerik özetleriyle karşılaştırır
+        
+        Returns:
+            Yeni veya değişen kayıtların ID, doküman ve metadata listeleri ile
+            batch'in istatistik katkısı
+        """
+        existing = self.collection.get(ids=[record_id for record_id, _, _, _ in batch], include=["metadatas"])
+        existing_hashes = {
+            record_id: (metadata or {}).get('content_hash')
+            for record_id, metadata in zip(existing['ids'], existing['metadatas'] or [])
+        }
+        
+        plan = {
+            'ids': [],
+            'documents': [],
+            'metadatas': [],
+            'stats': {'added': 0, 'updated': 0, 'unchanged': 0}
+        }
+        for record_id, item, doc_text, doc_hash in batch:
+            if existing_hashes.get(record_id) == doc_hash:
+                plan['stats']['unchanged'] += 1
+                continue
+            
+            plan['stats']['updated' if record_id in existing_hashes else 'added'] += 1
+            plan['documents'].append(doc_text)
+            plan['metadatas'].append({
+                "sehir": item['sehir'],
+                "bolge": item['bolge'],
+                "kategori": item['kategori'],
+                "baslik": item['baslik'],
+                "kayit_id": item['id'],
+                "content_hash": doc_hash,
+                # Ücret, saat, dönem ve etiketlerin tipli (normalize edilmiş) halleri
+                **record_facets(item)
+            })
+            plan['ids'].append(record_id)
+        return plan
+    
+    def embed_document_batches(self, document_batches: Iterable[List[str]]) -> Iterator[List[Any]]:
+        """
+        Doküman batch'lerini sırayla, bu süreçte embed eder
+        
+        Embedding, indeks yazımından önce ayrı hesaplanır; böylece yazım
+        sırasında eşzamanlı sorguların beklediği süre kısalır. Paralel
+        kurulum için src.build_index aynı sözleşmeyle süreç havuzu kullanır.
+        """
+        for documents in document_batches:
+            yield self.embedding_function(documents) if documents else []
+    
+    def _delete_missing(self, seen_ids: set, page_size: int) -> int:
+        """
+        İndekste olup veri setinde bulunmayan kayıtları siler
+        
+        Returns:
+            Silinen kayıt sayısı
+        """
+        stale_ids = []
+        offset = 0
+        while True:
+            page = self.collection.get(include=[], limit=page_size, offset=offset)
+            if not page['ids']:
+                break
+            stale_ids.extend(record_id for record_id in page['ids'] if record_id not in seen_ids)
+            offset += len(page['ids'])
+        
+        for start in range(0, len(stale_ids), page_size):
+            self.collection.delete(ids=stale_ids[start:start + page_size])
+        return len(stale_ids)
+    
+    def sync_in_background(self, batch_size: int = None) -> threading.Thread:
+        """
+        İndeksi arka planda veri dosyasıyla senkronize eder
+        
+        Sorgular senkronizasyon boyunca mevcut indeks üzerinden yanıtlanır;
+        yeni kayıtlar batch'ler yazıldıkça aranabilir hale gelir, arama
+        tabloları ve yanıt önbelleği sürümü yükleme bitince güncellenir.
+        ChromaDB bir batch'i yazarken sorgular kısa süre bekler; küçük
+        batch_size bu beklemeyi kısaltır.
+        
+        Args:
+            batch_size: Batch başına kayıt sayısı (varsayılan: INGEST_BATCH_SIZE)
+        
+        Returns:
+            Başlatılan thread; senkronizasyon zaten sürüyorsa None
+        """
+        if self._sync_lock.locked():
+            return None
+        
+        def run():
+            try:
+                stats = self.load_data(batch_size=batch_size)
+                print(f"✓ Arka plan senkronizasyonu tamamlandı: {stats['added']} eklendi, "
+                      f"{stats['updated']} güncellendi, {stats['deleted']} silindi.")
+            except Exception as e:
+                print(f"✗ Arka plan senkronizasyon hatası: {str(e)}")
+        
+        thread = threading.Thread(target=run, name='index-sync', daemon=True)
+        thread.start()
+        return thread
+    
+    def embed_query(self, query: str):
+        """
+        Soru metninin embedding'ini döndürür (süreç içi LRU önbellekli)
+        
+        Args:
+            query: Kullanıcının sorusu
+            
+        Returns:
+            Soru embedding vektörü
+        """
+        return self.embed_queries([query])[0]
+    
+    def embed_queries(self, queries: List[str]) -> List[Any]:
+        """
+        Birden fazla sorunun embedding'lerini döndürür
+        
+        Önbellekte bulunmayan sorular tek bir encoder çağrısında embed edilir.
+        
+        Args:
+            queries: Soru metinleri
+            
+        Returns:
+            Soru sırasıyla embedding vektörleri
+        """
+        keys = [" ".join(query.split()) for query in queries]
+        embeddings = {}
+        with self._query_embedding_lock:
+            for key in keys:
+                embedding = self._query_embedding_cache.get(key)
+                if embedding is not None:
+                    self._query_embedding_cache.move_to_end(key)
+                    embeddings[key] = embedding
+        
+        missing = [key for key in dict.fromkeys(keys) if key not in embeddings]
+        hits = sum(1 for key in keys if key in embeddings)
+        if hits:
+            CACHE_REQUESTS.inc(hits, cache='query_embedding', result='hit')
+        if missing:
+            CACHE_REQUESTS.inc(len(keys) - hits, cache='query_embedding', result='miss')
+            with stage('embed'):
+                computed = self.embedding_function(missing)
+            embeddings.update(zip(missing, computed))
+            
+            if self.query_embedding_cache_size > 0:
+                with self._query_embedding_lock:
+                    for key in missing:
+                        self._query_embedding_cache[key] = embeddings[key]
+                    while len(self._query_embedding_cache) > self.query_embedding_cache_size:
+                        self._query_embedding_cache.popitem(last=False)
+        return [embeddings[key] for key in keys]
+    
+    def search(self, query_embeddings: List[Any], n_results: int, where: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Hazır embedding vektörleriyle vektör araması yapar
+        
+        Birden fazla vektör tek bir toplu (batched) sorgu olarak gönderilir;
+        sonuç listeleri vektör sırasıyla döner. Chroma bir sorguda tek bir
+        where filtresi uyguladığından farklı filtreler ayrı çağrı gerektirir.
+        
+        Args:
+            query_embeddings: Soru embedding vektörleri
+            n_results: Her vektör için getirilecek sonuç sayısı
+            where: Metadata filtresi
+            
+        Returns:
+            ChromaDB sorgu sonucu
+        """
+        kwargs = {'where': where} if where else {}
+        return self.vector_store.query(
+            query_embeddings=list(query_embeddings),
+            n_results=n_results,
+            **kwargs
+        )
+    
+    @staticmethod
+    def _in_filter(field: str, values: List[str]) -> Dict[str, Any]:
+        """Tek değer için eşitlik, birden fazla değer için $in filtresi oluşturur"""
+        return {field: values[0]} if len(values) == 1 else {field: {"$in": list(values)}}
+    
+    @staticmethod
+    def _and_filter(filters: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Boş olmayan filtreleri $and ile birleştirir"""
+        filters = [f for f in filters if f]
+        if not filters:
+            return None
+        return filters[0] if len(filters) == 1 else {"$and": filters}
+    
+    def _excluded_ids(self, exclude_titles: List[str]) -> List[Any]:
+        """Gösterilmiş başlıkları kayıt ID'lerine çevirir"""
+        return [
+            record_id
+            for title in exclude_titles
+            for record_id in self._ids_by_title.get(title, ())
+        ]
+    
+    @staticmethod
+    def _exclude_filter(excluded_ids: List[Any]) -> Dict[str, Any]:
+        """Gösterilmiş kayıtlar için $nin filtresi oluşturur"""
+        return {"kayit_id": {"$nin": list(excluded_ids)}} if excluded_ids else None
+    
+    @staticmethod
+    def _collect_results(results: Dict[str, Any], priority: str,
+                         context_docs: List[Dict[str, Any]], seen_titles: set):
+        """Arama sonuçlarını, aynı başlık tekrar etmeyecek şekilde bağlam listesine ekler"""
+        if not results['ids'] or not results['ids'][0]:
+            return
+        for i, record_id in enumerate(results['ids'][0]):
+            metadata = results['metadatas'][0][i] if results['metadatas'] else {}
+            baslik = metadata.get('baslik', '')
+            if priority != 'high' and baslik in seen_titles:
+                continue
+            seen_titles.add(baslik)
+            context_docs.append({
+                'id': record_id,
+                'document': results['documents'][0][i],
+                'metadata': metadata,
+                'distance': results['distances'][0][i] if results.get('distances') else None,
+                'priority': priority
+            })
+    
+    def _fetch_docs(self, record_ids: List[str], priorities: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Vektör araması dışında bulunan kayıtları ID ile getirir
+        
+        Returns:
+            record_ids sırasıyla bağlam dokümanları (indekste olmayanlar atlanır)
+        """
+        if not record_ids:
+            return []
+        found = self.vector_store.get(ids=list(record_ids), include=["documents", "metadatas"])
+        records = {
+            record_id: (document, metadata or {})
+            for record_id, document, metadata in zip(found['ids'], found['documents'], found['metadatas'])
+        }
+        return [
+            {
+                'id': record_id,
+                'document': records[record_id][0],
+                'metadata': records[record_id][1],
+                'distance': None,
+                'priority': priorities[record_id]
+            }
+            for record_id in record_ids
+            if record_id in records
+        ]
+    
+    def retrieve_by_title(self, query: str, n_results: int = 8,
+                          exclude_titles: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Soru yalnızca kayıt adlarından oluşuyorsa bağlamı encoder çalıştırmadan getirir
+        
+        Adı geçen kayıtlar yüksek öncelikle döner; kalan yer aynı sorunun
+        BM25 sonuçlarıyla doldurulur.
+        
+        Args:
+            query: Kullanıcının sorusu
+            n_results: Getirilecek sonuç sayısı
+            exclude_titles: Önceki sorularda gösterilen başlıklar
+            
+        Returns:
+            İlgili dokümanların listesi; soru bir ad sorgusu değilse boş liste
+        """
+        if not self.lexical_search:
+            return []
+        excluded_ids = [str(record_id) for record_id in self._excluded_ids(exclude_titles or [])]
+        
+        with stage('lexical'):
+            title_ids = self.lexical_index.title_matches(query, excluded_ids)
+            if not title_ids:
+                return []
+            priorities = dict.fromkeys(title_ids[:n_results], 'high')
+            seen_titles = {self.lexical_index.metadata(record_id)['baslik'] for record_id in priorities}
+            for record_id, _ in self.lexical_index.search(query, limit=2 * n_results, exclude_ids=excluded_ids):
+                if len(priorities) >= n_results:
+                    break
+                baslik = self.lexical_index.metadata(record_id)['baslik']
+                if record_id in priorities or baslik in seen_titles:
+                    continue
+                seen_titles.add(baslik)
+                priorities[record_id] = 'normal'
+            return self._fetch_docs(list(priorities), priorities)
+    
+    def _fuse_lexical(self, query: str, vector_docs: List[Dict[str, Any]], n_results: int,
+                      excluded_ids: List[Any], matches: int = None) -> List[Dict[str, Any]]:
+        """
+        Vektör sonuçlarını BM25 sonuçlarıyla reciprocal rank fusion ile birleştirir
+        
+        Bir kaydın skoru, yer aldığı sıralamalardaki 1 / (RRF_K + sıra)
+        değerlerinin toplamıdır; sıra, öncelik grubu içinde sayılır. Yalnızca
+        BM25 ile bulunan kayıtlar, sorgu planının koşullarını sağlıyorsa
+        (matches bitmap'inde ise) yüksek öncelik grubuna girer.
+        
+        Returns:
+            Öncelik ve birleşik skora göre sıralı en fazla n_results doküman
+        """
+        with stage('lexical'):
+            lexical_hits = self.lexical_index.search(
+                query,
+                limit=2 * n_results,
+                exclude_ids=[str(record_id) for record_id in excluded_ids]
             )
+        if not lexical_hits:
+            return vector_docs[:n_results]
+        
+        with stage('merge'):
+            docs_by_id = {doc['id']: doc for doc in vector_docs}
+            priorities = {doc['id']: doc['priority'] for doc in vector_docs}
+            titles = {doc['id']: doc['metadata'].get('baslik', '') for doc in vector_docs}
+            for record_id, _ in lexical_hits:
+                if record_id not in priorities:
+                    matches_plan = bool(matches) and self.facet_index.contains(matches, record_id)
+                    priorities[record_id] = 'high' if matches_plan else 'normal'
+                    titles[record_id] = self.lexical_index.metadata(record_id)['baslik']
             
-        except FileNotFoundError:
-            print(f"✗ Veri dosyası bulunamadı: {self.data_path}")
-            raise
-        except json.JSONDecodeError:
-            print(f"✗ JSON dosyası okunamadı: {self.data_path}")
-            raise
-        except Exception as e:
-            print(f"✗ Veri yükleme hatası: {str(e)}")
-            raise
+            scores = {}
+            for ranking in ([doc['id'] for doc in vector_docs], [record_id for record_id, _ in lexical_hits]):
+                ranks = {}
+                for record_id in ranking:
+                    rank = ranks[priorities[record_id]] = ranks.get(priorities[record_id], 0) + 1
+                    scores[record_id] = scores.get(record_id, 0.0) + 1.0 / (self.rrf_k + rank)
+            
+            selected = []
+            seen_titles = set()
+            for record_id in sorted(scores, key=lambda record_id: (0 if priorities[record_id] == 'high' else 1,
+                                                                   -scores[record_id])):
+                if len(selected) >= n_results:
+                    break
+                if priorities[record_id] != 'high' and titles[record_id] in seen_titles:
+                    continue
+                seen_titles.add(titles[record_id])
+                selected.append(record_id)
+        
+        fetched = self._fetch_docs([record_id for record_id in selected if record_id not in docs_by_id], priorities)
+        docs_by_id.update((doc['id'], doc) for doc in fetched)
+        return [docs_by_id[record_id] for record_id in selected if record_id in docs_by_id]
     
-    def retrieve_context(self, query: str, n_results: int = 8, exclude_titles: List[str] = None) -> List[Dict[str, Any]]:
+    def retrieve_context(self, query: str, n_results: int = 8, exclude_titles: List[str] = None,
+                         query_embedding: Any = None) -> List[Dict[str, Any]]:
         """
         Kullanıcı sorusu için ilgili bağlamı getirir (Hybrid Retrieval)
         
+        Sorudaki kısıtlarla (şehir, bölge, kategori, etiket, ücret, saat,
+        dönem) ön filtrelenmiş ve genel vektör araması, BM25 sonuçlarıyla
+        birleştirilir. Embedding verilmemişse ve soru bir kayıt
+        adıysa bağlam encoder çalıştırılmadan getirilir (bkz. retrieve_by_title).
+        
         Args:
             query: Kullanıcının sorusu
             n_results: Getirilecek sonuç sayısı
             exclude_titles: Önceki sorularda gösterilen başlıklar (tekrar gösterilmemesi için)
+            query_embedding: Önceden hesaplanmış soru embedding'i (yoksa hesaplanır)
             
         Returns:
             İlgili dokümanların listesi
         """
         try:
-            if exclude_titles is None:
-                exclude_titles = []
-            # Şehir ve bölge haritası
-            city_keywords = {
-                'istanbul': 'İstanbul',
-                'ankara': 'Ankara',
-                'izmir': 'İzmir',
-                'antalya': 'Antalya',
-                'kapadokya': 'Nevşehir',
-                'kappadokya': 'Nevşehir',
-                'göreme': 'Nevşehir',
-                'nevşehir': 'Nevşehir',
-                'efes': 'İzmir',
-                'bergama': 'İzmir',
-                'pamukkale': 'Denizli',
-                'nemrut': 'Adıyaman',
-                'trabzon': 'Trabzon',
-                'van': 'Van',
-                'konya': 'Konya',
-                'gaziantep': 'Gaziantep',
-                'urfa': 'Şanlıurfa',
-                'şanlıurfa': 'Şanlıurfa',
-                'mardin': 'Mardin',
-                'bodrum': 'Muğla',
-                'marmaris': 'Muğla',
-                'fethiye': 'Muğla',
-                'ölüdeniz': 'Muğla',
-                'çanakkale': 'Çanakkale',
-                'truva': 'Çanakkale',
-                'troya': 'Çanakkale',
-                'bursa': 'Bursa',
-                'edirne': 'Edirne',
-                'kars': 'Kars',
-                'erzurum': 'Erzurum',
-                'sivas': 'Sivas',
-                'amasya': 'Amasya',
-                'safranbolu': 'Karabük',
-                'karabük': 'Karabük'
-            }
-            
-            # Query'den şehir bilgisini çıkar
-            query_lower = query.lower()
-            detected_city = None
-            for keyword, city in city_keywords.items():
-                if keyword in query_lower:
-                    detected_city = city
-                    break
+            query_embeddings = None if query_embedding is None else [query_embedding]
+            return self.retrieve_context_batch([query], n_results, exclude_titles, query_embeddings)[0]
+        except Exception as e:
+            print(f"✗ Bağlam getirme hatası: {str(e)}")
+            return []
+    
+    def _plan_filters(self, query: str, excluded_ids: List[Any]) -> Dict[str, Any]:
+        """
+        Sorudaki kısıtları facet indeksinde tam olarak değerlendirir
+        
+        Koşulları sağlayan kayıt yoksa plan konum (şehir/bölge) kısıtına
+        gevşetilir. Plan yalnızca şehir/bölge/kategoriden oluşuyorsa vektör
+        deposunun metadata filtresi, değilse eşleşen kayıtların ID listesi
+        ön filtre olarak kullanılır. Eşleşme sayısı FACET_PREFILTER_LIMIT'i
+        aşarsa metadata filtresiyle aranır ve sonuçlar bitmap ile elenir.
+        
+        Args:
+            query: Kullanıcının sorusu
+            excluded_ids: Daha önce gösterilmiş kayıtlar
             
-            context_docs = []
+        Returns:
+            {'plan', 'matches' (bitmap), 'count', 'where', 'post_filter'};
+            soruda kısıt yoksa None
+        """
+        plan = self.query_planner.plan(query)
+        if not has_constraints(plan):
+            return None
+        excluded = self.facet_index.ids_bitmap(excluded_ids)
+        matches = self.facet_index.evaluate(plan) & ~excluded
+        if not matches:
+            relaxed = location_only(plan)
+            if relaxed['filters'] and relaxed['filters'] != plan['filters']:
+                plan = relaxed
+                matches = self.facet_index.evaluate(plan) & ~excluded
+        
+        count = FacetIndex.count(matches)
+        entity_where = self._and_filter(
+            [self._in_filter(field, values) for field, values in plan['filters'].items() if field in ENTITY_FIELDS]
+            + [self._exclude_filter(excluded_ids)]
+        )
+        post_filter = False
+        if not count:
+            where = None
+        elif is_entity_only(plan):
+            where = entity_where
+        elif count <= self.facet_prefilter_limit:
+            where = {"kayit_id": {"$in": self.facet_index.record_ids_of(matches)}}
+        else:
+            where = entity_where
+            post_filter = True
+        return {'plan': plan, 'matches': matches, 'count': count, 'where': where, 'post_filter': post_filter}
+    
+    def _filter_results(self, results: Dict[str, Any], matches: int, limit: int) -> Dict[str, Any]:
+        """Tek soruluk arama sonucundan plan koşullarını sağlamayanları eler"""
+        keep = [
+            i for i, metadata in enumerate(results['metadatas'][0])
+            if self.facet_index.contains(matches, metadata.get('kayit_id'))
+        ][:limit]
+        return {
+            key: [[results[key][0][i] for i in keep]] if results.get(key) else None
+            for key in ('ids', 'documents', 'metadatas', 'distances')
+        }
+    
+    @staticmethod
+    def _query_results(results: Dict[str, Any], position: int, limit: int) -> Dict[str, Any]:
+        """Toplu sorgu sonucundan tek bir sorunun ilk `limit` sonucunu ayırır"""
+        return {
+            key: [results[key][position][:limit]] if results.get(key) else None
+            for key in ('ids', 'documents', 'metadatas', 'distances')
+        }
+    
+    def _search_grouped(self, embeddings: Dict[int, Any], filters: Dict[int, Dict[str, Any]],
+                        limits: Dict[int, int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Aynı filtreyi kullanan soruları tek bir toplu vektör sorgusunda arar
+        
+        Args:
+            embeddings: soru sırası -> embedding
+            filters: soru sırası -> where filtresi (None: filtresiz)
+            limits: soru sırası -> istenen sonuç sayısı
             
-            # Eğer şehir tespit edildiyse, önce o şehirden kayıtları getir
-            if detected_city:
-                # Şehre özel filtreleme (hız için optimize)
-                city_results = self.collection.query(
-                    query_texts=[query],
-                    n_results=min(n_results + 2, 8),  # Hız için daha az
-                    where={"sehir": detected_city}
-                )
-                
-                if city_results['documents'] and len(city_results['documents']) > 0:
-                    for i, doc in enumerate(city_results['documents'][0]):
-                        metadata = city_results['metadatas'][0][i] if city_results['metadatas'] else {}
-                        baslik = metadata.get('baslik', '')
-                        
-                        # Exclude listesinde yoksa ekle
-                        if baslik not in exclude_titles:
-                            context_docs.append({
-                                'document': doc,
-                                'metadata': metadata,
-                                'distance': city_results['distances'][0][i] if city_results.get('distances') else None,
-                                'priority': 'high'  # Şehir eşleşmesi yüksek öncelik
-                            })
-            
-            # Genel semantic search yap (hız için optimize)
-            general_results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results + 2  # Hız için daha az
+        Returns:
+            soru sırası -> tek soruluk sonuç (ChromaDB sonuç biçiminde)
+        """
+        groups = {}
+        for position, where in filters.items():
+            key = json.dumps(where, sort_keys=True, ensure_ascii=False)
+            groups.setdefault(key, (where, []))[1].append(position)
+        
+        results = {}
+        for where, positions in groups.values():
+            batch = self.search(
+                [embeddings[position] for position in positions],
+                n_results=max(limits[position] for position in positions),
+                where=where
             )
+            for offset, position in enumerate(positions):
+                results[position] = self._query_results(batch, offset, limits[position])
+        return results
+    
+    def retrieve_context_batch(self, queries: List[str], n_results: int = 8, exclude_titles: List[str] = None,
+                               query_embeddings: List[Any] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Birden fazla soru için bağlamı toplu getirir
+        
+        Kayıt adı soruları BM25 indeksinden, kalanlar tek bir encoder
+        çağrısıyla embed edilir. Aynı filtreyi kullanan soruların vektör
+        aramaları tek bir çoklu sorgu olarak yapılır. Her sorunun sonucu
+        retrieve_context ile aynıdır.
+        
+        Args:
+            queries: Kullanıcı soruları
+            n_results: Soru başına getirilecek sonuç sayısı
+            exclude_titles: Tüm sorularda hariç tutulacak başlıklar
+            query_embeddings: Önceden hesaplanmış embedding'ler (verilirse ad
+                sorgusu kısayolu kullanılmaz)
             
-            if general_results['documents'] and len(general_results['documents']) > 0:
-                for i, doc in enumerate(general_results['documents'][0]):
-                    metadata = general_results['metadatas'][0][i] if general_results['metadatas'] else {}
-                    baslik = metadata.get('baslik', '')
-                    
-                    # Tekrar eklememek için ve exclude listesinde olmadığını kontrol et
-                    already_added = any(d['metadata'].get('baslik') == baslik for d in context_docs)
-                    in_exclude_list = baslik in exclude_titles
-                    
-                    if not already_added and not in_exclude_list:
-                        context_docs.append({
-                            'document': doc,
-                            'metadata': metadata,
-                            'distance': general_results['distances'][0][i] if general_results.get('distances') else None,
-                            'priority': 'normal'
-                        })
+        Returns:
+            Soru sırasıyla bağlam doküman listeleri
+        """
+        queries = list(queries)
+        if exclude_titles is None:
+            exclude_titles = []
+        
+        # Sorular bir kez embed edilir; şehir filtreli ve genel arama aynı vektörü kullanır.
+        # Kayıt adı sorularında encoder hiç çalıştırılmaz.
+        if query_embeddings is None:
+            return self._retrieve_batch(queries, n_results, exclude_titles)[1]
+        if not queries:
+            return []
+        
+        contexts = [[] for _ in queries]
+        positions = list(range(len(queries)))
+        embeddings = dict(enumerate(query_embeddings))
+        
+        # Daha önce gösterilen kayıtlar aramanın içinde elenir ($nin filtresi)
+        excluded_ids = self._excluded_ids(exclude_titles)
+        exclude_filter = self._exclude_filter(excluded_ids)
+        
+        # Sorulardaki kısıtları (şehir, bölge, kategori, etiket, ücret, saat, dönem)
+        # çıkar ve facet indeksinde tam olarak değerlendir
+        with stage('plan'):
+            plans = {position: self._plan_filters(queries[position], excluded_ids) for position in positions}
+        
+        filtered_docs = {position: [] for position in positions}
+        seen_titles = {position: set() for position in positions}
+        
+        # Kısıt içeren sorularda önce koşulları sağlayan kayıtlar getirilir; eşleşme
+        # sayısı bilindiğinden fazladan sonuç istenmez. Listeleme sorularında
+        # eşleşmelerin tamamı bağlam olur ve genel arama yapılmaz.
+        limits = {}
+        exhaustive = set()
+        for position, planned in plans.items():
+            if not planned or not planned['count']:
+                continue
+            limits[position] = min(planned['count'], n_results)
+            if (planned['plan']['listing'] and not planned['post_filter']
+                    and planned['count'] <= max(n_results, self.facet_list_limit)):
+                limits[position] = planned['count']
+                exhaustive.add(position)
+        if limits:
+            with stage('search_filtered'):
+                filtered_results = self._search_grouped(
+                    embeddings,
+                    {position: plans[position]['where'] for position in limits},
+                    {position: limits[position] * (POST_FILTER_FETCH if plans[position]['post_filter'] else 1)
+                     for position in limits}
+                )
             
+            # Koşulları sağlayan kayıtlar yüksek öncelik
+            with stage('merge'):
+                for position in limits:
+                    results = filtered_results[position]
+                    if plans[position]['post_filter']:
+                        results = self._filter_results(results, plans[position]['matches'], limits[position])
+                    self._collect_results(results, 'high', filtered_docs[position], seen_titles[position])
+        
+        # Filtreli arama n_results'u zaten dolduruyorsa (ör. şehri taşınan takip
+        # sorusu) genel aramanın sonuçları kullanılmayacağı için arama yapılmaz
+        filled = {position for position in limits if len(filtered_docs[position]) >= n_results}
+        for position in exhaustive | filled:
+            contexts[position] = filtered_docs[position]
+        
+        # Genel semantic search: filtreli aramada gelenlerle çakışmalar düşüldükten
+        # sonra n_results dolana kadar gerekirse daha fazla sonuç istenir
+        remaining = [position for position in positions if position not in exhaustive and position not in filled]
+        fetch = {position: n_results + len(filtered_docs[position]) for position in remaining}
+        for _ in range(3):
+            if not remaining:
+                break
+            with stage('search_general'):
+                general_results = self._search_grouped(
+                    embeddings,
+                    dict.fromkeys(remaining, exclude_filter),
+                    fetch
+                )
+            with stage('merge'):
+                for position in remaining:
+                    contexts[position] = list(filtered_docs[position])
+                    self._collect_results(general_results[position], 'normal',
+                                          contexts[position], set(seen_titles[position]))
+            remaining = [
+                position for position in remaining
+                if len(contexts[position]) < n_results and len(general_results[position]['ids'][0]) >= fetch[position]
+            ]
+            if not remaining:
+                break
+            for position in remaining:
+                fetch[position] *= 2
+        
+        for position in positions:
             # Önceliğe göre sırala (high priority önce)
-            context_docs.sort(key=lambda x: (0 if x.get('priority') == 'high' else 1, x.get('distance', 999)))
-            
-            # Maksimum n_results kadar döndür
-            return context_docs[:n_results]
+            with stage('merge'):
+                contexts[position].sort(key=lambda x: (0 if x.get('priority') == 'high' else 1, x.get('distance', 999)))
             
-        except Exception as e:
-            print(f"✗ Bağlam getirme hatası: {str(e)}")
-            return []
+            # BM25 sonuçlarıyla birleştir; maksimum n_results kadar döndür
+            if position in exhaustive:
+                continue
+            if self.lexical_search:
+                contexts[position] = self._fuse_lexical(
+                    queries[position], contexts[position], n_results, excluded_ids,
+                    plans[position]['matches'] if plans[position] else None
+                )
+            else:
+                contexts[position] = contexts[position][:n_results]
+        return contexts
     
-    def generate_response(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
+    def build_prompt(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
         """
-        Gemini API kullanarak bağlam ve soruya dayalı yanıt üretir
+        Bağlam dokümanları ve kullanıcı sorusundan Gemini prompt'unu oluşturur
         
         Args:
             query: Kullanıcının sorusu
             context_docs: İlgili bağlam dokümanları
             
         Returns:
-            Üretilen yanıt metni
+            Prompt metni
         """
-        try:
-            if not context_docs:
-                return "Üzgünüm, bu konu hakkında şu an bilgim yok. Başka bir konu hakkında soru sorabilir misiniz?"
-            
-            # Bağlamı birleştir
-            context_text = "\n\n---\n\n".join([doc['document'] for doc in context_docs])
-            
-            # Kaynak listesi oluştur
-            sources_list = [f"- {doc['metadata'].get('baslik', 'Bilinmeyen')} ({doc['metadata'].get('sehir', 'Bilinmeyen')})" 
-                           for doc in context_docs]
-            sources_text = "\n".join(sources_list[:5])  # İlk 5 kaynağı göster
+        with stage('prompt_build'):
+            # Bağlamı token bütçesine göre kompakt biçimde paketle
+            context_text = self.context_packer.pack(query, context_docs)
             
             # Kaç kaynak olduğunu belirt
             kaynak_sayisi = len(context_docs)
@@ -305,37 +1171,138 @@ KULLANICI SORUSU: {query}
 
 CEVAP:
 """
+        PROMPT_CHARS.observe(len(prompt))
+        return prompt
+    
+    @staticmethod
+    def _record_usage(response):
+        """Gemini'nin raporladığı prompt ve yanıt token sayılarını metriklere yazar"""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return
+        for kind, attribute in (('prompt', 'prompt_token_count'), ('response', 'candidates_token_count')):
+            count = getattr(usage, attribute, None)
+            if count:
+                LLM_TOKENS.observe(count, kind=kind)
+    
+    def _template_fallback(self, context_docs: List[Dict[str, Any]]) -> Callable[[], str]:
+        """Gemini yanıt veremezse kullanılacak şablon yanıt (kapalıysa None)"""
+        if not self.template_fallback:
+            return None
+        return lambda: template_answer(context_docs)
+    
+    def _generate_content(self, prompt: str, context_docs: List[Dict[str, Any]] = None) -> tuple:
+        """
+        Prompt'u LLM istemcisiyle Gemini'ye gönderir
+        
+        Returns:
+            (yanıt metni, yanıtın geldiği yol: primary, hedge, fallback_model, template)
+        """
+        with stage('llm'):
+            return self.llm.generate(prompt, fallback=self._template_fallback(context_docs or []))
+    
+    def _respond(self, query: str, context_docs: List[Dict[str, Any]]) -> tuple:
+        """
+        generate_response'un yanıt yolunu da döndüren hali
+        
+        Returns:
+            (yanıt metni, yol); bağlam yoksa yol 'no_context', hata olursa 'error'
+        """
+        try:
+            if not context_docs:
+                return NO_CONTEXT_MESSAGE, 'no_context'
+            
+            prompt = self.build_prompt(query, context_docs)
             
             # Gemini'den yanıt al
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self._generate_content(prompt, context_docs)
             
         except Exception as e:
             print(f"✗ Yanıt üretme hatası: {str(e)}")
-            return "Üzgünüm, yanıt oluştururken bir hata oluştu. Lütfen tekrar deneyin."
+            return GENERATION_ERROR_MESSAGE, 'error'
     
-    def query(self, user_query: str, n_results: int = 8, exclude_titles: List[str] = None) -> Dict[str, Any]:
+    def generate_response(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
         """
-        Kullanıcı sorgusunu işler ve yanıt döndürür
+        Gemini API kullanarak bağlam ve soruya dayalı yanıt üretir
         
         Args:
-            user_query: Kullanıcının sorusu
-            n_results: Getirilecek bağlam sayısı
-            exclude_titles: Daha önce gösterilen başlıklar
+            query: Kullanıcının sorusu
+            context_docs: İlgili bağlam dokümanları
             
         Returns:
-            Yanıt ve metadata içeren dictionary
+            Üretilen yanıt metni
         """
-        # İlgili bağlamı getir
-        if exclude_titles is None:
-            exclude_titles = []
-        context_docs = self.retrieve_context(user_query, n_results, exclude_titles)
+        return self._respond(query, context_docs)[0]
+    
+    async def _arespond(self, query: str, context_docs: List[Dict[str, Any]]) -> tuple:
+        """_respond'un async karşılığı"""
+        try:
+            if not context_docs:
+                return NO_CONTEXT_MESSAGE, 'no_context'
+            
+            prompt = self.build_prompt(query, context_docs)
+            with stage('llm'):
+                return await self.llm.agenerate(prompt, fallback=self._template_fallback(context_docs))
+            
+        except Exception as e:
+            print(f"✗ Yanıt üretme hatası: {str(e)}")
+            return GENERATION_ERROR_MESSAGE, 'error'
+    
+    async def agenerate_response(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
+        """
+        generate_response'un async karşılığı; Gemini çağrısı beklenirken
+        event loop diğer istekleri işlemeye devam eder
+        
+        Args:
+            query: Kullanıcının sorusu
+            context_docs: İlgili bağlam dokümanları
+            
+        Returns:
+            Üretilen yanıt metni
+        """
+        return (await self._arespond(query, context_docs))[0]
+    
+    def _respond_stream(self, query: str, context_docs: List[Dict[str, Any]]) -> Iterator[tuple]:
+        """generate_response_stream'in parçalarla birlikte yanıt yolunu da veren hali"""
+        if not context_docs:
+            yield NO_CONTEXT_MESSAGE, 'no_context'
+            return
         
-        # Yanıt üret
-        response = self.generate_response(user_query, context_docs)
+        try:
+            prompt = self.build_prompt(query, context_docs)
+            start = time.perf_counter()
+            first_token = True
+            with stage('llm'):
+                for text, path in self.llm.stream(prompt, fallback=self._template_fallback(context_docs)):
+                    if first_token:
+                        observe_stage('llm_first_token', time.perf_counter() - start)
+                        first_token = False
+                    yield text, path
+                    
+        except Exception as e:
+            print(f"✗ Yanıt üretme hatası: {str(e)}")
+            yield GENERATION_ERROR_MESSAGE, 'error'
+    
+    def generate_response_stream(self, query: str, context_docs: List[Dict[str, Any]]) -> Iterator[str]:
+        """
+        Gemini yanıtını parça parça (streaming) üretir
         
-        # Kullanılan kaynaklardan metadata çıkar
-        sources = [
+        Args:
+            query: Kullanıcının sorusu
+            context_docs: İlgili bağlam dokümanları
+            
+        Yields:
+            Yanıt metni parçaları
+        """
+        for text, _ in self._respond_stream(query, context_docs):
+            yield text
+    
+    @staticmethod
+    def _sources_from_docs(context_docs: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Kullanılan kaynaklardan kullanıcıya gösterilecek metadata'yı çıkarır
+        """
+        return [
             {
                 'baslik': doc['metadata'].get('baslik', 'Bilinmiyor'),
                 'sehir': doc['metadata'].get('sehir', 'Bilinmiyor'),
@@ -343,13 +1310,501 @@ CEVAP:
             }
             for doc in context_docs
         ]
+    
+    def _rewrite(self, user_query: str, conversation: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Soruyu sohbet bağlamıyla tamamlar (embedding gerektirmeyen kurallarla)
+        
+        Sonuç _shortcut ve _retrieve'e verilir; gazetteer soru başına bir kez taranır.
+        """
+        with stage('rewrite'):
+            return self.query_rewriter.rewrite(user_query, conversation if self.query_rewrite else None)
+    
+    def _retrieve(self, user_query: str, n_results: int, exclude_titles: List[str],
+                  rewritten: Dict[str, Any], conversation: Dict[str, Any] = None) -> tuple:
+        """
+        Soru için bağlamı getirir; soru bir kayıt adıysa encoder çalıştırılmaz
+        
+        Takip sorularında arama, sohbet bağlamından taşınan şehir/bölge/kategori
+        ile tamamlanmış metin ve harmanlanmış embedding ile yapılır.
+        
+        Args:
+            rewritten: _rewrite çıktısı
+            conversation: Önceki turun sohbet bağlamı
+        
+        Returns:
+            (arama embedding'i veya None, bağlam dokümanları, arama metni,
+             sonraki tur için sohbet bağlamı)
+        """
+        if not self.query_rewrite:
+            conversation = None
+        context_docs = self.retrieve_by_title(user_query, n_results, exclude_titles)
+        if context_docs:
+            # Soru bir kayıt adı: konum önceki turdan değil kaydın kendisinden alınır
+            standalone = dict(rewritten, query=user_query, carried={})
+            record = context_docs[0]['metadata']
+            return None, context_docs, user_query, self.query_rewriter.remember(standalone, record=record)
+        query_embedding = self.embed_query(user_query)
+        rewritten = self.query_rewriter.blend(rewritten, conversation, query_embedding)
+        if rewritten['embedding'] is not None:
+            query_embedding = rewritten['embedding']
+        search_query = rewritten['query']
+        context_docs = self.retrieve_context(search_query, n_results, exclude_titles, query_embedding)
+        return query_embedding, context_docs, search_query, self.query_rewriter.remember(rewritten, query_embedding)
+    
+    def _retrieve_batch(self, queries: List[str], n_results: int, exclude_titles: List[str]) -> tuple:
+        """
+        Sorular için bağlamı toplu getirir; kayıt adı sorularında encoder çalıştırılmaz
+        
+        Returns:
+            (soru sırasıyla embedding'ler (ad sorularında None), bağlam listeleri)
+        """
+        contexts = [self.retrieve_by_title(query, n_results, exclude_titles) for query in queries]
+        embeddings = [None] * len(queries)
+        positions = [position for position, context_docs in enumerate(contexts) if not context_docs]
+        if positions:
+            computed = self.embed_queries([queries[position] for position in positions])
+            retrieved = self.retrieve_context_batch(
+                [queries[position] for position in positions], n_results, exclude_titles, computed
+            )
+            for position, query_embedding, context_docs in zip(positions, computed, retrieved):
+                embeddings[position] = query_embedding
+                contexts[position] = context_docs
+        return embeddings, contexts
+    
+    @property
+    def prompt_version(self) -> str:
+        """
+        Yanıtları etkileyen prompt ayarlarının özeti
+        
+        Prompt şablonu, model veya bağlam bütçesi değiştiğinde değişir;
+        önceden hesaplanmış yanıtlar bu değerle birlikte saklanır.
+        """
+        model_name = getattr(self.model, 'model_name', type(self.model).__name__)
+        settings = f"{PROMPT_VERSION}:{model_name}:{self.context_packer.token_budget}:{self.context_packer.max_sentences}"
+        return hashlib.sha256(settings.encode('utf-8')).hexdigest()[:16]
+    
+    def _precomputed(self, user_query: str, n_results: int, exclude_titles: List[str]) -> Dict[str, Any]:
+        """Önceden hesaplanmış yanıt deposuna bakar (warm-up kapalıysa None)"""
+        if self.precomputed_answers is None:
+            return None
+        try:
+            with stage('precomputed'):
+                return self.precomputed_answers.lookup(user_query, n_results, exclude_titles)
+        except Exception as e:
+            print(f"✗ Önceden hesaplanmış yanıt okunamadı: {str(e)}")
+            return None
+    
+    def _extractive(self, user_query: str) -> Dict[str, Any]:
+        """
+        Soru tek bir kaydın ücret/saat/tarih alanını soruyorsa yanıtı kayıttan üretir
+        
+        Kullanıcının sorusuyla çağrılır, tamamlanmış arama metniyle değil:
+        kayıt adı sorunun kendisinde geçmelidir. Taşınan şehir/kategori
+        eklenirse ad eşleşmesi başlıkta o kelimeleri de arar ve kaçar; sohbet
+        bağlamı kayıt adı taşımadığından "giriş ücreti?" gibi adsız takip
+        soruları bilerek retrieval ve Gemini yoluna bırakılır.
         
+        Returns:
+            query() biçiminde sonuç veya soru bu yoldan yanıtlanamıyorsa None
+        """
+        if not self.extractive_answers:
+            return None
+        with stage('extractive'):
+            intent = lookup_intent(user_query)
+            if intent is None:
+                return None
+            fields, name = intent
+            record_ids = self.lexical_index.name_matches(name)
+            # Aynı adı taşıyan birden fazla kayıt varsa hangisinin sorulduğu belirsizdir
+            if len(record_ids) != 1:
+                return None
+            context_docs = self._fetch_docs(record_ids, {record_ids[0]: 'high'})
+            response = render_field_answer(context_docs[0], fields) if context_docs else None
+        if response is None:
+            return None
         return {
             'query': user_query,
             'response': response,
-            'sources': sources,
-            'context_count': len(context_docs)
+            'sources': self._sources_from_docs(context_docs),
+            'context_count': len(context_docs),
+            'path': 'extractive'
         }
+    
+    def _shortcut(self, user_query: str, n_results: int, exclude_titles: List[str],
+                  rewritten: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Retrieval ve Gemini çağrısı gerektirmeyen yollar: kayıttan çıkarılan
+        yanıt (her zaman güncel veriden), ardından önceden hesaplanmış yanıt
+        
+        Önceki turdan bağlam taşıyan takip sorularının önceden hesaplanmış
+        yanıtı kullanılmaz; yanıt tamamlanmış soruyla üretilir.
+        
+        Args:
+            rewritten: _rewrite çıktısı
+        
+        Returns:
+            query() biçiminde sonuç veya None
+        """
+        result = self._extractive(user_query)
+        record = None
+        if result is not None:
+            record = result['sources'][0]
+        else:
+            if rewritten['carried']:
+                return None
+            result = self._precomputed(user_query, n_results, exclude_titles)
+            if result is None:
+                return None
+            result['path'] = 'precomputed'
+        result['search_query'] = user_query
+        result['conversation'] = self.query_rewriter.remember(rewritten, record=record)
+        return result
+    
+    def _cached_response(self, query_embedding: Any, source_ids: List[str],
+                         exclude_titles: List[str], query_text: str) -> str:
+        """Yanıt önbelleğine bakar ve isabet/ıska sayacını günceller"""
+        if self.response_cache.max_entries <= 0:
+            return None
+        with stage('response_cache'):
+            response = self.response_cache.get(query_embedding, source_ids, exclude_titles, query_text)
+        CACHE_REQUESTS.inc(cache='response', result='miss' if response is None else 'hit')
+        return response
+    
+    def query(self, user_query: str, n_results: int = 8, exclude_titles: List[str] = None,
+              conversation: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Kullanıcı sorgusunu işler ve yanıt döndürür
+        
+        Args:
+            user_query: Kullanıcının sorusu
+            n_results: Getirilecek bağlam sayısı
+            exclude_titles: Daha önce gösterilen başlıklar
+            conversation: Önceki turun sohbet bağlamı (önceki sonucun 'conversation' alanı)
+            
+        Returns:
+            Yanıt ve metadata içeren dictionary; 'path' yanıtın geldiği yoldur
+            (precomputed, extractive, cache, primary, hedge, fallback_model,
+            template, no_context, error), 'conversation' sonraki tura
+            aktarılacak sohbet bağlamı, 'search_query' takip sorusunun
+            tamamlanmış hali
+        """
+        if exclude_titles is None:
+            exclude_titles = []
+        
+        # Yanıt doğrudan kayıttan çıkarılabiliyorsa veya warm-up ile önceden
+        # hesaplanmışsa retrieval ve Gemini çağrısı yapılmaz
+        rewritten = self._rewrite(user_query, conversation)
+        shortcut = self._shortcut(user_query, n_results, exclude_titles, rewritten)
+        if shortcut is not None:
+            ANSWERS.inc(path=shortcut['path'])
+            return shortcut
+        
+        # İlgili bağlamı getir (takip sorusu önceki turun bağlamıyla tamamlanır)
+        query_embedding, context_docs, search_query, next_conversation = self._retrieve(
+            user_query, n_results, exclude_titles, rewritten, conversation
+        )
+        
+        # Aynı bağlamla sorulmuş benzer bir soru varsa önbellekten yanıtla
+        source_ids = [doc['id'] for doc in context_docs]
+        response = self._cached_response(query_embedding, source_ids, exclude_titles, search_query)
+        path = 'cache'
+        
+        if response is None:
+            # Yanıt üret; yedek model ve şablon yanıtları önbelleğe yazılmaz
+            response, path = self._respond(search_query, context_docs)
+            if path in MODEL_PATHS:
+                self.response_cache.put(query_embedding, source_ids, exclude_titles, response, search_query)
+        
+        ANSWERS.inc(path=path)
+        return {
+            'query': user_query,
+            'search_query': search_query,
+            'response': response,
+            'sources': self._sources_from_docs(context_docs),
+            'context_count': len(context_docs),
+            'path': path,
+            'conversation': next_conversation
+        }
+    
+    @property
+    def retrieval_executor(self) -> ThreadPoolExecutor:
+        """Async yolda embedding ve vektör aramasının çalıştığı thread havuzu"""
+        if self._retrieval_executor is None:
+            self._retrieval_executor = ThreadPoolExecutor(
+                max_workers=self.retrieval_threads,
+                thread_name_prefix='retrieval'
+            )
+        return self._retrieval_executor
+    
+    async def aquery(self, user_query: str, n_results: int = 8, exclude_titles: List[str] = None,
+                     conversation: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        query'nin async karşılığı
+        
+        Embedding ve vektör araması sınırlı bir thread havuzunda çalışır,
+        Gemini çağrısı beklenir; böylece tek bir süreç çok sayıda eşzamanlı
+        sohbeti taşıyabilir.
+        
+        Args:
+            user_query: Kullanıcının sorusu
+            n_results: Getirilecek bağlam sayısı
+            exclude_titles: Daha önce gösterilen başlıklar
+            conversation: Önceki turun sohbet bağlamı
+            
+        Returns:
+            Yanıt ve metadata içeren dictionary
+        """
+        if exclude_titles is None:
+            exclude_titles = []
+        loop = asyncio.get_running_loop()
+        
+        rewritten = await loop.run_in_executor(
+            self.retrieval_executor, bind_context(self._rewrite, user_query, conversation)
+        )
+        shortcut = await loop.run_in_executor(
+            self.retrieval_executor, bind_context(self._shortcut, user_query, n_results, exclude_titles, rewritten)
+        )
+        if shortcut is not None:
+            ANSWERS.inc(path=shortcut['path'])
+            return shortcut
+        
+        query_embedding, context_docs, search_query, next_conversation = await loop.run_in_executor(
+            self.retrieval_executor,
+            bind_context(self._retrieve, user_query, n_results, exclude_titles, rewritten, conversation)
+        )
+        
+        source_ids = [doc['id'] for doc in context_docs]
+        response = self._cached_response(query_embedding, source_ids, exclude_titles, search_query)
+        path = 'cache'
+        
+        if response is None:
+            response, path = await self._arespond(search_query, context_docs)
+            if path in MODEL_PATHS:
+                self.response_cache.put(query_embedding, source_ids, exclude_titles, response, search_query)
+        
+        ANSWERS.inc(path=path)
+        return {
+            'query': user_query,
+            'search_query': search_query,
+            'response': response,
+            'sources': self._sources_from_docs(context_docs),
+            'context_count': len(context_docs),
+            'path': path,
+            'conversation': next_conversation
+        }
+    
+    def query_stream(self, user_query: str, n_results: int = 8, exclude_titles: List[str] = None,
+                     conversation: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Kullanıcı sorgusunu işler ve yanıtı olay akışı olarak döndürür
+        
+        İlk olay bağlam getirildikten hemen sonra kaynak listesidir; ardından
+        Gemini'den gelen yanıt parçaları geldikçe iletilir.
+        
+        Args:
+            user_query: Kullanıcının sorusu
+            n_results: Getirilecek bağlam sayısı
+            exclude_titles: Daha önce gösterilen başlıklar
+            conversation: Önceki turun sohbet bağlamı
+            
+        Yields:
+            {'type': 'sources', 'sources': [...], 'conversation': {...}}, ardından
+            {'type': 'chunk', 'text': ...} olayları, yanıt üretilemezse
+            {'type': 'error', 'error': mesaj} ve son olarak
+            {'type': 'done', 'response': tam_yanit, 'path': yol}
+        """
+        if exclude_titles is None:
+            exclude_titles = []
+        
+        rewritten = self._rewrite(user_query, conversation)
+        shortcut = self._shortcut(user_query, n_results, exclude_titles, rewritten)
+        if shortcut is not None:
+            ANSWERS.inc(path=shortcut['path'])
+            yield {'type': 'sources', 'sources': shortcut['sources'], 'conversation': shortcut['conversation']}
+            yield {'type': 'chunk', 'text': shortcut['response']}
+            yield {'type': 'done', 'response': shortcut['response'], 'path': shortcut['path']}
+            return
+        
+        query_embedding, context_docs, search_query, next_conversation = self._retrieve(
+            user_query, n_results, exclude_titles, rewritten, conversation
+        )
+        
+        yield {'type': 'sources', 'sources': self._sources_from_docs(context_docs), 'conversation': next_conversation}
+        
+        source_ids = [doc['id'] for doc in context_docs]
+        response = self._cached_response(query_embedding, source_ids, exclude_titles, search_query)
+        
+        path = 'cache'
+        if response is not None:
+            yield {'type': 'chunk', 'text': response}
+        else:
+            parts = []
+            paths = []
+            for text, chunk_path in self._respond_stream(search_query, context_docs):
+                paths.append(chunk_path)
+                if chunk_path == 'error':
+                    # Hata mesajı yarım yanıtın devamı değildir; ayrı olay olarak iletilir
+                    yield {'type': 'error', 'error': text}
+                    continue
+                parts.append(text)
+                yield {'type': 'chunk', 'text': text}
+            response = "".join(parts)
+            path = paths[-1] if paths else 'error'
+            if path == 'error' and not response:
+                response = GENERATION_ERROR_MESSAGE
+            if paths and set(paths) <= set(MODEL_PATHS):
+                self.response_cache.put(query_embedding, source_ids, exclude_titles, response, search_query)
+        
+        ANSWERS.inc(path=path)
+        yield {'type': 'done', 'response': response, 'path': path}
+
+    
+    def query_batch(self, queries: Iterable[Any], n_results: int = 8, concurrency: int = None,
+                    rate_limit: float = None, max_retries: int = None,
+                    chunk_size: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Çok sayıda soruyu toplu olarak yanıtlar (çevrimdışı SSS üretimi)
+        
+        Sorular chunk_size'lık parçalar halinde okunur. Her parçanın bağlamı
+        tek bir encoder çağrısı ve toplu vektör sorgularıyla getirilir. Gemini
+        çağrıları sınırlı bir thread havuzunda, hız sınırının altında
+        eşzamanlı yapılır; hata alan çağrılar üstel bekleme ile yeniden
+        denenir. Bir sonraki parçanın bağlamı, önceki parçanın yanıtları
+        üretilirken getirilir.
+        
+        Args:
+            queries: Soru metinleri veya (ID, soru) ikilileri
+            n_results: Soru başına getirilecek bağlam sayısı
+            concurrency: Eşzamanlı Gemini çağrısı (varsayılan: BATCH_CONCURRENCY veya 4)
+            rate_limit: Saniyedeki en fazla Gemini çağrısı (varsayılan: BATCH_RATE_LIMIT veya 5; 0 = sınırsız)
+            max_retries: Hata alan çağrı için yeniden deneme (varsayılan: BATCH_MAX_RETRIES veya 3)
+            chunk_size: Bağlamı birlikte getirilen soru sayısı (varsayılan: BATCH_CHUNK_SIZE veya 64)
+            
+        Yields:
+            Tamamlanma sırasıyla query() sonuçları; her sonuçta sorunun 'id'
+            değeri, başarısız sorularda ayrıca 'error' bulunur
+        """
+        concurrency = concurrency or int(os.getenv('BATCH_CONCURRENCY', '4'))
+        if rate_limit is None:
+            rate_limit = float(os.getenv('BATCH_RATE_LIMIT', '5'))
+        if max_retries is None:
+            max_retries = int(os.getenv('BATCH_MAX_RETRIES', '3'))
+        chunk_size = chunk_size or int(os.getenv('BATCH_CHUNK_SIZE', '64'))
+        limiter = RateLimiter(rate_limit, burst=concurrency)
+        
+        def result_for(item_id, query, context_docs, response, path, error=None):
+            result = {
+                'id': item_id,
+                'query': query,
+                'response': response,
+                'sources': self._sources_from_docs(context_docs),
+                'context_count': len(context_docs),
+                'path': path
+            }
+            if error is not None:
+                result['error'] = error
+            return result
+        
+        def answer(item_id, query, query_embedding, context_docs):
+            prompt = self.build_prompt(query, context_docs)
+            try:
+                # Toplu yanıtlar saklandığından yedek model/şablon yanıt kullanılmaz
+                with stage('llm'):
+                    response, path = self.llm.generate(
+                        prompt,
+                        use_fallback=False,
+                        max_retries=max_retries,
+                        before_attempt=limiter.acquire
+                    )
+            except Exception as e:
+                print(f"✗ Yanıt üretme hatası: {str(e)}")
+                return result_for(item_id, query, context_docs, GENERATION_ERROR_MESSAGE, 'error', str(e))
+            source_ids = [doc['id'] for doc in context_docs]
+            self.response_cache.put(query_embedding, source_ids, [], response, query)
+            return result_for(item_id, query, context_docs, response, path)
+        
+        items = (
+            item if isinstance(item, (tuple, list)) else (position, item)
+            for position, item in enumerate(queries)
+        )
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch-llm')
+        pending = set()
+        try:
+            while True:
+                chunk = list(itertools.islice(items, chunk_size))
+                if not chunk:
+                    break
+                # Kayıttan yanıtlanabilen sorular için retrieval ve Gemini çağrısı yapılmaz
+                remaining = []
+                for item_id, query in chunk:
+                    extracted = self._extractive(query)
+                    if extracted is not None:
+                        yield {'id': item_id, **extracted}
+                    else:
+                        remaining.append((item_id, query))
+                chunk = remaining
+                if not chunk:
+                    continue
+                chunk_queries = [query for _, query in chunk]
+                try:
+                    embeddings, contexts = self._retrieve_batch(chunk_queries, n_results, [])
+                except Exception as e:
+                    print(f"✗ Bağlam getirme hatası: {str(e)}")
+                    for item_id, query in chunk:
+                        yield result_for(item_id, query, [], GENERATION_ERROR_MESSAGE, 'error', str(e))
+                    continue
+                
+                for (item_id, query), query_embedding, context_docs in zip(chunk, embeddings, contexts):
+                    if not context_docs:
+                        yield result_for(item_id, query, context_docs, NO_CONTEXT_MESSAGE, 'no_context')
+                        continue
+                    source_ids = [doc['id'] for doc in context_docs]
+                    response = self._cached_response(query_embedding, source_ids, [], query)
+                    if response is not None:
+                        yield result_for(item_id, query, context_docs, response, 'cache')
+                        continue
+                    
+                    pending.add(executor.submit(bind_context(answer, item_id, query, query_embedding, context_docs)))
+                    # Bekleyen çağrı sayısı sınırlı tutulur; biten yanıtlar hemen döner
+                    if len(pending) >= 2 * concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+            
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            # İstemci akışı yarıda bıraktıysa başlamamış çağrılar iptal edilir
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _sync_index(api_key: str, data_path: str, persist_dir: str):
+    """Alt süreçte indeksi senkronize eder (sync_index_in_subprocess hedefi)"""
+    TurkiyeTourismRAG(api_key=api_key, data_path=data_path, persist_dir=persist_dir)
+
+
+def sync_index_in_subprocess(api_key: str, data_path: str = "data/turkiye_turizm_verileri.json",
+                             persist_dir: str = None):
+    """
+    Kalıcı indeksi ayrı bir (spawn) süreçte veri setiyle senkronize eder
+    
+    Gunicorn preload modunda master sürecin ChromaDB'yi hiç başlatmaması
+    gerekir; aksi halde fork edilen worker'larda sorgular kilitlenir.
+    
+    Raises:
+        RuntimeError: Senkronizasyon süreci hata ile sonlanırsa
+    """
+    import multiprocessing
+    
+    ctx = multiprocessing.get_context('spawn')
+    process = ctx.Process(target=_sync_index, args=(api_key, data_path, persist_dir))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"İndeks senkronizasyonu başarısız (çıkış kodu {process.exitcode})")
 
 
 def test_rag_pipeline():
@@ -0,0 +1,181 @@
+"""
+Startup Readiness
+RAG pipeline'ının arka planda başlatılması ve hazır olma durumu.
+
+google.generativeai, chromadb ve sentence-transformers/torch yüklemesi ile
+indeks senkronizasyonu saniyeler (büyük veri setlerinde dakikalar) sürer.
+Bu işler app.py import edilirken değil, bir arka plan thread'inde yapılır;
+statik sayfalar ve /healthz süreç başlar başlamaz yanıt verir. Sohbet
+uç noktaları pipeline hazır olana kadar kısa süre bekler, hazır değilse
+503 döner; /readyz yük dengeleyiciye hazır olma durumunu bildirir.
+
+Başlatmanın her aşamasının (import, model, indeks) süresi kaydedilir ve
+/healthz ile /metrics üzerinden raporlanır.
+"""
+
+import asyncio
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+
+STARTING = 'starting'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+# Worker'lardan yalnızca birinin indeksi senkronize etmesi için (persist_dir içinde)
+SYNC_LOCK_FILE = ".sync.lock"
+SYNC_MARKER_FILE = ".synced"
+
+
+class Readiness:
+    """
+    Başlatma durumu: starting -> loading -> ready | failed
+
+    Durum geçişleri thread güvenlidir; bekleyen istekler hazır olma veya
+    hata anında uyandırılır.
+    """
+
+    def __init__(self):
+        self.state = STARTING
+        self.error = None
+        self.phases = {}  # aşama -> süre (saniye)
+        self._started = time.monotonic()
+        self._ready_after = None
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def mark_loading(self):
+        with self._lock:
+            if self.state == STARTING:
+                self.state = LOADING
+
+    def mark_ready(self):
+        with self._lock:
+            self.state = READY
+            self.error = None
+            self._ready_after = time.monotonic() - self._started
+        self._finished.set()
+
+    def mark_failed(self, error: str):
+        with self._lock:
+            self.state = FAILED
+            self.error = error
+        self._finished.set()
+
+    def record_phase(self, name: str, seconds: float):
+        """Aşama süresini kaydeder"""
+        with self._lock:
+            self.phases[name] = round(seconds, 4)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Bloğun süresini başlatma aşaması olarak kaydeder"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - start)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Hazır olana kadar en fazla timeout saniye bekler
+
+        Returns:
+            Hazırsa True; zaman aşımı veya başlatma hatasında False
+        """
+        if not self.ready and timeout > 0:
+            self._finished.wait(timeout)
+        return self.ready
+
+    async def wait_async(self, timeout: float, interval: float = 0.05) -> bool:
+        """wait'in event loop'u bloklamayan karşılığı"""
+        deadline = time.monotonic() + timeout
+        while self.state in (STARTING, LOADING) and time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+        return self.ready
+
+    def start(self, target: Callable[[], Any], name: str = 'rag-init') -> threading.Thread:
+        """
+        Başlatma fonksiyonunu arka plan thread'inde çalıştırır
+
+        target hata fırlatırsa durum 'failed' olur; başarılı dönüşte
+        durumu target'ın kendisi 'ready' yapar.
+        """
+        self.mark_loading()
+
+        def run():
+            try:
+                target()
+            except Exception as e:
+                print(f"✗ Başlatma hatası: {str(e)}")
+                self.mark_failed(str(e))
+
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        """/healthz ve /readyz için durum özeti"""
+        with self._lock:
+            status = {
+                'state': self.state,
+                'uptime_seconds': round(time.monotonic() - self._started, 3),
+                'phases': dict(self.phases),
+            }
+            if self._ready_after is not None:
+                status['ready_after_seconds'] = round(self._ready_after, 3)
+            if self.error:
+                status['error'] = self.error
+        return status
+
+    def metrics(self) -> List[Tuple[str, str, str, float]]:
+        """/metrics toplayıcısı: hazır olma durumu ve aşama süreleri"""
+        samples = [('turkiyegpt_ready', 'gauge', 'RAG pipeline hazır mı (1/0)', 1 if self.ready else 0)]
+        for name, seconds in sorted(self.phases.items()):
+            samples.append((f'turkiyegpt_startup_{name}_seconds', 'gauge',
+                            f'Başlatma aşaması süresi: {name}', seconds))
+        return samples
+
+
+def sync_once(persist_dir: str, token: str, sync: Callable[[], None]) -> bool:
+    """
+    İndeks senkronizasyonunu aynı başlatmadaki worker'lar arasında bir kez çalıştırır
+
+    İlk gelen worker dosya kilidini alıp senkronize eder ve işaret dosyasına
+    başlatma token'ını yazar; kilidi sonra alan worker'lar işareti görüp
+    senkronizasyonu atlar. Kilit beklenirken indeks açılmadığından
+    senkronizasyon sırasında başka süreç indekse erişmez.
+
+    Args:
+        persist_dir: İndeks klasörü
+        token: Bu başlatmaya (gunicorn master'ına) özgü değer
+        sync: Senkronizasyon fonksiyonu
+
+    Returns:
+        Senkronizasyon bu süreçte yapıldıysa True
+    """
+    os.makedirs(persist_dir, exist_ok=True)
+    marker_path = os.path.join(persist_dir, SYNC_MARKER_FILE)
+    with open(os.path.join(persist_dir, SYNC_LOCK_FILE), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(marker_path, 'r', encoding='utf-8') as f:
+                    if f.read().strip() == token:
+                        return False
+            except FileNotFoundError:
+                pass
+            sync()
+            with open(marker_path, 'w', encoding='utf-8') as f:
+                f.write(token)
+            return True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
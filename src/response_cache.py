@@ -0,0 +1,170 @@
+"""
+Semantic Response Cache
+Gemini yanıtlarını, soru embedding'i ve getirilen bağlam üzerinden
+önbelleğe alır.
+
+Bir kayıt; soru embedding'i, getirilen kaynak ID'leri ve hariç tutulan
+başlıklar ile anahtarlanır. Aynı bağlamı getiren ve benzerliği eşik
+değerinin üzerinde olan yeni bir soru, LLM çağrısı yapılmadan önbellekteki
+yanıtla cevaplanır.
+
+Encoder çalıştırılmadan yanıtlanan sorularda (kayıt adı sorguları)
+embedding yoktur; bu sorular aynı kovada soru metniyle eşleştirilir.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticResponseCache:
+    """
+    LRU + TTL tahliyeli, benzerlik eşikli yanıt önbelleği
+
+    Kayıtlar (kaynak ID'leri, hariç tutulan başlıklar) ikilisine göre
+    kovalara ayrılır; arama yalnızca aynı kovadaki embedding'ler arasında
+    kosinüs benzerliği ile yapılır.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 0.95):
+        """
+        Args:
+            max_entries: Önbellekte tutulacak en fazla yanıt sayısı (0: kapalı)
+            ttl_seconds: Bir yanıtın geçerli kalacağı süre (saniye)
+            similarity_threshold: Önbellek isabeti için gereken en düşük kosinüs benzerliği
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.dataset_version = None
+
+        self._entries = OrderedDict()  # entry_id -> (bucket, embedding, response, created_at, query_key)
+        self._buckets = {}  # bucket -> set(entry_id)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _bucket(source_ids: Iterable[str], exclude_titles: Iterable[str]) -> Tuple[tuple, frozenset]:
+        return tuple(source_ids), frozenset(exclude_titles or [])
+
+    @staticmethod
+    def _query_key(query_text: Optional[str]) -> Optional[str]:
+        return " ".join(query_text.split()) if query_text else None
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _remove(self, entry_id: int):
+        bucket = self._entries.pop(entry_id)[0]
+        members = self._buckets.get(bucket)
+        if members is not None:
+            members.discard(entry_id)
+            if not members:
+                del self._buckets[bucket]
+
+    def get(self, query_embedding, source_ids: Iterable[str],
+            exclude_titles: Iterable[str] = None, query_text: str = None) -> Optional[str]:
+        """
+        Aynı bağlama sahip, yeterince benzer bir sorunun yanıtını döndürür
+
+        Args:
+            query_embedding: Soru embedding'i (None ise soru metni aynı olmalıdır)
+            source_ids: Getirilen kaynak ID'leri
+            exclude_titles: Hariç tutulan başlıklar
+            query_text: Soru metni
+
+        Returns:
+            Önbellekteki yanıt veya isabet yoksa None
+        """
+        if self.max_entries <= 0:
+            return None
+
+        bucket = self._bucket(source_ids, exclude_titles)
+        vector = self._normalize(query_embedding)
+        query_key = self._query_key(query_text)
+        now = time.monotonic()
+
+        with self._lock:
+            best_id, best_score = None, self.similarity_threshold
+            for entry_id in list(self._buckets.get(bucket, ())):
+                _, embedding, _, created_at, entry_key = self._entries[entry_id]
+                if now - created_at > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.evictions += 1
+                    continue
+                if vector is None or embedding is None:
+                    if query_key is not None and query_key == entry_key:
+                        best_id = entry_id
+                        break
+                    continue
+                score = float(np.dot(vector, embedding))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2]
+
+    def put(self, query_embedding, source_ids: Iterable[str],
+            exclude_titles: Iterable[str], response: str, query_text: str = None):
+        """
+        Yanıtı önbelleğe ekler, gerekirse en eski kayıtları tahliye eder
+        """
+        if self.max_entries <= 0:
+            return
+
+        bucket = self._bucket(source_ids, exclude_titles)
+        vector = self._normalize(query_embedding)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (bucket, vector, response, time.monotonic(), self._query_key(query_text))
+            self._buckets.setdefault(bucket, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Tüm kayıtları siler"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def set_dataset_version(self, version: str):
+        """
+        Veri seti sürümünü günceller; sürüm değiştiyse önbelleği boşaltır
+        """
+        if version != self.dataset_version:
+            self.clear()
+            self.dataset_version = version
+
+    def stats(self) -> Dict[str, Any]:
+        """Önbellek istatistiklerini döndürür"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
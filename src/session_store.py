@@ -0,0 +1,292 @@
+"""
+Conversation Store
+Sohbet geçmişini sunucu tarafında tutar; cookie'de yalnızca session ID kalır.
+
+Her oturum için mesaj geçmişinin yanında, daha önce gösterilen kaynak
+başlıklarının kümesi de artımlı olarak tutulur. Böylece tekrar gösterimi
+engellemek için geçmişin tamamını taramak gerekmez. Son turun sohbet
+bağlamı (şehir/bölge/kategori ve soru embedding'i; bkz. src.query_rewriter)
+da oturumla birlikte saklanır.
+
+Backend'ler:
+- MemoryConversationStore: süreç içi LRU (tek süreç / geliştirme)
+- SQLiteConversationStore: birden fazla worker arasında paylaşılan dosya
+"""
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+
+class ConversationStore(abc.ABC):
+    """
+    Sohbet geçmişi deposu arayüzü
+
+    Eksik metodu olan bir backend ilk istekte değil, oluşturulurken hata verir.
+    """
+
+    @abc.abstractmethod
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Oturumun mesaj geçmişini döndürür"""
+
+    @abc.abstractmethod
+    def shown_titles(self, session_id: str) -> Set[str]:
+        """Oturumda daha önce gösterilen kaynak başlıklarını döndürür"""
+
+    @abc.abstractmethod
+    def append(self, session_id: str, entry: Dict[str, Any]) -> int:
+        """
+        Geçmişe mesaj ekler ve kaynak başlıklarını gösterilenler kümesine işler
+
+        Returns:
+            Eklenen mesajın sırası (update ile kullanılır)
+        """
+
+    @abc.abstractmethod
+    def update(self, session_id: str, index: int, **fields):
+        """Eklenmiş bir mesajın alanlarını günceller (ör. streaming sonrası yanıt metni)"""
+
+    @abc.abstractmethod
+    def get_context(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Son turun sohbet bağlamını döndürür (yoksa None)"""
+
+    @abc.abstractmethod
+    def set_context(self, session_id: str, context: Optional[Dict[str, Any]]):
+        """Sonraki tura aktarılacak sohbet bağlamını yazar"""
+
+    @abc.abstractmethod
+    def clear(self, session_id: str):
+        """Oturumun geçmişini, gösterilen başlıklarını ve sohbet bağlamını siler"""
+
+
+class MemoryConversationStore(ConversationStore):
+    """
+    Süreç içi LRU depo
+
+    Yalnızca tek süreçli kurulumlar için uygundur; gunicorn'un her worker'ı
+    kendi kopyasını tutar.
+    """
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> {'history': [...], 'titles': set(), 'context': {...}}
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str) -> Dict[str, Any]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = {'history': [], 'titles': set(), 'context': None}
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._session(session_id)['history'])
+
+    def shown_titles(self, session_id: str) -> Set[str]:
+        with self._lock:
+            return set(self._session(session_id)['titles'])
+
+    def append(self, session_id: str, entry: Dict[str, Any]) -> int:
+        with self._lock:
+            session = self._session(session_id)
+            session['history'].append(dict(entry))
+            session['titles'].update(
+                source.get('baslik', '') for source in entry.get('sources', [])
+            )
+            return len(session['history']) - 1
+
+    def update(self, session_id: str, index: int, **fields):
+        with self._lock:
+            history = self._session(session_id)['history']
+            if 0 <= index < len(history):
+                history[index].update(fields)
+
+    def get_context(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._session(session_id)['context']
+
+    def set_context(self, session_id: str, context: Optional[Dict[str, Any]]):
+        with self._lock:
+            self._session(session_id)['context'] = context
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    SQLite tabanlı depo
+
+    WAL modunda çalışır; aynı dosyayı kullanan tüm worker süreçleri
+    geçmişi paylaşır. Bağlantı her süreçte ilk kullanımda açılır (fork
+    sonrasında miras alınan bağlantı kullanılmaz). `ttl_seconds` süresince
+    kullanılmayan oturumlar periyodik olarak silinir.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, db_path: str = "sessions.db", ttl_seconds: float = 7 * 24 * 3600):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS messages (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    entry TEXT NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                );
+                CREATE TABLE IF NOT EXISTS shown_titles (
+                    session_id TEXT NOT NULL,
+                    baslik TEXT NOT NULL,
+                    PRIMARY KEY (session_id, baslik)
+                );
+                CREATE TABLE IF NOT EXISTS contexts (
+                    session_id TEXT PRIMARY KEY,
+                    context TEXT NOT NULL
+                );
+            """)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _touch(self, connection: sqlite3.Connection, session_id: str):
+        connection.execute(
+            "INSERT INTO sessions (session_id, updated_at) VALUES (?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (session_id, time.time())
+        )
+
+    def _prune(self, connection: sqlite3.Connection):
+        cutoff = time.time() - self.ttl_seconds
+        expired = "SELECT session_id FROM sessions WHERE updated_at < ?"
+        connection.execute(f"DELETE FROM messages WHERE session_id IN ({expired})", (cutoff,))
+        connection.execute(f"DELETE FROM shown_titles WHERE session_id IN ({expired})", (cutoff,))
+        connection.execute(f"DELETE FROM contexts WHERE session_id IN ({expired})", (cutoff,))
+        connection.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT entry FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def shown_titles(self, session_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT baslik FROM shown_titles WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def append(self, session_id: str, entry: Dict[str, Any]) -> int:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                seq = connection.execute(
+                    "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                connection.execute(
+                    "INSERT INTO messages (session_id, seq, entry) VALUES (?, ?, ?)",
+                    (session_id, seq, json.dumps(entry, ensure_ascii=False))
+                )
+                connection.executemany(
+                    "INSERT OR IGNORE INTO shown_titles (session_id, baslik) VALUES (?, ?)",
+                    [(session_id, source.get('baslik', '')) for source in entry.get('sources', [])]
+                )
+                self._touch(connection, session_id)
+
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY == 0:
+                    self._prune(connection)
+            return seq
+
+    def update(self, session_id: str, index: int, **fields):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                row = connection.execute(
+                    "SELECT entry FROM messages WHERE session_id = ? AND seq = ?", (session_id, index)
+                ).fetchone()
+                if row is None:
+                    return
+                entry = json.loads(row[0])
+                entry.update(fields)
+                connection.execute(
+                    "UPDATE messages SET entry = ? WHERE session_id = ? AND seq = ?",
+                    (json.dumps(entry, ensure_ascii=False), session_id, index)
+                )
+
+    def get_context(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT context FROM contexts WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_context(self, session_id: str, context: Optional[Dict[str, Any]]):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                if context is None:
+                    connection.execute("DELETE FROM contexts WHERE session_id = ?", (session_id,))
+                else:
+                    connection.execute(
+                        "INSERT INTO contexts (session_id, context) VALUES (?, ?) "
+                        "ON CONFLICT(session_id) DO UPDATE SET context = excluded.context",
+                        (session_id, json.dumps(context, ensure_ascii=False))
+                    )
+                self._touch(connection, session_id)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                connection.execute("DELETE FROM shown_titles WHERE session_id = ?", (session_id,))
+                connection.execute("DELETE FROM contexts WHERE session_id = ?", (session_id,))
+                connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+def create_conversation_store() -> ConversationStore:
+    """
+    Environment değişkenlerine göre depo oluşturur
+
+    SESSION_STORE: "sqlite" (varsayılan) veya "memory"
+    SESSION_DB_PATH: SQLite dosya yolu (varsayılan: sessions.db)
+    SESSION_TTL: Kullanılmayan oturumların silinme süresi (saniye)
+    SESSION_MAX_SESSIONS: Bellek deposunda tutulacak en fazla oturum
+    """
+    backend = os.getenv('SESSION_STORE', 'sqlite').lower()
+    if backend == 'memory':
+        return MemoryConversationStore(max_sessions=int(os.getenv('SESSION_MAX_SESSIONS', '10000')))
+    if backend == 'sqlite':
+        return SQLiteConversationStore(
+            db_path=os.getenv('SESSION_DB_PATH', 'sessions.db'),
+            ttl_seconds=float(os.getenv('SESSION_TTL', str(7 * 24 * 3600)))
+        )
+    raise ValueError(f"Bilinmeyen SESSION_STORE: {backend}")
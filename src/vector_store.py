@@ -0,0 +1,424 @@
+"""
+Compact Vector Store
+ChromaDB koleksiyonunun sorgu tarafı için bellek dostu, salt okunur kopyası.
+
+ChromaDB her worker'da HNSW indeksini (float32 vektörler + graf) belleğe
+yükler; bellek kullanımı veri seti büyüdükçe worker sayısıyla çarpılarak
+artar. Bu depo koleksiyonu diske şu biçimde dışa aktarır:
+
+- codes.npy: int8'e nicemlenmiş vektörler (satır başına ölçek katsayısı ile)
+- vectors.npy: tam float32 vektörler (yalnızca aday satırlar okunur)
+- records.jsonl + offsets.npy: doküman ve metadata, ID ile gerektiğinde okunur
+- <alan>.codes.npy / <alan>.values.npy: filtre alanları için sözlük kodlu sütunlar
+
+Dosyalar bellek eşlemeli (mmap) açılır; sayfa önbelleği tüm worker'lar
+arasında paylaşılır. Arama önce int8 vektörler üzerinde vektörize bir
+yaklaşık tarama yapar, ardından en iyi adayların uzaklığını float32
+vektörlerle tam olarak yeniden hesaplar. Uzaklık, ChromaDB'nin varsayılan
+ölçüsü olan kare L2'dir.
+
+Depo, veri seti sürümü başına ayrı bir klasöre kurulur; CURRENT dosyası
+etkin sürümü gösterir. Sorgular, where filtresinin ChromaDB'deki
+alt kümesini ($eq, $ne, $in, $nin, $and, $or) destekler.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+COMPACT_DIR = "compact"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+# Filtrelenebilen metadata alanları
+FILTER_FIELDS = ('sehir', 'bolge', 'kategori', 'kayit_id')
+
+# Yaklaşık tarama: en iyi adaylar SCAN_BLOCK_ROWS satırlık bloklar halinde
+# birleştirilir (geçici bellek sınırı); int8 -> float32 dönüşümü
+# SCAN_CHUNK_ROWS satırlık, işlemci önbelleğine sığan parçalarla yapılır
+SCAN_BLOCK_ROWS = 65536
+SCAN_CHUNK_ROWS = 1024
+
+
+def quantize(vectors: np.ndarray) -> tuple:
+    """
+    Vektörleri satır başına simetrik ölçekle int8'e nicemler
+
+    Returns:
+        (int8 kodlar, float32 ölçekler); vektör ≈ kod * ölçek
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _column_array(values: List[Any]) -> np.ndarray:
+    """Sütun değerlerini mmap edilebilir bir diziye çevirir (tam sayı veya metin)"""
+    if values and all(isinstance(value, (int, np.integer)) and not isinstance(value, bool) for value in values):
+        return np.asarray(values, dtype=np.int64)
+    return np.asarray(['' if value is None else str(value) for value in values], dtype=str)
+
+
+class CompactVectorStore:
+    """
+    Bellek eşlemeli int8 vektör deposu (ChromaDB query/get arayüzüyle)
+
+    Nesne salt okunurdur ve thread güvenlidir; veri seti değiştiğinde
+    build() ile yeni bir sürüm kurulup açılır.
+    """
+
+    def __init__(self, path: str, rerank_factor: int = 10):
+        """
+        Args:
+            path: Kurulmuş sürüm klasörü
+            rerank_factor: Tam uzaklığı hesaplanan aday sayısı = n_results * rerank_factor
+        """
+        self.path = path
+        self.rerank_factor = max(1, rerank_factor)
+        with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.metadata = self.manifest['collection_metadata']
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode='r')
+
+        self.ids = load('ids.npy')
+        self._id_order = load('id_order.npy')
+        self._sorted_ids = load('ids_sorted.npy')
+        self.codes = load('codes.npy')
+        self.scales = load('scales.npy')
+        self.norms = load('norms.npy')
+        self.vectors = load('vectors.npy')
+        self._offsets = load('offsets.npy')
+        self.columns = {
+            field: (load(f'{field}.codes.npy'), load(f'{field}.values.npy'))
+            for field in self.manifest['filter_fields']
+        }
+        self._records_path = os.path.join(path, 'records.jsonl')
+        self._fd = None
+        self._pid = None
+
+    @classmethod
+    def open(cls, base_dir: str, **kwargs) -> 'CompactVectorStore':
+        """
+        CURRENT dosyasının gösterdiği sürümü açar
+
+        Returns:
+            Açılan depo; henüz kurulmamışsa None
+        """
+        version_dir = cls._current_version(base_dir)
+        if version_dir is None:
+            return None
+        try:
+            return cls(os.path.join(base_dir, version_dir), **kwargs)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _current_version(base_dir: str) -> str:
+        try:
+            with open(os.path.join(base_dir, CURRENT_FILE), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def build(cls, collection: Any, base_dir: str, page_size: int = 5000, **kwargs) -> 'CompactVectorStore':
+        """
+        ChromaDB koleksiyonunu yeni bir sürüm klasörüne dışa aktarır ve açar
+
+        Vektörler sayfa sayfa okunup doğrudan disk üzerindeki dizilere
+        yazılır; bellekte yalnızca bir sayfa ile filtre sütunları tutulur.
+        Kurulum bitince CURRENT atomik olarak yeni sürüme çevrilir; bir
+        önceki sürüm (üzerinde süren sorgular için) korunur, daha eskiler silinir.
+
+        Args:
+            collection: Kaynak ChromaDB koleksiyonu
+            base_dir: Sürüm klasörlerinin tutulduğu klasör
+            page_size: Koleksiyondan sayfa başına okunan kayıt
+        """
+        os.makedirs(base_dir, exist_ok=True)
+        version_dir = uuid.uuid4().hex
+        path = os.path.join(base_dir, version_dir)
+        os.makedirs(path)
+
+        count = collection.count()
+        ids = []
+        columns = {field: [] for field in FILTER_FIELDS}
+        arrays = None
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        with open(os.path.join(path, 'records.jsonl'), 'wb') as records:
+            while len(ids) < count:
+                page = collection.get(include=["embeddings", "documents", "metadatas"],
+                                      limit=min(page_size, count - len(ids)), offset=len(ids))
+                if not len(page['ids']):
+                    break
+                page_vectors = np.asarray(page['embeddings'], dtype=np.float32)
+                if arrays is None:
+                    shape = (count, page_vectors.shape[1])
+                    arrays = {
+                        name: np.lib.format.open_memmap(os.path.join(path, f'{name}.npy'), 'w+', dtype, array_shape)
+                        for name, dtype, array_shape in (('vectors', np.float32, shape), ('codes', np.int8, shape),
+                                                         ('scales', np.float32, (count,)),
+                                                         ('norms', np.float32, (count,)))
+                    }
+
+                start, end = len(ids), len(ids) + len(page['ids'])
+                arrays['vectors'][start:end] = page_vectors
+                arrays['codes'][start:end], arrays['scales'][start:end] = quantize(page_vectors)
+                arrays['norms'][start:end] = np.einsum('ij,ij->i', page_vectors, page_vectors)
+
+                for record_id, document, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                    metadata = metadata or {}
+                    for field in FILTER_FIELDS:
+                        columns[field].append(metadata.get(field))
+                    records.write(json.dumps([document, metadata], ensure_ascii=False).encode('utf-8') + b"\n")
+                    ids.append(record_id)
+                    offsets[len(ids)] = records.tell()
+
+        # Dışa aktarım sync kilidi altında yapılır; koleksiyon bu sırada değişmemelidir
+        if len(ids) != count:
+            shutil.rmtree(path, ignore_errors=True)
+            raise RuntimeError(f"Koleksiyon dışa aktarılırken değişti ({len(ids)}/{count} kayıt)")
+        if arrays is None:
+            for name, dtype, shape in (('vectors', np.float32, (0, 0)), ('codes', np.int8, (0, 0)),
+                                       ('scales', np.float32, (0,)), ('norms', np.float32, (0,))):
+                np.save(os.path.join(path, f'{name}.npy'), np.zeros(shape, dtype=dtype))
+        else:
+            for array in arrays.values():
+                array.flush()
+            del arrays
+
+        id_array = np.asarray(ids, dtype=str)
+        np.save(os.path.join(path, 'ids.npy'), id_array)
+        id_order = np.argsort(id_array, kind='stable').astype(np.int64)
+        np.save(os.path.join(path, 'id_order.npy'), id_order)
+        np.save(os.path.join(path, 'ids_sorted.npy'), id_array[id_order])
+        np.save(os.path.join(path, 'offsets.npy'), offsets)
+        filter_fields = []
+        for field, values in columns.items():
+            if any(value is not None for value in values):
+                uniques, inverse = np.unique(_column_array(values), return_inverse=True)
+                np.save(os.path.join(path, f'{field}.codes.npy'), inverse.astype(np.int32))
+                np.save(os.path.join(path, f'{field}.values.npy'), uniques)
+                filter_fields.append(field)
+
+        with open(os.path.join(path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'count': count,
+                'filter_fields': filter_fields,
+                'collection_metadata': dict(collection.metadata or {}),
+            }, f, ensure_ascii=False)
+
+        previous = cls._current_version(base_dir)
+        current_tmp = os.path.join(base_dir, f"{CURRENT_FILE}.{version_dir}.tmp")
+        with open(current_tmp, 'w', encoding='utf-8') as f:
+            f.write(version_dir)
+        os.replace(current_tmp, os.path.join(base_dir, CURRENT_FILE))
+
+        for name in os.listdir(base_dir):
+            old_path = os.path.join(base_dir, name)
+            if name not in (version_dir, previous) and os.path.isdir(old_path):
+                shutil.rmtree(old_path, ignore_errors=True)
+        return cls(path, **kwargs)
+
+    def count(self) -> int:
+        """Kayıt sayısı"""
+        return len(self.ids)
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """
+        Dizi boyutları (byte)
+
+        'scan': her sorguda taranan int8 kodlar, ölçekler, normlar ve filtre
+        sütunları; 'vectors' ve 'records' yalnızca aday ve sonuç satırları
+        için okunur.
+        """
+        scan = self.codes.nbytes + self.scales.nbytes + self.norms.nbytes + sum(
+            codes.nbytes + values.nbytes for codes, values in self.columns.values()
+        )
+        return {
+            'scan': int(scan),
+            'vectors': int(self.vectors.nbytes),
+            'records': int(self._offsets[-1]) if len(self._offsets) else 0,
+        }
+
+    def _read_records(self, positions: Iterable[int]) -> List[tuple]:
+        """Pozisyonlardaki (doküman, metadata) kayıtlarını dosyadan okur"""
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self._records_path, os.O_RDONLY)
+            self._pid = os.getpid()
+        records = []
+        for position in positions:
+            start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+            document, metadata = json.loads(os.pread(self._fd, end - start, start))
+            records.append((document, metadata))
+        return records
+
+    def _positions(self, record_ids: Iterable[str]) -> List[int]:
+        """Kayıt ID'lerini satır pozisyonlarına çevirir (olmayanlar atlanır)"""
+        record_ids = list(record_ids)
+        if not record_ids or not len(self.ids):
+            return []
+        sorted_ids = self._sorted_ids
+        found = np.searchsorted(sorted_ids, np.asarray(record_ids, dtype=str))
+        positions = []
+        for record_id, index in zip(record_ids, found):
+            if index < len(sorted_ids) and sorted_ids[index] == record_id:
+                positions.append(int(self._id_order[index]))
+        return positions
+
+    def _match(self, field: str, values: List[Any]) -> np.ndarray:
+        """Alanı verilen değerlerden birine eşit olan satırların maskesi"""
+        if field not in self.columns:
+            return np.zeros(len(self.ids), dtype=bool)
+        codes, uniques = self.columns[field]
+        if uniques.dtype.kind in 'iu':
+            values = [value for value in values if isinstance(value, (int, np.integer))]
+        else:
+            # Sabit genişlikli metin dizisine çevrilirken uzun değer kesilir
+            # ('Ankaraxx' -> 'Ankara'); hiçbir kayıttan uzun değer eşleşemez
+            width = uniques.dtype.itemsize // np.dtype('U1').itemsize
+            values = [value for value in map(str, values) if len(value) <= width]
+        if not values or not len(uniques):
+            return np.zeros(len(self.ids), dtype=bool)
+        wanted = np.asarray(values, dtype=uniques.dtype)
+        index = np.clip(np.searchsorted(uniques, wanted), 0, len(uniques) - 1)
+        matched = index[uniques[index] == wanted]
+        return np.isin(codes, matched)
+
+    def _mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """
+        ChromaDB where filtresini satır maskesine çevirir
+
+        Raises:
+            ValueError: Desteklenmeyen operatör
+        """
+        masks = []
+        for key, condition in where.items():
+            if key in ('$and', '$or'):
+                parts = [self._mask(part) for part in condition]
+                mask = np.logical_and.reduce(parts) if key == '$and' else np.logical_or.reduce(parts)
+            elif isinstance(condition, dict):
+                (operator, value), = condition.items()
+                if operator == '$eq':
+                    mask = self._match(key, [value])
+                elif operator == '$ne':
+                    mask = ~self._match(key, [value])
+                elif operator == '$in':
+                    mask = self._match(key, list(value))
+                elif operator == '$nin':
+                    mask = ~self._match(key, list(value))
+                else:
+                    raise ValueError(f"Desteklenmeyen filtre operatörü: {operator}")
+            else:
+                mask = self._match(key, [condition])
+            masks.append(mask)
+        return np.logical_and.reduce(masks) if masks else np.ones(len(self.ids), dtype=bool)
+
+    def _nearest(self, queries: np.ndarray, rows: np.ndarray, n_results: int) -> tuple:
+        """
+        Satırlar arasında her soru için en yakın n_results satırı bulur
+
+        Args:
+            queries: (soru sayısı, boyut) float32 dizi
+            rows: Aranacak satır pozisyonları (None: tüm satırlar)
+            n_results: Soru başına sonuç sayısı
+
+        Returns:
+            (soru başına satır pozisyonları, soru başına kare L2 uzaklıklar)
+        """
+        total = len(self.ids) if rows is None else len(rows)
+        shortlist = min(total, n_results * self.rerank_factor)
+        query_count = len(queries)
+        best_rows = np.empty((query_count, 0), dtype=np.int64)
+        best_scores = np.empty((query_count, 0), dtype=np.float32)
+
+        # Yaklaşık tarama: ||x||² - 2 * ölçek * (kod · q); ||q||² sıralamayı değiştirmez.
+        # int8 -> float32 dönüşümü önbelleğe sığan küçük parçalarla yapılır.
+        for start in range(0, total, SCAN_BLOCK_ROWS):
+            if rows is None:
+                block = np.arange(start, min(total, start + SCAN_BLOCK_ROWS))
+            else:
+                block = rows[start:start + SCAN_BLOCK_ROWS]
+            dots = np.empty((len(block), query_count), dtype=np.float32)
+            for offset in range(0, len(block), SCAN_CHUNK_ROWS):
+                if rows is None:
+                    codes = self.codes[start + offset:start + offset + SCAN_CHUNK_ROWS]
+                else:
+                    codes = self.codes[block[offset:offset + SCAN_CHUNK_ROWS]]
+                dots[offset:offset + len(codes)] = np.asarray(codes, dtype=np.float32) @ queries.T
+            scores = (self.norms[block][:, None] - 2.0 * self.scales[block][:, None] * dots).T
+
+            candidate_rows = np.concatenate([best_rows, np.broadcast_to(block, (query_count, len(block)))], axis=1)
+            candidate_scores = np.concatenate([best_scores, scores], axis=1)
+            if candidate_scores.shape[1] > shortlist:
+                keep = np.argpartition(candidate_scores, shortlist - 1, axis=1)[:, :shortlist]
+                candidate_rows = np.take_along_axis(candidate_rows, keep, axis=1)
+                candidate_scores = np.take_along_axis(candidate_scores, keep, axis=1)
+            best_rows, best_scores = candidate_rows, candidate_scores
+
+        # Tam yeniden skorlama: adayların float32 vektörleriyle kare L2
+        positions, distances = [], []
+        for query, candidates in zip(queries, best_rows):
+            candidates = np.sort(candidates)
+            difference = np.asarray(self.vectors[candidates], dtype=np.float32) - query
+            exact = np.einsum('ij,ij->i', difference, difference)
+            order = np.argsort(exact, kind='stable')[:n_results]
+            positions.append(candidates[order])
+            distances.append(exact[order])
+        return positions, distances
+
+    def query(self, query_embeddings: List[Any], n_results: int = 10, where: Dict[str, Any] = None,
+              include: List[str] = ("documents", "metadatas", "distances")) -> Dict[str, Any]:
+        """
+        ChromaDB Collection.query karşılığı
+
+        Returns:
+            Soru sırasıyla 'ids', 'documents', 'metadatas', 'distances' listeleri
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        rows = np.flatnonzero(self._mask(where)) if where else None
+        if (len(self.ids) if rows is None else len(rows)) and n_results > 0:
+            positions, distances = self._nearest(queries, rows, n_results)
+        else:
+            positions = [np.empty(0, dtype=np.int64) for _ in range(len(queries))]
+            distances = [np.empty(0, dtype=np.float32) for _ in range(len(queries))]
+
+        results = {'ids': [], 'documents': None, 'metadatas': None, 'distances': None}
+        if 'documents' in include:
+            results['documents'] = []
+        if 'metadatas' in include:
+            results['metadatas'] = []
+        if 'distances' in include:
+            results['distances'] = [[float(distance) for distance in row] for row in distances]
+        for row_positions in positions:
+            results['ids'].append([str(self.ids[position]) for position in row_positions])
+            if results['documents'] is not None or results['metadatas'] is not None:
+                records = self._read_records(row_positions)
+                if results['documents'] is not None:
+                    results['documents'].append([document for document, _ in records])
+                if results['metadatas'] is not None:
+                    results['metadatas'].append([metadata for _, metadata in records])
+        return results
+
+    def get(self, ids: List[str] = None, include: List[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        """
+        ChromaDB Collection.get karşılığı (yalnızca ID ile)
+
+        Returns:
+            Bulunan kayıtların 'ids', 'documents', 'metadatas' listeleri
+        """
+        positions = self._positions(ids or [])
+        records = self._read_records(positions) if ('documents' in include or 'metadatas' in include) else []
+        return {
+            'ids': [str(self.ids[position]) for position in positions],
+            'documents': [document for document, _ in records] if 'documents' in include else None,
+            'metadatas': [metadata for _, metadata in records] if 'metadatas' in include else None,
+        }
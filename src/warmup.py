@@ -0,0 +1,251 @@
+"""
+Answer Warm-up
+Popüler soruların yanıtlarını başlangıçta önceden hesaplar ve
+AnswerStore'dan anında sunar.
+
+Trafiğin büyük kısmı aynı birkaç yeri (İstanbul, Kapadokya, Pamukkale,
+Efes, Antalya) sorduğundan her dağıtımdan sonraki ilk istekler tam
+retrieval + Gemini maliyetini öder. Warm-up bu soruları query_batch ile
+toplu yanıtlar ve sonuçları kalıcı depoya yazar; depo tüm worker'lar ve
+yeniden başlatmalar arasında paylaşılır.
+
+Soru kaynakları:
+- Popüler sorular dosyası (satır başına bir soru, '#' ile başlayanlar yorum)
+- Veri setinden türetilen şablonlar ("{sehir} gezilecek yerler"): şablondaki
+  alanların en çok kayda sahip değerleri doldurulur
+
+Veri seti veya prompt sürümü değiştiğinde eski yanıt sunulmaya devam eder
+ve arka planda yenilenir.
+"""
+
+import os
+import re
+import threading
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List
+
+from src.answer_store import AnswerStore, normalize_query
+from src.metrics import CACHE_REQUESTS
+
+PLACEHOLDER = re.compile(r'\{(sehir|bolge|kategori)\}')
+
+
+def load_query_file(path: str) -> List[str]:
+    """
+    Popüler sorular dosyasını okur (dosya yoksa boş liste)
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def template_queries(records: Iterable[Dict[str, Any]], templates: Iterable[str], top_n: int = 10) -> List[str]:
+    """
+    Şablonları veri setindeki en sık alan değerleriyle doldurur
+
+    Args:
+        records: `sehir`, `bolge`, `kategori` alanlarını içeren kayıtlar
+        templates: "{sehir} gezilecek yerler" gibi şablonlar
+        top_n: Şablon başına üretilecek en fazla soru
+
+    Returns:
+        Kayıt sayısına göre azalan sırada sorular
+    """
+    templates = [template for template in templates if template.strip()]
+    counters = [Counter() for _ in templates]
+    fields = [PLACEHOLDER.findall(template) for template in templates]
+    for record in records:
+        for counter, template_fields in zip(counters, fields):
+            values = tuple(record.get(field) or '' for field in template_fields)
+            if all(values):
+                counter[values] += 1
+
+    queries = []
+    for template, template_fields, counter in zip(templates, fields, counters):
+        for values, _ in counter.most_common(top_n):
+            queries.append(template.format(**dict(zip(template_fields, values))))
+    return queries
+
+
+class AnswerWarmer:
+    """
+    Önceden hesaplanmış yanıtları hazırlar, sunar ve yeniler
+
+    TurkiyeTourismRAG.precomputed_answers olarak atandığında query,
+    aquery ve query_stream retrieval yapmadan önce buraya bakar.
+    """
+
+    def __init__(self, rag: Any, store: AnswerStore, n_results_for: Callable[[str], int],
+                 claim_ttl: float = 600):
+        """
+        Args:
+            rag: TurkiyeTourismRAG örneği
+            store: Yanıtların yazıldığı kalıcı depo
+            n_results_for: Soru başına getirilecek bağlam sayısı (app.n_results_for)
+            claim_ttl: Bir worker'ın sahiplendiği soruyu diğerlerinin hesaplamayacağı süre (saniye)
+        """
+        self.rag = rag
+        self.store = store
+        self.n_results_for = n_results_for
+        self.claim_ttl = claim_ttl
+        self.owner = uuid.uuid4().hex
+
+        self._refresh_queue = {}  # anahtar -> soru
+        self._refresh_thread = None
+        self._lock = threading.Lock()
+
+    def _is_current(self, entry: Dict[str, Any]) -> bool:
+        return (entry['dataset_version'] == self.rag.dataset_version
+                and entry['prompt_version'] == self.rag.prompt_version)
+
+    def lookup(self, query: str, n_results: int, exclude_titles: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Soru için kayıtlı yanıtı döndürür
+
+        Kayıt, aynı bağlam sayısıyla üretilmiş olmalı ve kaynakları hariç
+        tutulan başlıklardan birini içermemelidir (bu durumda retrieval
+        aynı bağlamı getirir). Sürümü eski kayıt yine döndürülür ve arka
+        planda yenilenmek üzere sıraya alınır.
+
+        Returns:
+            query() biçiminde sonuç veya isabet yoksa None
+        """
+        query_key = normalize_query(query)
+        entry = self.store.get(query_key) if query_key else None
+        if entry is None or entry['n_results'] != n_results:
+            CACHE_REQUESTS.inc(cache='precomputed', result='miss')
+            return None
+
+        result = entry['result']
+        excluded = set(exclude_titles or ())
+        if excluded and any(source['baslik'] in excluded for source in result['sources']):
+            CACHE_REQUESTS.inc(cache='precomputed', result='miss')
+            return None
+
+        if self._is_current(entry):
+            CACHE_REQUESTS.inc(cache='precomputed', result='hit')
+        else:
+            CACHE_REQUESTS.inc(cache='precomputed', result='stale')
+            self.refresh_in_background([query])
+        return {**result, 'query': query}
+
+    def warm_up(self, queries: Iterable[str]) -> Dict[str, int]:
+        """
+        Depoda güncel yanıtı olmayan soruları yanıtlar ve depoya yazar
+
+        Sorular, başka bir worker'ın aynı anda hesaplamaması için önce
+        sahiplenilir; bağlam sayısına göre gruplanıp query_batch ile
+        yanıtlanır. Bağlam bulunamayan veya hata alan sorular yazılmaz.
+
+        Returns:
+            {'total', 'current', 'computed', 'failed'} sayıları
+        """
+        by_key = {}
+        for query in queries:
+            query_key = normalize_query(query)
+            if query_key and query_key not in by_key:
+                by_key[query_key] = query
+
+        stats = {'total': len(by_key), 'current': 0, 'computed': 0, 'failed': 0}
+        pending = []
+        for query_key, query in by_key.items():
+            entry = self.store.get(query_key)
+            if entry is not None and entry['n_results'] == self.n_results_for(query) and self._is_current(entry):
+                stats['current'] += 1
+            else:
+                pending.append(query_key)
+
+        claimed = self.store.claim(pending, self.owner, self.claim_ttl)
+        try:
+            groups = {}
+            for query_key in claimed:
+                groups.setdefault(self.n_results_for(by_key[query_key]), []).append(query_key)
+
+            dataset_version, prompt_version = self.rag.dataset_version, self.rag.prompt_version
+            for n_results, query_keys in groups.items():
+                items = [(query_key, by_key[query_key]) for query_key in query_keys]
+                for result in self.rag.query_batch(items, n_results=n_results):
+                    if 'error' in result or not result['context_count']:
+                        stats['failed'] += 1
+                        continue
+                    query_key = result.pop('id')
+                    self.store.put(query_key, n_results, result, dataset_version, prompt_version)
+                    stats['computed'] += 1
+        finally:
+            self.store.release(claimed, self.owner)
+        return stats
+
+    def warm_up_in_background(self, queries: Iterable[str]) -> threading.Thread:
+        """
+        warm_up'ı arka planda çalıştırır; sorgular bu sırada normal yoldan yanıtlanır
+
+        Returns:
+            Başlatılan thread
+        """
+        queries = list(queries)
+
+        def run():
+            try:
+                stats = self.warm_up(queries)
+                print(f"✓ Yanıt ön hazırlığı tamamlandı: {stats['computed']} hesaplandı, "
+                      f"{stats['current']} güncel, {stats['failed']} başarısız "
+                      f"({self.store.count()} kayıtlı yanıt).")
+            except Exception as e:
+                print(f"✗ Yanıt ön hazırlığı hatası: {str(e)}")
+
+        thread = threading.Thread(target=run, name='answer-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def refresh_in_background(self, queries: Iterable[str]):
+        """
+        Soruları yenileme kuyruğuna ekler; tek bir thread kuyruğu boşaltır
+        """
+        with self._lock:
+            for query in queries:
+                self._refresh_queue.setdefault(normalize_query(query), query)
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._drain_refresh_queue,
+                                                    name='answer-refresh', daemon=True)
+            self._refresh_thread.start()
+
+    def _drain_refresh_queue(self):
+        while True:
+            with self._lock:
+                if not self._refresh_queue:
+                    self._refresh_thread = None
+                    return
+                queries = list(self._refresh_queue.values())
+                self._refresh_queue.clear()
+            try:
+                self.warm_up(queries)
+            except Exception as e:
+                print(f"✗ Yanıt yenileme hatası: {str(e)}")
+
+
+def create_answer_warmer(rag: Any, n_results_for: Callable[[str], int]) -> AnswerWarmer:
+    """
+    Ortam değişkenlerine göre AnswerWarmer oluşturur
+
+    ANSWER_STORE_PATH: Yanıt deposu (varsayılan: answers.db)
+    """
+    store = AnswerStore(os.getenv('ANSWER_STORE_PATH', 'answers.db'))
+    return AnswerWarmer(rag, store, n_results_for)
+
+
+def warmup_queries(rag: Any) -> List[str]:
+    """
+    Ortam değişkenlerine göre warm-up sorularını toplar
+
+    WARMUP_QUERIES_PATH: Popüler sorular dosyası (varsayılan: data/warmup_queries.txt)
+    WARMUP_TEMPLATES: '|' ile ayrılmış şablonlar (varsayılan: "{sehir} gezilecek yerler")
+    WARMUP_TOP_N: Şablon başına soru sayısı (varsayılan: 10)
+    """
+    queries = load_query_file(os.getenv('WARMUP_QUERIES_PATH', 'data/warmup_queries.txt'))
+    templates = os.getenv('WARMUP_TEMPLATES', '{sehir} gezilecek yerler').split('|')
+    queries.extend(template_queries(rag.lexical_index.doc_metadata, templates,
+                                    int(os.getenv('WARMUP_TOP_N', '10'))))
+    return queries